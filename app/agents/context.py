@@ -0,0 +1,176 @@
+import math
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.state import AgentState
+from app.tracing import get_tracer
+
+# Default prompt budget for retrieved context, per LLM provider
+PROVIDER_TOKEN_BUDGETS = {
+    "gemini": 6000,
+    "openai": 3000,
+    "ollama": 1500,
+}
+
+def get_context_token_budget() -> int:
+    """Token budget for retrieved context (CONTEXT_TOKEN_BUDGET, else a per-provider default)"""
+    budget = os.getenv("CONTEXT_TOKEN_BUDGET")
+    if budget:
+        return int(budget)
+    return PROVIDER_TOKEN_BUDGETS.get(os.getenv("LLM_PROVIDER", "gemini").lower(), 3000)
+
+def get_context_dedup_threshold() -> float:
+    """Shingle Jaccard similarity above which a chunk counts as a near-duplicate"""
+    return float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+
+# Approximation that holds for English prose across common tokenizers; no
+# tokenizer dependency is needed to stay within a budget
+CHARS_PER_TOKEN = 4
+
+# Shortest suffix/prefix match treated as chunk overlap when merging
+_MIN_OVERLAP_CHARS = 20
+
+# A span is only truncated into the remaining budget if at least this many tokens fit
+_MIN_TRUNCATED_TOKENS = 64
+
+_WORD_RE = re.compile(r'\w+')
+_SENTENCE_END_RE = re.compile(r'[.!?]\s')
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _merge_overlap(first: str, second: str) -> Optional[str]:
+    """Join two chunks whose texts overlap (suffix of first == prefix of second)"""
+    if second in first:
+        return first
+    for size in range(min(len(first), len(second)), _MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+def _shingles(text: str, size: int = 5) -> frozenset:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text to max_tokens, at the last sentence boundary when there is one"""
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    boundary = None
+    for boundary in _SENTENCE_END_RE.finditer(cut):
+        pass
+    return cut[:boundary.end()].rstrip() if boundary else cut.rstrip()
+
+
+def merge_adjacent(documents: Sequence[Document]) -> List[Tuple[int, str]]:
+    """
+    Merge chunks of the same source with consecutive chunk_index values.
+
+    Chunks are split with an overlap (see chunk_documents), so merging drops
+    the repeated text. Returns (rank, text) spans where rank is the best
+    retrieval rank among the merged chunks. Chunks without a chunk_index are
+    kept as they are.
+    """
+    spans: List[Tuple[int, str]] = []
+    by_source: Dict[str, List[Tuple[int, int, str]]] = {}
+    for rank, doc in enumerate(documents):
+        index = doc.metadata.get("chunk_index")
+        if index is None:
+            spans.append((rank, doc.page_content))
+        else:
+            by_source.setdefault(doc.metadata.get("source", ""), []).append((index, rank, doc.page_content))
+
+    for chunks in by_source.values():
+        chunks.sort()
+        run_index, run_rank, run_text = chunks[0]
+        for index, rank, text in chunks[1:]:
+            merged = _merge_overlap(run_text, text) if index == run_index + 1 else None
+            if merged is None and index == run_index:
+                merged = run_text if text in run_text else None
+            if merged is None:
+                spans.append((run_rank, run_text))
+                run_rank, run_text = rank, text
+            else:
+                run_rank, run_text = min(run_rank, rank), merged
+            run_index = index
+        spans.append((run_rank, run_text))
+    return spans
+
+
+def build_context(documents: Sequence[Document], token_budget: Optional[int] = None,
+                  dedup_threshold: Optional[float] = None) -> Tuple[str, dict]:
+    """
+    Assemble the prompt context from retrieved chunks.
+
+    1. Adjacent/overlapping chunks of the same source are merged (merge_adjacent).
+    2. Near-duplicates (shingle Jaccard >= dedup_threshold, or text contained
+       in a better ranked span) are dropped.
+    3. Spans are ordered by retrieval rank and packed into token_budget;
+       a span that does not fit is truncated at a sentence boundary if
+       enough budget remains, otherwise skipped for smaller ones.
+
+    Returns:
+        Tuple of (context string, stats) where stats has "chunks", "spans",
+        "duplicates", "dropped", "input_tokens" and "context_tokens"
+    """
+    token_budget = token_budget or get_context_token_budget()
+    dedup_threshold = dedup_threshold if dedup_threshold is not None else get_context_dedup_threshold()
+    stats = {"chunks": len(documents), "spans": 0, "duplicates": 0, "dropped": 0,
+             "input_tokens": sum(estimate_tokens(doc.page_content) for doc in documents), "context_tokens": 0}
+
+    kept: List[Tuple[str, frozenset]] = []
+    for _, text in sorted(merge_adjacent(documents), key=lambda span: span[0]):
+        text = text.strip()
+        if not text:
+            continue
+        shingles = _shingles(text)
+        if any(text in other or len(shingles & other_shingles) / len(shingles | other_shingles) >= dedup_threshold
+               for other, other_shingles in kept):
+            stats["duplicates"] += 1
+            continue
+        kept.append((text, shingles))
+
+    parts, remaining = [], token_budget
+    for text, _ in kept:
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if remaining < _MIN_TRUNCATED_TOKENS:
+                stats["dropped"] += 1
+                continue
+            text = _truncate(text, remaining)
+            tokens = estimate_tokens(text)
+        parts.append(text)
+        remaining -= tokens
+
+    context = "\n\n".join(parts)
+    stats["spans"] = len(parts)
+    stats["context_tokens"] = estimate_tokens(context)
+    return context, stats
+
+
+def get_context(state: AgentState) -> str:
+    """The packed context for the prompt, assembling it if no node has yet"""
+    if state.get("context") is None:
+        state["context"], _ = build_context(state["documents"])
+    return state["context"]
+
+
+def get_context_documents(state: AgentState) -> List[Document]:
+    """The packed context as documents (one per paragraph), for scorers that take documents"""
+    return [Document(page_content=part) for part in get_context(state).split("\n\n") if part.strip()]
+
+
+def context_agent(state: AgentState):
+    """Pack the retrieved documents into the prompt context once per question"""
+    state["context"], stats = build_context(state["documents"])
+    get_tracer().current_span().set(**stats)
+    return state
@@ -1,17 +1,17 @@
 from langchain_core.messages import HumanMessage, AIMessage
+from app.agents.context import get_context
+from app.llm.models import record_llm_usage
 from app.state import AgentState
+from app.tracing import get_tracer
 
-def generator_agent(state: AgentState, llm):
-    """Generate answer based on retrieved context"""
-    # OPTIMIZATION: Increment retry counter
-    state["retries"] = state.get("retries", 0) + 1
-    
+def _build_prompt(state: AgentState):
+    """Build the message list sent to the LLM for generation"""
     # Get user query (first HumanMessage)
     user_messages = [msg for msg in state["messages"] if isinstance(msg, HumanMessage)]
     user_query = user_messages[0].content if user_messages else ""
     
-    # Build context from retrieved documents
-    context = "\n\n".join([doc.page_content for doc in state["documents"]])
+    # Packed once per question and reused on retries
+    context = get_context(state)
     
     # Construct prompt
     # Note: If this is a retry, the 'messages' list already contains the previous 
@@ -31,12 +31,44 @@ Answer:"""
     prompt_message = HumanMessage(content=prompt_text)
     
     # We pass the full message history so the LLM sees the feedback from the validator
-    response = llm.invoke(state["messages"] + [prompt_message])
-    
+    return state["messages"] + [prompt_message]
+
+def _start_attempt(state: AgentState) -> None:
+    # OPTIMIZATION: Increment retry counter
+    state["retries"] = state.get("retries", 0) + 1
+    tracer = get_tracer()
+    tracer.current_span().set(attempt=state["retries"])
+    if state["retries"] > 1:
+        tracer.count("rag_generation_retries_total")
+
+def _record_response(state: AgentState, response) -> AgentState:
     # Add AI response to messages
     if isinstance(response, str):
         state["messages"].append(AIMessage(content=response))
     else:
         state["messages"].append(response)
     
-    return state
\ No newline at end of file
+    return state
+
+def generator_agent(state: AgentState, llm):
+    """Generate answer based on retrieved context"""
+    _start_attempt(state)
+    
+    prompt = _build_prompt(state)
+    response = llm.invoke(prompt)
+    record_llm_usage("generate", prompt, response)
+    return _record_response(state, response)
+
+async def agenerator_agent(state: AgentState, llm, config=None):
+    """
+    Async variant of generator_agent.
+
+    Passing the node's `config` through to the LLM lets LangGraph's
+    stream_mode="messages" surface generated tokens as they arrive.
+    """
+    _start_attempt(state)
+    
+    prompt = _build_prompt(state)
+    response = await llm.ainvoke(prompt, config=config)
+    record_llm_usage("generate", prompt, response)
+    return _record_response(state, response)
@@ -0,0 +1,176 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.embeddings.bm25 import tokenize
+from app.embeddings.embedder import get_embeddings, text_hash
+
+
+def get_validator_mode() -> str:
+    """llm (LLM judge only) | local (embeddings only) | hybrid (local, LLM when ambiguous)"""
+    return os.getenv("VALIDATOR_MODE", "hybrid").lower()
+
+def get_validator_accept_threshold() -> float:
+    """Groundedness score at or above which an answer is accepted without the LLM"""
+    return float(os.getenv("VALIDATOR_ACCEPT_THRESHOLD", "0.65"))
+
+def get_validator_reject_threshold() -> float:
+    """Groundedness score below which an answer is rejected without the LLM"""
+    return float(os.getenv("VALIDATOR_REJECT_THRESHOLD", "0.4"))
+
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# The generator is told to answer with this sentence when the context lacks
+# the information; it makes no claim, so there is nothing to ground
+_REFUSAL_RE = re.compile(r'do(?:es)? not contain (?:this|that|the requested) information', re.IGNORECASE)
+
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have how i in into is it its "
+    "may might not of on or our should so than that the their then there these they this those to was we "
+    "were what when where which who why will with would you your".split()
+)
+
+# Answer sentences with fewer content words ("Yes.", "In summary:") are not scored
+_MIN_SENTENCE_TERMS = 3
+
+SIMILARITY_WEIGHT = 0.6
+
+# Context window matrices kept in memory: a retry validates against the same context
+_WINDOW_CACHE_SIZE = 32
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT_RE.split(text) if sentence and sentence.strip()]
+
+
+def content_terms(text: str) -> List[str]:
+    return [term for term in tokenize(text) if term not in _STOPWORDS]
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    """Vectors stacked as rows of unit length, so a matrix product gives cosine similarities"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class GroundednessScorer:
+    """
+    CPU-only groundedness check of an answer against the retrieved chunks.
+
+    Each answer sentence is scored by its best embedding similarity to a
+    context window (one or two consecutive context sentences) blended with
+    the fraction of its content words found in the context. A sentence
+    mentioning an identifier (a token containing a digit) that does not occur
+    in the context scores 0. The answer scores as its weakest sentence.
+    An answer made only of refusal sentences is grounded; refusal sentences
+    among claims are ignored and the claims scored.
+
+    Uses the same sentence-transformers model as retrieval. Answer sentences
+    and context windows are transient, so they are embedded with
+    persist=False: they stay out of the on-disk chunk cache and the
+    ingestion statistics. The window vectors of the last few contexts are
+    kept in memory, so retries of a question only embed the new answer.
+    """
+
+    def __init__(self, embeddings=None, similarity_weight: float = SIMILARITY_WEIGHT):
+        self.embeddings = embeddings
+        self.similarity_weight = similarity_weight
+        self._windows: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context_windows(documents: Sequence[Document]) -> List[str]:
+        windows = []
+        for doc in documents:
+            sentences = split_sentences(doc.page_content)
+            windows.extend(sentences)
+            windows.extend(f"{first} {second}" for first, second in zip(sentences, sentences[1:]))
+        return windows
+
+    def _window_matrix(self, embeddings, windows: List[str]) -> np.ndarray:
+        key = (getattr(embeddings, "model_name", type(embeddings).__name__), text_hash("\n".join(windows)))
+        with self._lock:
+            matrix = self._windows.get(key)
+            if matrix is not None:
+                self._windows.move_to_end(key)
+                return matrix
+        matrix = _unit_rows(embeddings.embed_documents(windows, persist=False))
+        with self._lock:
+            self._windows[key] = matrix
+            while len(self._windows) > _WINDOW_CACHE_SIZE:
+                self._windows.popitem(last=False)
+        return matrix
+
+    def score(self, answer: str, documents: Sequence[Document]) -> dict:
+        """
+        Returns:
+            {"score": float in [0, 1], "refusal": bool,
+             "sentences": [{"sentence", "similarity", "overlap", "missing_identifiers", "score"}]}
+        """
+        sentences = split_sentences(answer)
+        claims = [sentence for sentence in sentences if not _REFUSAL_RE.search(sentence)]
+        if sentences and not claims:
+            return {"score": 1.0, "refusal": True, "sentences": []}
+        # A refusal sentence next to claims does not excuse them; the claims are scored on their own
+        sentences = claims
+
+        context = "\n".join(doc.page_content for doc in documents)
+        context_terms = set(tokenize(context))
+        windows = self._context_windows(documents)
+        scored = [s for s in sentences if len(content_terms(s)) >= _MIN_SENTENCE_TERMS] or sentences
+        if not scored or not windows:
+            return {"score": 0.0, "refusal": False, "sentences": []}
+
+        embeddings = self.embeddings or get_embeddings()
+        sentence_matrix = _unit_rows(embeddings.embed_documents(scored, persist=False))
+        # Best window similarity of every sentence in one matrix product
+        similarities = (sentence_matrix @ self._window_matrix(embeddings, windows).T).max(axis=1)
+
+        results = []
+        for sentence, similarity in zip(scored, similarities.tolist()):
+            terms = content_terms(sentence)
+            overlap = sum(1 for term in terms if term in context_terms) / len(terms) if terms else 0.0
+            missing = sorted({term for term in terms if any(char.isdigit() for char in term)} - context_terms)
+            sentence_score = 0.0 if missing else (
+                self.similarity_weight * max(similarity, 0.0) + (1 - self.similarity_weight) * overlap
+            )
+            results.append({"sentence": sentence, "similarity": similarity, "overlap": overlap,
+                            "missing_identifiers": missing, "score": sentence_score})
+
+        return {"score": min(result["score"] for result in results), "refusal": False, "sentences": results}
+
+
+_scorer: Optional[GroundednessScorer] = None
+
+def get_groundedness_scorer() -> GroundednessScorer:
+    global _scorer
+    if _scorer is None:
+        _scorer = GroundednessScorer()
+    return _scorer
+
+
+def local_verdict(answer: str, documents: Sequence[Document], mode: Optional[str] = None) -> Optional[bool]:
+    """
+    Decide groundedness locally.
+
+    Returns True/False when the score is clear of the accept/reject band,
+    and None when it falls in between and the LLM judge should decide. In
+    "local" mode there is no judge, so the middle of the band is the cut-off.
+    """
+    mode = mode or get_validator_mode()
+    score = get_groundedness_scorer().score(answer, documents)["score"]
+    accept, reject = get_validator_accept_threshold(), get_validator_reject_threshold()
+    if score >= accept:
+        return True
+    if score < reject:
+        return False
+    if mode == "local":
+        return score >= (accept + reject) / 2
+    return None
@@ -0,0 +1,17 @@
+import asyncio
+
+from app.agents.retriever import get_user_query
+from app.state import AgentState
+
+def rerank_agent(state: AgentState, reranker):
+    """Keep only the best retrieved candidates according to the cross-encoder"""
+    query = get_user_query(state)
+    if query is None or not state["documents"]:
+        return state
+    
+    state["documents"] = reranker.rerank(query, state["documents"])
+    return state
+
+async def arerank_agent(state: AgentState, reranker):
+    """Async variant of rerank_agent; the model runs in a worker thread"""
+    return await asyncio.to_thread(rerank_agent, state, reranker)
@@ -1,21 +1,46 @@
 from langchain_core.messages import HumanMessage
 from app.state import AgentState
+from app.tracing import get_tracer
 
-def retriever_agent(state: AgentState, retriever):
-    """Retrieve relevant documents from vector store based on user query"""
+def get_user_query(state: AgentState):
+    """Return the first user message's text, or None if there is none"""
     if not state["messages"]:
-        return state
+        return None
     
     # Get the first user message (HumanMessage)
     user_messages = [msg for msg in state["messages"] if isinstance(msg, HumanMessage)]
     if not user_messages:
-        return state
+        return None
     
-    query = user_messages[0].content if hasattr(user_messages[0], 'content') else str(user_messages[0])
+    return user_messages[0].content if hasattr(user_messages[0], 'content') else str(user_messages[0])
+
+def _filter_kwargs(state: AgentState) -> dict:
+    return {"filter": state["filter"]} if state.get("filter") else {}
+
+def retriever_agent(state: AgentState, retriever):
+    """Retrieve relevant documents from vector store based on user query"""
+    query = get_user_query(state)
+    # Documents may be prefilled by a bulk retrieval (see app.batch)
+    if query is None or state["documents"]:
+        get_tracer().current_span().set(prefilled=bool(state["documents"]))
+        return state
     
-    # Retrieve relevant documents
-    docs = retriever.invoke(query)
+    # Retrieve relevant documents, only among chunks matching the question's filter
+    docs = retriever.invoke(query, **_filter_kwargs(state))
     state["documents"] = docs
+    get_tracer().current_span().set(documents=len(docs))
     
     return state
 
+async def aretriever_agent(state: AgentState, retriever, config=None):
+    """Async variant of retriever_agent"""
+    query = get_user_query(state)
+    if query is None or state["documents"]:
+        get_tracer().current_span().set(prefilled=bool(state["documents"]))
+        return state
+    
+    docs = await retriever.ainvoke(query, config=config, **_filter_kwargs(state))
+    state["documents"] = docs
+    get_tracer().current_span().set(documents=len(docs))
+    
+    return state
@@ -1,27 +1,45 @@
+import asyncio
+
 from langchain_core.messages import AIMessage, HumanMessage
+from app.agents.context import get_context, get_context_documents
+from app.agents.groundedness import get_validator_mode, local_verdict
+from app.llm.models import record_llm_usage
 from app.state import AgentState
+from app.tracing import get_tracer
 
-def validator_agent(state: AgentState, llm):
-    """Validate if the generated answer is grounded in the context"""
+def _answer_to_validate(state: AgentState):
+    """
+    Return the generated answer, or None when the verdict is already decided
+    (in which case state["validated"] has been set).
+    """
     # Check retry limit
     if state.get("retries", 0) >= 3:
         state["validated"] = True  # Force validation after max retries
-        return state
+        return None
     
     if not state["messages"] or not state["documents"]:
         state["validated"] = False
-        return state
+        return None
     
     # Get the generated answer (last AI message)
     ai_messages = [msg for msg in state["messages"] if isinstance(msg, AIMessage)]
     if not ai_messages:
         state["validated"] = False
-        return state
+        return None
     
-    generated_answer = ai_messages[-1].content if hasattr(ai_messages[-1], 'content') else str(ai_messages[-1])
-    
-    # Get context from retrieved documents
-    context = "\n\n".join([doc.page_content for doc in state["documents"]])
+    return ai_messages[-1].content if hasattr(ai_messages[-1], 'content') else str(ai_messages[-1])
+
+def _local_verdict(state: AgentState, generated_answer: str):
+    """Local groundedness verdict, or None if the LLM judge should decide"""
+    mode = get_validator_mode()
+    if mode == "llm":
+        return None
+    # Score against the packed context, the same evidence the generator and the LLM judge see
+    return local_verdict(generated_answer, get_context_documents(state), mode)
+
+def _validation_prompt(state: AgentState, generated_answer: str):
+    # Validate against the same packed context the generator was given
+    context = get_context(state)
     
     # Construct validation prompt
     prompt_text = f"""You are a validator. Check if the following answer is grounded in the provided context.
@@ -36,17 +54,56 @@ Generated Answer:
 Is the answer grounded in the context? Answer Yes or No:"""
     
     # Get validation verdict using HumanMessage for chat models
-    prompt_message = HumanMessage(content=prompt_text)
-    verdict = llm.invoke([prompt_message])
-    
+    return HumanMessage(content=prompt_text)
+
+def _parse_verdict(verdict) -> bool:
     verdict_text = verdict.content.strip().lower() if hasattr(verdict, 'content') else str(verdict).strip().lower()
-    
-    is_valid = "yes" in verdict_text
+    return "yes" in verdict_text
+
+def _apply_verdict(state: AgentState, is_valid: bool, judge: str) -> AgentState:
     state["validated"] = is_valid
+    tracer = get_tracer()
+    tracer.current_span().set(validated=is_valid, judge=judge)
+    tracer.count("rag_validations_total", judge=judge, validated=str(is_valid).lower())
 
     # IMPROVEMENT: Add feedback to the message history if validation fails
     if not is_valid:
         feedback = "Validation failed: The previous answer was not fully grounded in the context. Please try again and ensure every claim is supported by the provided documents."
         state["messages"].append(AIMessage(content=feedback))
     
-    return state
\ No newline at end of file
+    return state
+
+def validator_agent(state: AgentState, llm):
+    """
+    Validate if the generated answer is grounded in the context.
+
+    Depending on VALIDATOR_MODE the answer is scored locally with embeddings
+    (see app.agents.groundedness) and the LLM is only asked when that score
+    is ambiguous, or always asked (VALIDATOR_MODE=llm).
+    """
+    generated_answer = _answer_to_validate(state)
+    if generated_answer is None:
+        return state
+    
+    is_valid = _local_verdict(state, generated_answer)
+    if is_valid is not None:
+        return _apply_verdict(state, is_valid, "local")
+    prompt = [_validation_prompt(state, generated_answer)]
+    verdict = llm.invoke(prompt)
+    record_llm_usage("validate", prompt, verdict)
+    return _apply_verdict(state, _parse_verdict(verdict), "llm")
+
+async def avalidator_agent(state: AgentState, llm, config=None):
+    """Async variant of validator_agent"""
+    generated_answer = _answer_to_validate(state)
+    if generated_answer is None:
+        return state
+    
+    # Local scoring is CPU-bound; keep it off the event loop
+    is_valid = await asyncio.to_thread(_local_verdict, state, generated_answer)
+    if is_valid is not None:
+        return _apply_verdict(state, is_valid, "local")
+    prompt = [_validation_prompt(state, generated_answer)]
+    verdict = await llm.ainvoke(prompt, config=config)
+    record_llm_usage("validate", prompt, verdict)
+    return _apply_verdict(state, _parse_verdict(verdict), "llm")
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import time
+from typing import List, Optional
+
+from app.embeddings.vector_store import retrieve_many
+from app.resources import ResourceRegistry, get_registry
+from app.state import initial_state
+from app.tracing import get_tracer
+
+
+def get_batch_concurrency() -> int:
+    """Number of questions run through the graph at once"""
+    return int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+def get_batch_retrieval_size() -> int:
+    """Number of questions per bulk Chroma query"""
+    return int(os.getenv("BATCH_RETRIEVAL_SIZE", "256"))
+
+
+def question_id(record: dict) -> str:
+    """The record's "id", or a stable hash of its question"""
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha256(record["question"].encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path: str) -> List[dict]:
+    """Read {"question", ["id", ...]} records from a JSONL file"""
+    records = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not record.get("question"):
+                raise ValueError(f"{path}:{line_number}: expected an object with a 'question' field")
+            record["id"] = question_id(record)
+            records.append(record)
+    return records
+
+
+def completed_ids(output_path: str) -> set:
+    """IDs already answered without error in an existing output file"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interruption
+            if result.get("error"):
+                done.discard(result.get("id"))
+            else:
+                done.add(result.get("id"))
+    return done
+
+
+def _summarize(results: List[dict], wall_s: float) -> dict:
+    latencies = sorted(result["latency_s"] for result in results if not result.get("error"))
+    answered = len(latencies)
+    return {
+        "questions": len(results),
+        "answered": answered,
+        "errors": len(results) - answered,
+        "wall_s": wall_s,
+        "questions_per_s": len(results) / wall_s if wall_s else 0.0,
+        "latency_p50_s": statistics.median(latencies) if latencies else 0.0,
+        "latency_p95_s": latencies[min(answered - 1, int(answered * 0.95))] if latencies else 0.0,
+        "mean_retries": statistics.mean(result["retries"] for result in results if not result.get("error"))
+        if answered else 0.0,
+        "validated": sum(1 for result in results if result.get("validated")),
+    }
+
+
+async def arun_batch(records: List[dict], output_path: str, concurrency: Optional[int] = None,
+                     resources: Optional[ResourceRegistry] = None, tenant: Optional[str] = None,
+                     filter: Optional[dict] = None) -> dict:
+    """
+    Answer many questions and append one JSONL result per question.
+
+    All questions are embedded in one batched call, retrieval runs in bulk
+    (see retrieve_many) and the retrieved documents are prefilled into the
+    graph state, so the graph's retrieve node is skipped. Graph runs are
+    concurrent up to `concurrency`; the LLM client's rate limiter
+    (LLM_REQUESTS_PER_SECOND) keeps them within provider quotas.
+
+    Questions already answered in `output_path` are skipped, so an
+    interrupted run resumes where it stopped. Each result line holds the
+    input record plus "answer", "validated", "retries", "latency_s",
+    "retrieval_s" and "error".
+
+    Questions are answered from `tenant`'s corpus (default RAG_TENANT),
+    only over chunks matching the metadata `filter` when one is given.
+    """
+    resources = resources or get_registry()
+    concurrency = concurrency or get_batch_concurrency()
+    done = completed_ids(output_path)
+    pending = [record for record in records if record["id"] not in done]
+    if len(records) != len(pending):
+        print(f"Resuming: {len(records) - len(pending)} of {len(records)} questions already answered")
+    if not pending:
+        return _summarize([], 0.0)
+
+    start = time.perf_counter()
+    graph = resources.async_graph(tenant)
+    questions = [record["question"] for record in pending]
+    # Questions are embedded in batches but, unlike chunks, are not stored in the disk cache
+    vectors = await asyncio.to_thread(resources.embeddings().embed_documents, questions, persist=False)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    results: List[dict] = []
+
+    async def answer(record: dict, documents: list, retrieval_s: float, out) -> None:
+        async with semaphore:
+            question_start = time.perf_counter()
+            result = dict(record, answer=None, validated=False, retries=0, retrieval_s=retrieval_s, error=None)
+            try:
+                with get_tracer().span("rag.question", batch=True) as span:
+                    state = await graph.ainvoke(initial_state(record["question"], documents))
+                    span.set(retries=state.get("retries", 0), validated=bool(state.get("validated")))
+                result.update(answer=state.get("final_answer"), validated=bool(state.get("validated")),
+                              retries=state.get("retries", 0))
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            result["latency_s"] = time.perf_counter() - question_start
+
+        async with write_lock:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            results.append(result)
+            if len(results) % 50 == 0:
+                print(f"Answered {len(results)}/{len(pending)} questions")
+
+    block_size = get_batch_retrieval_size()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "a", encoding="utf-8") as out:
+        tasks = []
+        for block_start in range(0, len(pending), block_size):
+            block = slice(block_start, block_start + block_size)
+            retrieval_start = time.perf_counter()
+            retrieved = await asyncio.to_thread(
+                retrieve_many, resources.vector_store(tenant), questions[block], vectors[block],
+                resources.retriever_k(), tenant, filter,
+            )
+            retrieval_s = (time.perf_counter() - retrieval_start) / len(retrieved) if retrieved else 0.0
+            tasks.extend(asyncio.create_task(answer(record, documents, retrieval_s, out))
+                         for record, documents in zip(pending[block], retrieved))
+        await asyncio.gather(*tasks)
+
+    summary = _summarize(results, time.perf_counter() - start)
+    print(
+        f"Batch: {summary['answered']} answered, {summary['errors']} errors in {summary['wall_s']:.1f}s "
+        f"({summary['questions_per_s']:.2f} q/s), latency p50 {summary['latency_p50_s']:.2f}s "
+        f"p95 {summary['latency_p95_s']:.2f}s, mean retries {summary['mean_retries']:.2f}"
+    )
+    return summary
+
+
+def run_batch(input_path: str, output_path: str, concurrency: Optional[int] = None,
+              tenant: Optional[str] = None, filter: Optional[dict] = None) -> dict:
+    """Synchronous entry point for arun_batch over a JSONL file of questions"""
+    return asyncio.run(arun_batch(read_questions(input_path), output_path, concurrency,
+                                  tenant=tenant, filter=filter))
@@ -0,0 +1,167 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.embeddings.filters import normalize_filter, sql_filter
+
+# Words, plus hyphen/underscore-joined compounds such as ALPHA-999-BETA
+_TOKEN_RE = re.compile(r'\w+(?:[-_]\w+)*')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens for BM25.
+
+    Compound identifiers are indexed both whole and by part, so a query for
+    "ALPHA-999-BETA" matches the exact identifier strongly while "alpha 999"
+    still matches partially.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if '-' in token or '_' in token:
+            tokens.extend(part for part in re.split(r'[-_]', token) if part)
+    return tokens
+
+
+class BM25Index:
+    """
+    Persistent inverted index with Okapi BM25 scoring.
+
+    Built during ingestion alongside the vector store and kept in sync with
+    it by chunk ID. Postings live in SQLite so adds and deletes are
+    incremental and committed together with each ingested document.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL, length INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, length INTEGER NOT NULL,"
+                " PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk ON postings(chunk_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " documents INTEGER NOT NULL, total_length INTEGER NOT NULL)"
+            )
+            self._conn.execute("INSERT OR IGNORE INTO stats (id, documents, total_length) VALUES (0, 0, 0)")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT documents FROM stats WHERE id = 0").fetchone()[0]
+
+    def add(self, ids: Sequence[str], documents: Sequence[Document]) -> None:
+        """Index (or re-index) chunks under the same IDs used in the vector store"""
+        self.delete(ids)
+        chunk_rows, posting_rows, total_length = [], [], 0
+        for chunk_id, doc in zip(ids, documents):
+            counts = Counter(tokenize(doc.page_content))
+            length = sum(counts.values())
+            total_length += length
+            chunk_rows.append((chunk_id, doc.page_content, json.dumps(doc.metadata), length))
+            posting_rows.extend((term, chunk_id, tf, length) for term, tf in counts.items())
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO chunks (id, text, metadata, length) VALUES (?, ?, ?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf, length) VALUES (?, ?, ?, ?)", posting_rows)
+            self._conn.execute(
+                "UPDATE stats SET documents = documents + ?, total_length = total_length + ? WHERE id = 0",
+                (len(chunk_rows), total_length),
+            )
+
+    def delete(self, ids: Sequence[str]) -> None:
+        if not ids:
+            return
+        with self._lock, self._conn:
+            for start in range(0, len(ids), 500):
+                batch = list(ids[start:start + 500])
+                placeholders = ",".join("?" * len(batch))
+                removed, removed_length = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE id IN ({placeholders})", batch
+                ).fetchone()
+                self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+                self._conn.execute(
+                    "UPDATE stats SET documents = documents - ?, total_length = total_length - ? WHERE id = 0",
+                    (removed, removed_length),
+                )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("UPDATE stats SET documents = 0, total_length = 0 WHERE id = 0")
+
+    def search(self, query: str, k: int = 5, filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """
+        Return the top-k chunks for a query as (Document, BM25 score), best first.
+
+        With a metadata `filter` (see app.embeddings.filters) only the
+        postings of matching chunks are scored; IDF stays corpus-wide so
+        scores do not depend on the filter.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        filter = normalize_filter(filter)
+        condition, filter_params = sql_filter(filter, column="c.metadata")
+
+        scores: Dict[str, float] = {}
+        with self._lock:
+            documents, total_length = self._conn.execute(
+                "SELECT documents, total_length FROM stats WHERE id = 0"
+            ).fetchone()
+            if not documents:
+                return []
+            avg_length = (total_length / documents) or 1.0
+
+            for term in terms:
+                if filter is None:
+                    postings = self._conn.execute(
+                        "SELECT chunk_id, tf, length FROM postings WHERE term = ?", (term,)
+                    ).fetchall()
+                    frequency = len(postings)
+                else:
+                    postings = self._conn.execute(
+                        "SELECT p.chunk_id, p.tf, p.length FROM postings p JOIN chunks c ON c.id = p.chunk_id"
+                        f" WHERE p.term = ? AND {condition}", (term, *filter_params)
+                    ).fetchall()
+                    frequency = self._conn.execute(
+                        "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+                    ).fetchone()[0] if postings else 0
+                if not postings:
+                    continue
+                idf = math.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            results = []
+            for chunk_id, score in top:
+                text, metadata = self._conn.execute(
+                    "SELECT text, metadata FROM chunks WHERE id = ?", (chunk_id,)
+                ).fetchone()
+                results.append((Document(id=chunk_id, page_content=text, metadata=json.loads(metadata)), score))
+        return results
+
@@ -0,0 +1,243 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.embeddings.query_cache import get_query_cache
+from app.tracing import get_tracer, traced
+
+
+def get_embedding_model():
+    """Get the embedding model name from environment variables"""
+    return os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-V2")
+
+def get_embedding_batch_size() -> int:
+    """Number of texts sent to the embedding model per batch"""
+    return int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+def get_embedding_cache_path() -> str:
+    """Location of the on-disk embedding cache"""
+    return os.getenv("EMBEDDING_CACHE_PATH", "./.cache/embedding_cache.sqlite")
+
+def get_embedding_cache_max_rows() -> int:
+    """Number of vectors kept in the embedding cache before the least recently used are evicted"""
+    return int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+
+def embedding_cache_enabled() -> bool:
+    return os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, row-bounded LRU store of embedding vectors keyed by
+    (model, text hash).
+
+    Vectors are stored as packed float32 so re-ingesting a document, or
+    ingesting documents that share chunks, never recomputes an embedding.
+
+    The row count is tracked as vectors are written and evicted. Once it
+    goes over `max_rows` the table is counted exactly (other processes may
+    share the file) and the least recently used vectors are evicted down to
+    EVICT_TO of the cap, so the full count runs rarely.
+    """
+
+    # SQLite's default limit on bound parameters is 999
+    _LOOKUP_BATCH = 500
+    EVICT_TO = 0.9
+
+    def __init__(self, path: Optional[str] = None, max_rows: Optional[int] = None):
+        self.path = path or get_embedding_cache_path()
+        self.max_rows = max_rows if max_rows is not None else get_embedding_cache_max_rows()
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+                " last_access REAL NOT NULL DEFAULT 0, PRIMARY KEY (model, text_hash))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+            if "last_access" not in columns:
+                # Caches written before eviction existed; their rows are evicted first
+                self._conn.execute("ALTER TABLE embeddings ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)"
+            )
+            self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(hashes), self._LOOKUP_BATCH):
+                batch = hashes[start:start + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                if rows:
+                    with self._conn:
+                        self._conn.execute(
+                            f"UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                            [time.time(), model, *batch],
+                        )
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            # A row already present was written concurrently for the same text and holds the same vector
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(model, key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            ).rowcount
+            self._rows += max(0, inserted)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used vectors once the cache holds more than max_rows"""
+        if self._rows <= self.max_rows:
+            return
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if self._rows <= self.max_rows:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+            (self._rows - int(self.max_rows * self.EVICT_TO),),
+        ).rowcount
+        self._rows -= deleted
+        self.evictions += deleted
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding service used by the vector store.
+
+    Wraps the sentence-transformers model (loaded once per process, see
+    get_embeddings) and adds:
+    - embedding in EMBEDDING_BATCH_SIZE batches
+    - de-duplication of identical texts within a call
+    - a persistent (model, text hash) -> vector cache
+    - throughput statistics (chunks/sec)
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 cache: Optional[EmbeddingCache] = None):
+        self.model_name = model_name or get_embedding_model()
+        self.batch_size = batch_size or get_embedding_batch_size()
+        self.cache = cache if cache is not None else (EmbeddingCache() if embedding_cache_enabled() else None)
+        # Imported on first use: it pulls in sentence-transformers and torch
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        self._model = HuggingFaceEmbeddings(
+            model_name=self.model_name,
+            encode_kwargs={"batch_size": self.batch_size},
+        )
+        self.stats = {"texts": 0, "unique": 0, "cache_hits": 0, "computed": 0, "seconds": 0.0}
+        self.last_run: dict = {}
+
+    @traced("embed.documents")
+    def embed_documents(self, texts: List[str], log: bool = True, persist: bool = True) -> List[List[float]]:
+        """
+        With persist=False the texts are embedded without touching the disk
+        cache, stats or last_run: for transient text such as the answer
+        sentences and context windows scored by groundedness.
+        """
+        start = time.perf_counter()
+        hashes = [text_hash(text) for text in texts]
+
+        # De-duplicate: embed each distinct text once
+        unique: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            unique.setdefault(key, text)
+
+        cache = self.cache if persist else None
+        vectors = cache.get_many(self.model_name, list(unique)) if cache else {}
+        cache_hits = len(vectors)
+        missing = [key for key in unique if key not in vectors]
+
+        for batch_start in range(0, len(missing), self.batch_size):
+            batch_keys = missing[batch_start:batch_start + self.batch_size]
+            batch_vectors = self._model.embed_documents([unique[key] for key in batch_keys])
+            computed = dict(zip(batch_keys, batch_vectors))
+            if cache:
+                cache.put_many(self.model_name, computed)
+            vectors.update(computed)
+
+        elapsed = time.perf_counter() - start
+        run = {
+            "texts": len(texts),
+            "unique": len(unique),
+            "cache_hits": cache_hits,
+            "computed": len(missing),
+            "seconds": elapsed,
+            "chunks_per_s": len(texts) / elapsed if elapsed else 0.0,
+        }
+        get_tracer().current_span().set(persist=persist, **run)
+        if not persist:
+            return [vectors[key] for key in hashes]
+
+        self.last_run = run
+        for key in self.stats:
+            self.stats[key] += run[key]
+        if texts and log:
+            print(
+                f"🧮 Embedded {len(texts)} chunks ({len(unique)} unique, {cache_hits} cached, "
+                f"{len(missing)} computed) in {elapsed:.2f}s - {run['chunks_per_s']:.1f} chunks/s"
+            )
+
+        return [vectors[key] for key in hashes]
+
+    @traced("embed.query")
+    def embed_query(self, text: str) -> List[float]:
+        # Memoized in process: the answer cache and dense retrieval embed the same question
+        cache = get_query_cache()
+        vector = cache.embedding(self.model_name, text) if cache is not None else None
+        get_tracer().current_span().set(cache_hit=vector is not None)
+        if vector is None:
+            vector = self._model.embed_query(text)
+            if cache is not None:
+                cache.put_embedding(self.model_name, text, vector)
+        return vector
+
+    def throughput(self) -> float:
+        """Cumulative chunks/sec over every embed_documents call"""
+        return self.stats["texts"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+
+    def stats_since(self, before: dict) -> dict:
+        """
+        Statistics of the embed_documents calls made since `before`, a copy
+        of `stats` taken earlier (e.g. at the start of an ingestion run), with
+        their chunks/sec.
+        """
+        run = {key: self.stats[key] - before.get(key, 0) for key in self.stats}
+        run["chunks_per_s"] = run["texts"] / run["seconds"] if run["seconds"] else 0.0
+        return run
+
+
+_embeddings: Dict[str, CachedEmbeddings] = {}
+_embeddings_lock = threading.Lock()
+
+def get_embeddings(model_name: Optional[str] = None) -> CachedEmbeddings:
+    """Return the process-wide embedding service for a model, loading it on first use"""
+    model_name = model_name or get_embedding_model()
+    with _embeddings_lock:
+        if model_name not in _embeddings:
+            _embeddings[model_name] = CachedEmbeddings(model_name)
+        return _embeddings[model_name]
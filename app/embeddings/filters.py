@@ -0,0 +1,74 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Metadata keys are interpolated into JSON paths, so only plain identifiers are allowed
+_KEY_RE = re.compile(r'^\w+$')
+_SCALARS = (str, int, float, bool)
+
+
+def normalize_filter(filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Validate a metadata filter.
+
+    A filter maps metadata keys to a value, or to a list of accepted values;
+    a chunk matches when every key matches, e.g.
+    {"source": "/srv/rag/data/report.pdf", "page": [1, 2]} ("source" is the
+    absolute path, see app.ingestion.manifest.normalize_source). Empty
+    filters become None.
+    """
+    if not filter:
+        return None
+    normalized = {}
+    for key, value in filter.items():
+        if not isinstance(key, str) or not _KEY_RE.match(key):
+            raise ValueError(f"Invalid metadata filter key: {key!r}")
+        values = list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        if not values or not all(isinstance(item, _SCALARS) for item in values):
+            raise ValueError(f"Metadata filter {key!r} needs a string, number or boolean, or a list of them")
+        normalized[key] = values[0] if len(values) == 1 else sorted(values, key=repr)
+    return normalized
+
+
+def filter_key(filter: Optional[Dict[str, Any]]) -> Tuple:
+    """Hashable form of a filter, for cache keys"""
+    filter = normalize_filter(filter)
+    if filter is None:
+        return ()
+    return tuple((key, tuple(value) if isinstance(value, list) else value) for key, value in sorted(filter.items()))
+
+
+def chroma_where(filter: Optional[Dict[str, Any]]) -> Optional[dict]:
+    """The filter as a Chroma `where` clause"""
+    filter = normalize_filter(filter)
+    if filter is None:
+        return None
+    clauses = [{key: {"$in": value} if isinstance(value, list) else {"$eq": value}}
+               for key, value in sorted(filter.items())]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def sql_filter(filter: Optional[Dict[str, Any]], column: str = "metadata") -> Tuple[str, List[Any]]:
+    """
+    The filter as an SQL condition over a JSON metadata column.
+
+    Returns:
+        (condition, parameters); ("1", []) without a filter
+    """
+    filter = normalize_filter(filter)
+    if filter is None:
+        return "1", []
+    conditions, params = [], []
+    for key, value in sorted(filter.items()):
+        values = value if isinstance(value, list) else [value]
+        conditions.append(f"json_extract({column}, '$.{key}') IN ({','.join('?' * len(values))})")
+        params.extend(values)
+    return " AND ".join(conditions), params
+
+
+def dense_filter(db, filter: Optional[Dict[str, Any]]) -> dict:
+    """Keyword arguments applying the filter to a similarity search on either vector store backend"""
+    filter = normalize_filter(filter)
+    if filter is None:
+        return {}
+    # LocalVectorIndex takes the filter as is; Chroma needs a where clause
+    return {"filter": filter if hasattr(db, "search_vectors") else chroma_where(filter)}
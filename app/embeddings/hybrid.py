@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.embeddings.filters import dense_filter
+from app.tracing import get_tracer
+
+
+def _fusion_key(doc: Document) -> Tuple[str, str]:
+    # Dense and sparse results are different Document objects; identify a
+    # chunk by source and content so duplicates across result lists merge
+    return doc.metadata.get("source", ""), doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Fuse ranked result lists with reciprocal rank fusion.
+
+    Each document scores sum(1 / (rrf_k + rank)) over the lists it appears
+    in; only ranks are used, so BM25 and cosine scores need no calibration.
+    """
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _fusion_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
+async def _atraced(name: str, awaitable):
+    with get_tracer().span(name):
+        return await awaitable
+
+
+class DenseRetriever(BaseRetriever):
+    """Similarity search on the vector store alone (RETRIEVAL_MODE=dense)"""
+
+    vector_store: Any
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                filter: Optional[dict] = None) -> List[Document]:
+        return self.vector_store.similarity_search(query, k=self.k, **dense_filter(self.vector_store, filter))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       filter: Optional[dict] = None) -> List[Document]:
+        return await self.vector_store.asimilarity_search(query, k=self.k, **dense_filter(self.vector_store, filter))
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense (vector store) + sparse (BM25) retrieval fused by reciprocal rank.
+
+    Exact identifiers such as "ALPHA-999-BETA" are matched by BM25 even when
+    the embedding model represents them poorly, so the right chunk lands in
+    a small k and prompts stay short.
+
+    Both retrievers take a metadata `filter` (see app.embeddings.filters),
+    passed per call as `invoke(query, filter=...)`, and apply it before
+    ranking rather than to the fused results.
+    """
+
+    vector_store: Any
+    bm25: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                filter: Optional[dict] = None) -> List[Document]:
+        tracer = get_tracer()
+        with tracer.span("retrieve.dense"):
+            dense = self.vector_store.similarity_search(query, k=self.fetch_k,
+                                                        **dense_filter(self.vector_store, filter))
+        with tracer.span("retrieve.bm25"):
+            sparse = [doc for doc, _ in self.bm25.search(query, k=self.fetch_k, filter=filter)]
+        return reciprocal_rank_fusion([dense, sparse], k=self.k, rrf_k=self.rrf_k)
+
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       filter: Optional[dict] = None) -> List[Document]:
+        # Run the dense and sparse searches concurrently
+        dense, sparse = await asyncio.gather(
+            _atraced("retrieve.dense", self.vector_store.asimilarity_search(
+                query, k=self.fetch_k, **dense_filter(self.vector_store, filter))),
+            _atraced("retrieve.bm25", asyncio.to_thread(self.bm25.search, query, self.fetch_k, filter)),
+        )
+        sparse = [doc for doc, _ in sparse]
+        return reciprocal_rank_fusion([dense, sparse], k=self.k, rrf_k=self.rrf_k)
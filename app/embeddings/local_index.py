@@ -0,0 +1,557 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from app.embeddings.filters import normalize_filter, sql_filter
+from app.embeddings.quantization import (approximate_scores, get_quantization, get_rerank_factor, load_quantizer,
+                                         make_quantizer, save_quantizer)
+
+
+def get_local_index_dtype() -> str:
+    """Storage precision of the local index vectors: float32 | float16"""
+    return os.getenv("LOCAL_INDEX_DTYPE", "float32").lower()
+
+def get_local_index_mode() -> str:
+    """exact (brute force) | ivf (inverted file, approximate)"""
+    return os.getenv("LOCAL_INDEX_MODE", "exact").lower()
+
+def get_local_index_nprobe() -> int:
+    """Number of IVF lists scanned per query"""
+    return int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+
+def get_local_index_nlist() -> int:
+    """Number of IVF lists (0 = about 4 * sqrt(rows))"""
+    return int(os.getenv("LOCAL_INDEX_NLIST", "0"))
+
+
+# Rows scored per matrix product, bounding temporary memory for large indexes
+_BLOCK_ROWS = 65536
+# SQLite's default limit on bound parameters is 999
+_SQL_BATCH = 500
+# IVF and quantizers are only trained once the index holds this many rows
+_MIN_IVF_ROWS = 1024
+_MIN_QUANTIZER_ROWS = 1024
+
+_HEADER_FILE = "index.json"
+_VECTORS_FILE = "vectors.bin"
+_ALIVE_FILE = "alive.bin"
+_META_FILE = "meta.sqlite"
+_CENTROIDS_FILE = "ivf_centroids.npy"
+_ASSIGN_FILE = "ivf_assign.bin"
+_QUANTIZER_FILE = "quantizer.npz"
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row, computed in blocks"""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + _BLOCK_ROWS], dtype=np.float32)
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def spherical_kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm k-means centroids (cosine similarity) of the given rows"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=clusters) == 0
+        # Re-seed empty lists with random rows
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorIndex(VectorStore):
+    """
+    Vector store backed by memory-mapped arrays, for read-heavy serving.
+
+    Layout of `path`:
+    - vectors.bin: unit-normalized embeddings, one float32/float16 row per chunk
+    - alive.bin: one byte per row, 0 once the chunk is deleted
+    - meta.sqlite: chunk ID, text and metadata by row number
+    - ivf_centroids.npy / ivf_assign.bin: the optional IVF partitioning
+    - quantizer.npz / codes-<rows>.bin: the optional int8 or PQ codes
+
+    Opening maps the files instead of loading them, so it is instant and
+    every process serving the same index shares one copy in the page cache.
+    Rows are only appended; deletes clear the alive byte (reclaimed by
+    re-ingesting with --rebuild). Readers pick up rows appended by the
+    (single) writing process on their next search.
+
+    Search is exact cosine similarity vectorized with NumPy; in "ivf" mode
+    only the rows of the `nprobe` lists closest to the query are scored.
+    A metadata filter (see app.embeddings.filters) is resolved to row
+    numbers in SQLite first, and only those rows are scored.
+
+    With quantization ("int8" or "pq", see app.embeddings.quantization) the
+    scan reads compact codes instead of the vectors, scoring them against
+    the unquantized query (asymmetric distance), and only the best
+    k * rerank_factor candidates are re-scored with the full-precision
+    vectors. The vectors file stays on disk, so resident memory is
+    dominated by the codes.
+    """
+
+    def __init__(self, path: str, embedding_function: Optional[Embeddings] = None,
+                 dtype: Optional[str] = None, mode: Optional[str] = None, nprobe: Optional[int] = None,
+                 quantization: Optional[str] = None, rerank_factor: Optional[int] = None):
+        self.path = path
+        self._embedding = embedding_function
+        self.mode = mode or get_local_index_mode()
+        self.nprobe = nprobe or get_local_index_nprobe()
+        self.quantization = quantization or get_quantization()
+        self.rerank_factor = rerank_factor or get_rerank_factor()
+        if self.quantization != "none":
+            make_quantizer(self.quantization)  # validate the setting early
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+
+        self._header = self._read_header() or {"dim": None, "dtype": dtype or get_local_index_dtype(),
+                                               "ivf_rows": 0, "quantizer_rows": 0}
+        if self._header["dtype"] not in ("float32", "float16"):
+            raise ValueError(f"Unsupported LOCAL_INDEX_DTYPE: {self._header['dtype']}. Choose 'float32' or 'float16'")
+
+        self._conn = sqlite3.connect(self._file(_META_FILE), timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+
+        self._rows = -1
+        self._vectors = self._alive = self._assign = self._centroids = None
+        self._ivf_signature = None
+        self._lists = None
+        self._quantizer = self._codes = None
+        self._quantizer_signature = None
+
+    # -- storage --------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with open(self._file(_HEADER_FILE), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_header(self) -> None:
+        tmp_path = f"{self._file(_HEADER_FILE)}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._header, file)
+        os.replace(tmp_path, self._file(_HEADER_FILE))
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._header["dim"]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self._header["dtype"])
+
+    def _stored_rows(self) -> int:
+        """Rows fully written (vector and alive byte), as seen on disk"""
+        if not self.dim:
+            return 0
+        try:
+            vector_rows = os.path.getsize(self._file(_VECTORS_FILE)) // (self.dim * self.dtype.itemsize)
+            return min(vector_rows, os.path.getsize(self._file(_ALIVE_FILE)))
+        except OSError:
+            return 0
+
+    def _signature(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._file(name))
+            return stat.st_ino, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh(self) -> None:
+        """(Re)map the files if another process or thread changed them"""
+        if self.dim is None:
+            self._header = self._read_header() or self._header
+        rows = self._stored_rows()
+        ivf_signature = self._signature(_CENTROIDS_FILE)
+        quantizer_signature = self._signature(_QUANTIZER_FILE) if self.quantization != "none" else None
+        if rows != self._rows:
+            self._vectors = np.memmap(self._file(_VECTORS_FILE), dtype=self.dtype, mode="r",
+                                      shape=(rows, self.dim)) if rows else None
+            self._alive = np.memmap(self._file(_ALIVE_FILE), dtype=np.uint8, mode="r",
+                                    shape=(rows,)) if rows else None
+            self._rows = rows
+        if ivf_signature != self._ivf_signature or (self._centroids is not None and len(self._assign) < rows):
+            self._centroids = np.load(self._file(_CENTROIDS_FILE)) if ivf_signature else None
+            assigned = min(os.path.getsize(self._file(_ASSIGN_FILE)) // 4, rows) if ivf_signature else 0
+            self._assign = np.memmap(self._file(_ASSIGN_FILE), dtype=np.int32, mode="r",
+                                     shape=(assigned,)) if assigned else np.empty(0, np.int32)
+            self._ivf_signature = ivf_signature
+            self._lists = None
+        if quantizer_signature != self._quantizer_signature or (self._codes is not None and len(self._codes) < rows):
+            self._quantizer = load_quantizer(self._file(_QUANTIZER_FILE)) if quantizer_signature else None
+            self._codes = self._map_codes(rows) if quantizer_signature else None
+            self._quantizer_signature = quantizer_signature
+
+    def _map_codes(self, rows: int) -> np.ndarray:
+        code_size = self._quantizer.code_size(self.dim)
+        codes_file = self._file(self._quantizer.codes_file)
+        coded = min(os.path.getsize(codes_file) // code_size, rows)
+        dtype = np.int8 if self._quantizer.kind == "int8" else np.uint8
+        if not coded:
+            return np.empty((0, code_size), dtype=dtype)
+        return np.memmap(codes_file, dtype=dtype, mode="r", shape=(coded, code_size))
+
+    # -- writes ---------------------------------------------------------
+
+    def add_vectors(self, ids: Sequence[str], vectors, texts: Sequence[str],
+                    metadatas: Optional[Sequence[dict]] = None) -> List[str]:
+        """Add precomputed embeddings; existing chunks with the same IDs are replaced"""
+        vectors = normalize_rows(vectors)
+        metadatas = metadatas or [{} for _ in ids]
+        if not len(ids):
+            return []
+        with self._lock:
+            if self.dim is None:
+                self._header["dim"] = int(vectors.shape[1])
+                self._write_header()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+            self.delete(list(ids))
+            start = self._stored_rows()
+            # Alive bytes are written first: readers only see rows with both
+            with open(self._file(_ALIVE_FILE), "ab") as file:
+                file.write(b"\x01" * len(ids))
+            with open(self._file(_VECTORS_FILE), "ab") as file:
+                file.write(vectors.astype(self.dtype).tobytes())
+            self._refresh()
+            if self._centroids is not None:
+                with open(self._file(_ASSIGN_FILE), "ab") as file:
+                    file.write(nearest_centroids(vectors, self._centroids).tobytes())
+            if self._quantizer is not None:
+                with open(self._file(self._quantizer.codes_file), "ab") as file:
+                    file.write(self._quantizer.encode(vectors).tobytes())
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO chunks (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                    [(start + i, chunk_id, text, json.dumps(metadata or {}))
+                     for i, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))],
+                )
+        return list(ids)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        if not texts:
+            return []
+        return self.add_vectors(ids, self._embedding.embed_documents(texts), texts, metadatas)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            rows = []
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[start:start + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(row for (row,) in self._conn.execute(
+                    f"SELECT row FROM chunks WHERE id IN ({placeholders})", batch))
+            if not rows:
+                return False
+            with open(self._file(_ALIVE_FILE), "r+b") as file:
+                for row in sorted(rows):
+                    file.seek(row)
+                    file.write(b"\x00")
+            with self._conn:
+                self._conn.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in rows])
+        return True
+
+    def train_ivf(self, nlist: Optional[int] = None, iterations: int = 10, sample: int = 50000) -> int:
+        """
+        Partition the live rows into `nlist` lists with spherical k-means.
+
+        The centroids and row assignments are written to new files and
+        swapped in, so concurrent readers switch over atomically. Returns the
+        number of lists.
+        """
+        with self._lock:
+            self._refresh()
+            live = np.flatnonzero(self._alive) if self._rows else np.empty(0, dtype=np.int64)
+            nlist = nlist or get_local_index_nlist() or int(4 * np.sqrt(len(live)))
+            nlist = max(1, min(nlist, len(live)))
+            if not len(live):
+                return 0
+            rng = np.random.default_rng(0)
+            training_rows = np.sort(rng.choice(live, size=min(sample, len(live)), replace=False))
+            centroids = spherical_kmeans(np.asarray(self._vectors[training_rows], dtype=np.float32),
+                                         nlist, iterations)
+            assign = nearest_centroids(self._vectors, centroids)
+
+            tmp_assign = f"{self._file(_ASSIGN_FILE)}.tmp"
+            assign.tofile(tmp_assign)
+            os.replace(tmp_assign, self._file(_ASSIGN_FILE))
+            tmp_centroids = f"{self._file(_CENTROIDS_FILE)}.tmp.npy"
+            np.save(tmp_centroids, centroids)
+            os.replace(tmp_centroids, self._file(_CENTROIDS_FILE))
+            self._header["ivf_rows"] = int(self._rows)
+            self._write_header()
+            self._refresh()
+            return nlist
+
+    def train_quantizer(self, sample: int = 50000) -> None:
+        """
+        Train the configured quantizer on live rows and encode every row.
+
+        Codes go to a new codes-<rows>.bin file that the saved quantizer
+        names, so readers never pair a quantizer with another one's codes.
+        """
+        with self._lock:
+            self._refresh()
+            live = np.flatnonzero(self._alive) if self._rows else np.empty(0, dtype=np.int64)
+            if not len(live):
+                return
+            rng = np.random.default_rng(0)
+            training_rows = np.sort(rng.choice(live, size=min(sample, len(live)), replace=False))
+            quantizer = make_quantizer(self.quantization).train(
+                np.asarray(self._vectors[training_rows], dtype=np.float32))
+            quantizer.codes_file = f"codes-{self._rows}.bin"
+
+            with open(self._file(quantizer.codes_file), "wb") as file:
+                for start in range(0, self._rows, _BLOCK_ROWS):
+                    block = np.asarray(self._vectors[start:start + _BLOCK_ROWS], dtype=np.float32)
+                    file.write(quantizer.encode(block).tobytes())
+            previous = self._quantizer.codes_file if self._quantizer is not None else None
+            save_quantizer(quantizer, self._file(_QUANTIZER_FILE))
+            if previous and previous != quantizer.codes_file:
+                # Readers still mapping the old file keep it alive until they remap
+                os.remove(self._file(previous))
+            self._header["quantizer_rows"] = int(self._rows)
+            self._write_header()
+            self._refresh()
+
+    def optimize(self) -> None:
+        """
+        Called after ingestion: (re)train IVF lists and the quantizer when
+        the index has doubled since they were last trained.
+        """
+        with self._lock:
+            self._refresh()
+            if self.mode == "ivf" and self._rows >= _MIN_IVF_ROWS and (
+                    self._centroids is None or self._rows >= 2 * self._header["ivf_rows"]):
+                print(f"Training IVF partitions over {self._rows} vectors...")
+                self.train_ivf()
+            if self.quantization != "none" and self._rows >= _MIN_QUANTIZER_ROWS and (
+                    self._quantizer is None or self._quantizer.kind != self.quantization
+                    or self._rows >= 2 * self._header.get("quantizer_rows", 0)):
+                print(f"Training {self.quantization} quantizer over {self._rows} vectors...")
+                self.train_quantizer()
+
+    # -- reads ----------------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> dict:
+        """Chroma-style {"ids", "documents", "metadatas"} of stored chunks"""
+        with self._lock:
+            if ids is None:
+                rows = self._conn.execute("SELECT id, text, metadata FROM chunks ORDER BY row").fetchall()
+            else:
+                rows = []
+                for start in range(0, len(ids), _SQL_BATCH):
+                    batch = list(ids[start:start + _SQL_BATCH])
+                    placeholders = ",".join("?" * len(batch))
+                    rows.extend(self._conn.execute(
+                        f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", batch))
+        return {
+            "ids": [row[0] for row in rows],
+            "documents": [row[1] for row in rows],
+            "metadatas": [json.loads(row[2]) for row in rows],
+        }
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by IVF list: (rows sorted by list, start offset of every list)"""
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            offsets = np.searchsorted(self._assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = order, offsets
+        return self._lists
+
+    @staticmethod
+    def _candidate_rows(lists: Tuple[np.ndarray, np.ndarray], assigned: int, rows: int,
+                        probes: np.ndarray) -> np.ndarray:
+        order, offsets = lists
+        candidates = [order[offsets[probe]:offsets[probe + 1]] for probe in probes]
+        # Rows appended since the assignment file was last read are always scanned
+        candidates.append(np.arange(assigned, rows))
+        return np.concatenate(candidates)
+
+    def _rescore(self, vectors, query: np.ndarray, candidates: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Exact top-k among candidate rows"""
+        scores = np.asarray(vectors[candidates], dtype=np.float32) @ query
+        return [(int(candidates[i]), float(scores[i])) for i in top_k(scores, k)]
+
+    def _shortlist(self, quantizer, codes, query: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+        """Narrow candidates to the best k * rerank_factor by approximate (code) score"""
+        size = k * self.rerank_factor
+        if quantizer is None or len(candidates) <= size:
+            return candidates
+        coded = candidates[candidates < len(codes)]
+        # Rows appended since the codes were last read have no code yet; keep them
+        uncoded = candidates[candidates >= len(codes)]
+        approx = approximate_scores(quantizer, query[None], codes[coded])[0]
+        return np.concatenate([coded[top_k(approx, size)], uncoded])
+
+    def _filtered_rows(self, filter: dict) -> np.ndarray:
+        """Row numbers of the chunks whose metadata matches the filter"""
+        condition, params = sql_filter(filter)
+        with self._lock:
+            found = self._conn.execute(f"SELECT row FROM chunks WHERE {condition}", params).fetchall()
+        return np.fromiter((row for row, in found), dtype=np.int64, count=len(found))
+
+    def search_vectors(self, query_vectors, k: int, filter: Optional[dict] = None) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, cosine similarity) per query vector, best first"""
+        queries = normalize_rows(query_vectors)
+        filter = normalize_filter(filter)
+        with self._lock:
+            self._refresh()
+            vectors, alive, rows = self._vectors, self._alive, self._rows
+            centroids, assigned = self._centroids, len(self._assign) if self._assign is not None else 0
+            ivf = self.mode == "ivf" and centroids is not None
+            lists = self._inverted_lists() if ivf and filter is None else None
+            quantizer, codes = self._quantizer, self._codes
+        if not rows:
+            return [[] for _ in queries]
+
+        results = []
+        if filter is not None:
+            # Pre-filtered: only the matching rows are scanned, whatever the index size
+            candidates = self._filtered_rows(filter)
+            candidates = candidates[candidates < rows]
+            candidates = candidates[np.asarray(alive[candidates]) == 1]
+            for query in queries:
+                if not len(candidates):
+                    results.append([])
+                    continue
+                shortlist = self._shortlist(quantizer, codes, query, candidates, k)
+                results.append(self._rescore(vectors, query, shortlist, k))
+            return results
+
+        if ivf:
+            probes = np.argsort(-(queries @ centroids.T), axis=1)[:, :self.nprobe]
+            for query, query_probes in zip(queries, probes):
+                candidates = self._candidate_rows(lists, assigned, rows, query_probes)
+                candidates = candidates[alive[candidates] == 1]
+                candidates = self._shortlist(quantizer, codes, query, candidates, k)
+                results.append(self._rescore(vectors, query, candidates, k))
+            return results
+
+        if quantizer is not None:
+            # Scan the codes, then re-score a shortlist at full precision
+            dead = np.asarray(alive[:len(codes)]) == 0
+            approx = approximate_scores(quantizer, queries, codes)
+            approx[:, dead] = -np.inf
+            uncoded = np.flatnonzero(np.asarray(alive[len(codes):]) == 1) + len(codes)
+            for query, query_approx in zip(queries, approx):
+                shortlist = [i for i in top_k(query_approx, k * self.rerank_factor) if np.isfinite(query_approx[i])]
+                candidates = np.concatenate([np.asarray(shortlist, dtype=np.int64), uncoded])
+                results.append(self._rescore(vectors, query, candidates, k))
+            return results
+
+        scores = np.empty((len(queries), rows), dtype=np.float32)
+        for start in range(0, rows, _BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + _BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        scores[:, np.asarray(alive) == 0] = -np.inf
+        for query_scores in scores:
+            best = [i for i in top_k(query_scores, k) if np.isfinite(query_scores[i])]
+            results.append([(int(i), float(query_scores[i])) for i in best])
+        return results
+
+    def memory_footprint(self) -> dict:
+        """Bytes of the arrays a search scans (codes when quantized) and of the full vectors"""
+        with self._lock:
+            self._refresh()
+            vectors = self._vectors.nbytes if self._vectors is not None else 0
+            codes = self._codes.nbytes if self._codes is not None else 0
+            ivf = self._assign.nbytes + self._centroids.nbytes if self._centroids is not None else 0
+        return {"vectors": vectors, "codes": codes, "ivf": ivf, "scanned": (codes or vectors) + ivf}
+
+    def _documents(self, hits: Sequence[Tuple[int, float]]) -> List[Tuple[Document, float]]:
+        if not hits:
+            return []
+        with self._lock:
+            placeholders = ",".join("?" * len(hits))
+            stored = {row: (chunk_id, text, metadata) for row, chunk_id, text, metadata in self._conn.execute(
+                f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({placeholders})",
+                [row for row, _ in hits],
+            )}
+        # A row can be visible before its metadata is committed; skip it
+        return [(Document(id=stored[row][0], page_content=stored[row][1], metadata=json.loads(stored[row][2])), score)
+                for row, score in hits if row in stored]
+
+    def search_many(self, query_vectors, k: int = 4, filter: Optional[dict] = None) -> List[List[Document]]:
+        """Top-k documents for many precomputed query vectors in one pass"""
+        return [[doc for doc, _ in self._documents(hits)] for hits in self.search_vectors(query_vectors, k, filter)]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self._documents(self.search_vectors([embedding], k, filter)[0])
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, path: Optional[str] = None, **kwargs: Any) -> "LocalVectorIndex":
+        if path is None:
+            raise ValueError("LocalVectorIndex.from_texts requires a path")
+        index = cls(path, embedding_function=embedding, **kwargs)
+        index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
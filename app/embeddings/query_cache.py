@@ -0,0 +1,169 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.embeddings.filters import filter_key
+from app.tracing import get_tracer
+
+
+def query_cache_enabled() -> bool:
+    return os.getenv("QUERY_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+def get_query_cache_max_entries() -> int:
+    """Query embeddings and result lists kept (each) before LRU eviction"""
+    return int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def normalize_embedding_query(query: str) -> str:
+    """Whitespace-collapsed only: the embedding model may be cased, so case changes the vector"""
+    return " ".join(query.split())
+
+
+class QueryCache:
+    """
+    In-process LRU caches of query embeddings and retrieval results.
+
+    Embeddings are keyed by (model, whitespace-collapsed query) and stay
+    valid until evicted. Result lists are keyed by (retriever namespace,
+    case-folded query) and tagged with the corpus version they were
+    retrieved at; an entry found under an older version (an ingestion
+    changed the store since) is dropped instead of served. Versions are
+    compared per entry, so tenants with separate corpus versions can share
+    one cache.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or get_query_cache_max_entries()
+        self._embeddings: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[Tuple, str], Tuple[int, List[Document]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _evict(self, entries: OrderedDict) -> None:
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def embedding(self, model: str, query: str) -> Optional[List[float]]:
+        key = (model, normalize_embedding_query(query))
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is None:
+                self.embedding_misses += 1
+            else:
+                self._embeddings.move_to_end(key)
+                self.embedding_hits += 1
+        get_tracer().count("rag_query_cache_total", kind="embedding", result="miss" if vector is None else "hit")
+        return list(vector) if vector is not None else None
+
+    def put_embedding(self, model: str, query: str, vector: List[float]) -> None:
+        with self._lock:
+            self._embeddings[(model, normalize_embedding_query(query))] = list(vector)
+            self._evict(self._embeddings)
+
+    def results(self, namespace: Tuple, query: str, version: int) -> Optional[List[Document]]:
+        key = (namespace, normalize_query(query))
+        with self._lock:
+            entry = self._results.get(key)
+            docs = None
+            if entry is not None and entry[0] != version:
+                del self._results[key]
+                self.invalidations += 1
+            elif entry is not None:
+                docs = entry[1]
+            if docs is None:
+                self.result_misses += 1
+            else:
+                self._results.move_to_end(key)
+                self.result_hits += 1
+        get_tracer().count("rag_query_cache_total", kind="results", result="miss" if docs is None else "hit")
+        return list(docs) if docs is not None else None
+
+    def put_results(self, namespace: Tuple, query: str, version: int, docs: List[Document]) -> None:
+        with self._lock:
+            self._results[(namespace, normalize_query(query))] = (version, list(docs))
+            self._evict(self._results)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._embeddings.clear()
+            self._results.clear()
+
+    def stats(self) -> dict:
+        lookups = self.result_hits + self.result_misses
+        return {
+            "embeddings": len(self._embeddings),
+            "results": len(self._results),
+            "embedding_hits": self.embedding_hits,
+            "embedding_misses": self.embedding_misses,
+            "result_hits": self.result_hits,
+            "result_misses": self.result_misses,
+            "hit_rate": self.result_hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Serves repeated questions from a QueryCache in front of another retriever.
+
+    `namespace` identifies the wrapped retriever's configuration (tenant,
+    store, mode, k) so differently configured retrievers never share
+    results; `corpus_version` returns the current corpus generation. A
+    metadata `filter` passed to invoke is forwarded and part of the key.
+    """
+
+    retriever: Any
+    cache: Any
+    namespace: Tuple
+    corpus_version: Callable[[], int]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                filter: Optional[dict] = None) -> List[Document]:
+        namespace, version = self.namespace + filter_key(filter), self.corpus_version()
+        docs = self.cache.results(namespace, query, version)
+        get_tracer().current_span().set(result_cache_hit=docs is not None)
+        if docs is None:
+            kwargs = {"filter": filter} if filter else {}
+            docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()}, **kwargs)
+            self.cache.put_results(namespace, query, version, docs)
+        return docs
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       filter: Optional[dict] = None) -> List[Document]:
+        namespace, version = self.namespace + filter_key(filter), self.corpus_version()
+        docs = self.cache.results(namespace, query, version)
+        get_tracer().current_span().set(result_cache_hit=docs is not None)
+        if docs is None:
+            kwargs = {"filter": filter} if filter else {}
+            docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}, **kwargs)
+            self.cache.put_results(namespace, query, version, docs)
+        return docs
+
+
+_query_cache: Optional[QueryCache] = None
+_query_cache_lock = threading.Lock()
+
+def get_query_cache() -> Optional[QueryCache]:
+    """Process-wide query cache shared by every session, or None when QUERY_CACHE_ENABLED is off"""
+    global _query_cache
+    if not query_cache_enabled():
+        return None
+    with _query_cache_lock:
+        if _query_cache is None or _query_cache.max_entries != get_query_cache_max_entries():
+            _query_cache = QueryCache()
+        return _query_cache
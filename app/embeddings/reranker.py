@@ -0,0 +1,179 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+
+def rerank_enabled() -> bool:
+    return os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+
+def get_reranker_model() -> str:
+    return os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+def get_rerank_candidates() -> int:
+    """Number of candidates retrieved for the reranker to choose from"""
+    return int(os.getenv("RERANK_CANDIDATES", "20"))
+
+def get_rerank_top_n() -> int:
+    """Number of reranked chunks passed on to generation"""
+    return int(os.getenv("RERANK_TOP_N", "3"))
+
+def get_rerank_batch_size() -> int:
+    return int(os.getenv("RERANK_BATCH_SIZE", "32"))
+
+def get_rerank_cache_path() -> str:
+    return os.getenv("RERANK_CACHE_PATH", "./.cache/rerank_cache.sqlite")
+
+def get_rerank_cache_max_rows() -> int:
+    """Number of scores kept in the rerank cache before the least recently used are evicted"""
+    return int(os.getenv("RERANK_CACHE_MAX_ROWS", "500000"))
+
+
+def pair_hash(query: str, text: str) -> str:
+    # Only spacing is normalized: the cross-encoder sees case, so differently cased queries can score differently
+    digest = hashlib.sha256(" ".join(query.split()).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RerankCache:
+    """
+    Persistent, row-bounded LRU cache of (model, query + chunk hash) ->
+    cross-encoder score.
+
+    The row count is tracked as rows are written and evicted. Once it goes
+    over `max_rows` the table is counted exactly (other processes may share
+    the file) and the least recently used scores are evicted down to
+    EVICT_TO of the cap, so the full count runs rarely.
+    """
+
+    _LOOKUP_BATCH = 500
+    EVICT_TO = 0.9
+
+    def __init__(self, path: Optional[str] = None, max_rows: Optional[int] = None):
+        self.path = path or get_rerank_cache_path()
+        self.max_rows = max_rows if max_rows is not None else get_rerank_cache_max_rows()
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                " model TEXT NOT NULL, pair_hash TEXT NOT NULL, score REAL NOT NULL,"
+                " last_used REAL NOT NULL DEFAULT 0, PRIMARY KEY (model, pair_hash))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(scores)")}
+            if "last_used" not in columns:
+                # Caches written before eviction existed; their rows are evicted first
+                self._conn.execute("ALTER TABLE scores ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores(last_used)")
+            self._rows = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, float]:
+        found: Dict[str, float] = {}
+        with self._lock:
+            for start in range(0, len(hashes), self._LOOKUP_BATCH):
+                batch = hashes[start:start + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT pair_hash, score FROM scores WHERE model = ? AND pair_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    with self._conn:
+                        self._conn.execute(
+                            f"UPDATE scores SET last_used = ? WHERE model = ? AND pair_hash IN ({placeholders})",
+                            [time.time(), model, *batch],
+                        )
+        return found
+
+    def put_many(self, model: str, items: Dict[str, float]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            # A row already present was written concurrently for the same pair and holds the same score
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO scores (model, pair_hash, score, last_used) VALUES (?, ?, ?, ?)",
+                [(model, key, score, now) for key, score in items.items()],
+            ).rowcount
+            self._rows += max(0, inserted)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used scores once the cache holds more than max_rows"""
+        if self._rows <= self.max_rows:
+            return
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        if self._rows <= self.max_rows:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY last_used LIMIT ?)",
+            (self._rows - int(self.max_rows * self.EVICT_TO),),
+        ).rowcount
+        self._rows -= deleted
+        self.evictions += deleted
+
+
+class CrossEncoderReranker:
+    """
+    Reranks retrieved chunks with a small local cross-encoder on CPU.
+
+    Only (query, chunk) pairs missing from the score cache are run through
+    the model, in RERANK_BATCH_SIZE batches.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 cache: Optional[RerankCache] = None):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name or get_reranker_model()
+        self.batch_size = batch_size or get_rerank_batch_size()
+        self.cache = cache if cache is not None else RerankCache()
+        self._model = CrossEncoder(self.model_name, device="cpu")
+        self._lock = threading.Lock()
+        self.stats = {"pairs": 0, "cache_hits": 0, "computed": 0}
+
+    def score(self, query: str, documents: Sequence[Document]) -> List[float]:
+        hashes = [pair_hash(query, doc.page_content) for doc in documents]
+        scores = self.cache.get_many(self.model_name, list(dict.fromkeys(hashes)))
+        missing = {key: doc.page_content for key, doc in zip(hashes, documents) if key not in scores}
+        if missing:
+            # CrossEncoder is not safe to call from several threads at once
+            with self._lock:
+                computed = self._model.predict([(query, text) for text in missing.values()],
+                                               batch_size=self.batch_size, show_progress_bar=False)
+            fresh = {key: float(value) for key, value in zip(missing, computed)}
+            self.cache.put_many(self.model_name, fresh)
+            scores.update(fresh)
+        self.stats["pairs"] += len(hashes)
+        self.stats["computed"] += len(missing)
+        self.stats["cache_hits"] += len(hashes) - len(missing)
+        return [scores[key] for key in hashes]
+
+    def rerank(self, query: str, documents: Sequence[Document], top_n: Optional[int] = None) -> List[Document]:
+        """Return the top_n documents by cross-encoder score, best first"""
+        top_n = top_n or get_rerank_top_n()
+        if not documents:
+            return []
+        scores = self.score(query, documents)
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        return [documents[i] for i in order[:top_n]]
+
+
+_rerankers: Dict[str, CrossEncoderReranker] = {}
+_rerankers_lock = threading.Lock()
+
+def get_reranker(model_name: Optional[str] = None) -> CrossEncoderReranker:
+    """Return the process-wide reranker for a model, loading it on first use"""
+    model_name = model_name or get_reranker_model()
+    with _rerankers_lock:
+        if model_name not in _rerankers:
+            _rerankers[model_name] = CrossEncoderReranker(model_name)
+        return _rerankers[model_name]
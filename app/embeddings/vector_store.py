@@ -1,36 +1,249 @@
+import functools
 import os
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-
-def get_embedding_model():
-    """Get the embedding model name from environment variables"""
-    return os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-V2")
+import re
+import shutil
+from typing import List, Optional, Sequence
+from langchain_core.documents import Document
+from app.embeddings.bm25 import BM25Index
+from app.embeddings.embedder import get_embedding_model, get_embeddings
+from app.embeddings.filters import chroma_where, normalize_filter
+from app.embeddings.hybrid import DenseRetriever, HybridRetriever, reciprocal_rank_fusion
+from app.embeddings.query_cache import CachedRetriever, get_query_cache
+from app.tracing import get_tracer, traced
 
 def get_retriever_k():
     """Get the number of documents to retrieve from environment variables"""
     return int(os.getenv("RETRIEVER_K", "5"))
 
-def build_vector_store(docs):
-    embeddings = HuggingFaceEmbeddings(
-        model_name=get_embedding_model()
-    )
+def get_persist_directory():
+    """Get the vector store directory from environment variables"""
+    return os.getenv("VECTOR_DB_DIR", "./vector_db")
 
-    db = Chroma.from_documents(
-        docs,
-        embeddings,
-        persist_directory ='./vector_db'
-    )
+def get_retrieval_mode():
+    """Get the retrieval mode ('hybrid' or 'dense') from environment variables"""
+    return os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+
+def get_vector_backend():
+    """Get the vector store backend ('chroma' or 'local') from environment variables"""
+    return os.getenv("VECTOR_BACKEND", "chroma").lower()
+
+def get_hybrid_fetch_k():
+    """Get the number of candidates each retriever contributes to fusion"""
+    return int(os.getenv("HYBRID_FETCH_K", "20"))
+
+DEFAULT_TENANT = "default"
+# Usable as a directory name and, prefixed, as a Chroma collection name
+_TENANT_RE = re.compile(r'^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,46}[A-Za-z0-9])?$')
+
+def get_tenant(tenant: Optional[str] = None) -> str:
+    """Resolve a tenant (corpus) name, defaulting to RAG_TENANT"""
+    tenant = tenant or os.getenv("RAG_TENANT", DEFAULT_TENANT)
+    if not _TENANT_RE.match(tenant):
+        raise ValueError(f"Invalid tenant name: {tenant!r}. Use up to 48 letters, digits, '-' or '_'")
+    return tenant
+
+def get_tenant_directory(tenant: Optional[str] = None) -> str:
+    """
+    Directory holding a tenant's manifest, BM25 index, corpus version and
+    local index. The default tenant keeps the original layout directly
+    under VECTOR_DB_DIR, so existing stores load unchanged.
+    """
+    tenant = get_tenant(tenant)
+    if tenant == DEFAULT_TENANT:
+        return get_persist_directory()
+    return os.path.join(get_persist_directory(), "tenants", tenant)
+
+def get_collection_name(tenant: Optional[str] = None) -> str:
+    """Chroma collection of a tenant ("langchain", Chroma's default, for the default tenant)"""
+    tenant = get_tenant(tenant)
+    return "langchain" if tenant == DEFAULT_TENANT else f"tenant_{tenant}"
+
+def delete_tenant(tenant: str) -> None:
+    """
+    Delete a tenant's corpus: its Chroma collection and its directory
+    (manifest, BM25 index, corpus version and local index).
+
+    The default tenant shares VECTOR_DB_DIR with the others and cannot be
+    deleted this way; use --rebuild.
+    """
+    if not tenant or get_tenant(tenant) == DEFAULT_TENANT:
+        raise ValueError("The default tenant cannot be deleted; use --rebuild to wipe the store")
+    if os.path.exists(os.path.join(get_persist_directory(), "chroma.sqlite3")):
+        from langchain_community.vectorstores import Chroma
+
+        Chroma(collection_name=get_collection_name(tenant),
+               persist_directory=get_persist_directory()).delete_collection()
+    shutil.rmtree(get_tenant_directory(tenant), ignore_errors=True)
+    # A re-created tenant restarts at corpus version 0, which results cached for the old corpus could match
+    cache = get_query_cache()
+    if cache is not None:
+        cache.clear()
+
+def _corpus_version_path(tenant: Optional[str] = None):
+    return os.path.join(get_tenant_directory(tenant), "corpus_version")
+
+def get_corpus_version(tenant: Optional[str] = None):
+    """
+    Generation counter of a tenant's indexed corpus.
+
+    Ingestion bumps it whenever chunks are added or removed, so caches keyed
+    on it never serve results computed against an older corpus.
+    """
+    try:
+        with open(_corpus_version_path(tenant), 'r') as file:
+            return int(file.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def bump_corpus_version(tenant: Optional[str] = None):
+    """Increment a tenant's corpus generation counter and return the new value"""
+    version = get_corpus_version(tenant) + 1
+    os.makedirs(get_tenant_directory(tenant), exist_ok=True)
+    tmp_path = f"{_corpus_version_path(tenant)}.tmp"
+    with open(tmp_path, 'w') as file:
+        file.write(str(version))
+    os.replace(tmp_path, _corpus_version_path(tenant))
+    return version
+
+@traced("ingest.build_vector_store")
+def build_vector_store(docs, ids=None, tenant: Optional[str] = None):
+    db = load_vector_store(tenant)
+    db.add_documents(docs, ids=ids)
     return db
 
 
-def load_vector_store():
-    """Load existing vector store from disk"""
-    embeddings = HuggingFaceEmbeddings(
-        model_name=get_embedding_model()
-    )
-    
+def load_vector_store(tenant: Optional[str] = None):
+    """
+    Load a tenant's vector store from disk (created empty if missing).
+
+    VECTOR_BACKEND=chroma (default) uses the tenant's collection in the
+    Chroma store under VECTOR_DB_DIR; VECTOR_BACKEND=local uses the
+    memory-mapped LocalVectorIndex in <tenant directory>/local_index.
+    Tenants never share a collection or index, so a search only ever scans
+    its own tenant's chunks.
+    """
+    embeddings = get_embeddings()
+
+    if get_vector_backend() == "local":
+        from app.embeddings.local_index import LocalVectorIndex
+
+        return LocalVectorIndex(os.path.join(get_tenant_directory(tenant), "local_index"),
+                                embedding_function=embeddings)
+
+    from langchain_community.vectorstores import Chroma
+
     db = Chroma(
-        persist_directory='./vector_db',
+        collection_name=get_collection_name(tenant),
+        persist_directory=get_persist_directory(),
         embedding_function=embeddings
     )
-    return db
\ No newline at end of file
+    return db
+
+
+def _chroma_collection(db):
+    """
+    The chromadb collection behind a langchain Chroma store.
+
+    Chroma's langchain wrapper has no public count or multi-vector query, so
+    the two operations that need them reach the underlying collection
+    through this one adapter rather than through `db._collection` at each
+    call site; update it if langchain_community renames the attribute.
+    """
+    return db._collection
+
+
+def count_vectors(db) -> int:
+    """Number of chunks stored in a vector store of either backend"""
+    return db.count() if hasattr(db, "count") else _chroma_collection(db).count()
+
+
+def _dense_search_many(db, query_vectors, k: int, filter: Optional[dict] = None) -> List[List[Document]]:
+    if hasattr(db, "search_many"):
+        return db.search_many(query_vectors, k, filter=filter)
+    where = {"where": chroma_where(filter)} if filter else {}
+    found = _chroma_collection(db).query(
+        query_embeddings=[list(vector) for vector in query_vectors],
+        n_results=k,
+        include=["documents", "metadatas"],
+        **where,
+    )
+    return [
+        [Document(id=chunk_id, page_content=text, metadata=metadata or {})
+         for chunk_id, text, metadata in zip(ids, texts, metadatas)]
+        for ids, texts, metadatas in zip(found["ids"], found["documents"], found["metadatas"])
+    ]
+
+
+def load_bm25_index(tenant: Optional[str] = None):
+    """Load the BM25 index kept alongside a tenant's vector store"""
+    return BM25Index(os.path.join(get_tenant_directory(tenant), "bm25.sqlite"))
+
+
+def get_retriever(db, k=None, cache=None, tenant: Optional[str] = None):
+    """
+    Build the retriever used by the RAG graph over a tenant's store `db`.
+
+    RETRIEVAL_MODE=hybrid (default) fuses dense similarity and BM25 with
+    reciprocal rank fusion; RETRIEVAL_MODE=dense uses the vector store alone.
+    Either accepts a metadata filter per call, `invoke(query, filter=...)`
+    (see app.embeddings.filters), applied before ranking.
+
+    Results are served from the process-wide query cache (or `cache`) while
+    the tenant's corpus version is unchanged; QUERY_CACHE_ENABLED=false
+    disables it.
+    """
+    k = k or get_retriever_k()
+    tenant = get_tenant(tenant)
+    mode = get_retrieval_mode()
+    if mode == "dense":
+        retriever = DenseRetriever(vector_store=db, k=k)
+        fetch_k = k
+    else:
+        fetch_k = max(k, get_hybrid_fetch_k())
+        retriever = HybridRetriever(
+            vector_store=db,
+            bm25=load_bm25_index(tenant),
+            k=k,
+            fetch_k=fetch_k,
+        )
+    cache = cache or get_query_cache()
+    if cache is None:
+        return retriever
+    return CachedRetriever(
+        retriever=retriever,
+        cache=cache,
+        namespace=(get_persist_directory(), tenant, get_vector_backend(), get_embedding_model(), mode, k, fetch_k),
+        corpus_version=functools.partial(get_corpus_version, tenant),
+    )
+
+
+def retrieve_many(db, queries: Sequence[str], query_vectors: Sequence[List[float]],
+                  k: Optional[int] = None, tenant: Optional[str] = None,
+                  filter: Optional[dict] = None) -> List[List[Document]]:
+    """
+    Retrieve for many queries at once, matching get_retriever's results.
+
+    Dense search runs as a single vector store query over all the
+    precomputed query vectors instead of one embedding and one query per
+    question; in hybrid mode each result list is fused with the BM25 results
+    as usual. `filter` applies to every query.
+    """
+    k = k or get_retriever_k()
+    if not queries:
+        return []
+    tracer = get_tracer()
+    filter = normalize_filter(filter)
+    hybrid = get_retrieval_mode() != "dense"
+    fetch_k = max(k, get_hybrid_fetch_k()) if hybrid else k
+    bm25 = load_bm25_index(tenant) if hybrid else None
+    results = []
+    with tracer.span("retrieve.dense_many", queries=len(queries)):
+        dense_results = _dense_search_many(db, query_vectors, fetch_k, filter)
+    for query, dense in zip(queries, dense_results):
+        if bm25 is None:
+            results.append(dense)
+        else:
+            with tracer.span("retrieve.bm25"):
+                sparse = [doc for doc, _ in bm25.search(query, k=fetch_k, filter=filter)]
+            results.append(reciprocal_rank_fusion([dense, sparse], k=k))
+    return results
@@ -0,0 +1,167 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from operator import mul
+from typing import List, Optional, Tuple
+
+from app.embeddings.bm25 import tokenize
+from app.embeddings.embedder import get_embeddings
+from app.embeddings.vector_store import get_corpus_version
+
+
+def answer_cache_enabled() -> bool:
+    return os.getenv("ANSWER_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+def get_answer_cache_threshold() -> float:
+    """Minimum cosine similarity for a paraphrased question to reuse an answer"""
+    return float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+def get_answer_cache_ttl() -> float:
+    """Seconds a cached answer stays valid"""
+    return float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+def get_answer_cache_max_entries() -> int:
+    return int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _identifiers(question: str) -> frozenset:
+    # Tokens containing digits (IDs, versions, dates). Embeddings barely
+    # separate "ALPHA-999-BETA" from "ALPHA-998-BETA", so paraphrase matches
+    # must agree on these exactly.
+    return frozenset(token for token in tokenize(question) if any(char.isdigit() for char in token))
+
+
+class SemanticAnswerCache:
+    """
+    Cache of validated answers in front of the compiled RAG graph.
+
+    Lookups first try the normalized question text, then the most similar
+    cached question embedding above `threshold`. Entries expire after `ttl`
+    seconds, the least recently used entry is evicted beyond `max_entries`,
+    and everything is dropped when the corpus version of `tenant` changes
+    (i.e. after an ingestion modified its store). Each tenant gets its own
+    cache; questions asked with a metadata filter are keyed by that filter
+    too (`scope`), so they never reuse answers drawn from other chunks.
+
+    Callers read `corpus_version()` before running the graph and pass it to
+    put(): an answer whose context was retrieved before an ingestion that
+    finished meanwhile is not stored under the new version.
+    """
+
+    def __init__(self, embeddings=None, threshold: Optional[float] = None, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None, tenant: Optional[str] = None):
+        self.embeddings = embeddings
+        self.tenant = tenant
+        self.threshold = threshold if threshold is not None else get_answer_cache_threshold()
+        self.ttl = ttl if ttl is not None else get_answer_cache_ttl()
+        self.max_entries = max_entries or get_answer_cache_max_entries()
+        self._entries: "OrderedDict[Tuple[Tuple, str], dict]" = OrderedDict()
+        self._version = get_corpus_version(tenant)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def corpus_version(self) -> int:
+        """The tenant's corpus version, to read before retrieving the context of an answer to put()"""
+        return get_corpus_version(self.tenant)
+
+    def embed(self, question: str) -> List[float]:
+        embeddings = self.embeddings or get_embeddings()
+        return _unit(embeddings.embed_query(question))
+
+    def _check_version(self) -> None:
+        version = get_corpus_version(self.tenant)
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, question: str, vector: List[float], scope: Tuple = ()) -> Optional[str]:
+        """Return a cached answer for the question (or a close paraphrase) within `scope`, if any"""
+        key = (scope, normalize_question(question))
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            for stale_key in [k for k, entry in self._entries.items() if now - entry["created"] > self.ttl]:
+                del self._entries[stale_key]
+
+            entry = self._entries.get(key)
+            if entry is None:
+                identifiers = _identifiers(question)
+                best_score = self.threshold
+                for candidate_key, candidate in self._entries.items():
+                    if candidate_key[0] != scope or candidate["identifiers"] != identifiers:
+                        continue
+                    score = sum(map(mul, vector, candidate["vector"]))
+                    if score >= best_score:
+                        best_score, key, entry = score, candidate_key, candidate
+                if entry is not None:
+                    self.semantic_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["answer"]
+
+    def put(self, question: str, vector: List[float], answer: str, scope: Tuple = (), *, version: int) -> None:
+        """Cache an answer built from the corpus at `version` (see corpus_version), unless it has changed since"""
+        key = (scope, normalize_question(question))
+        with self._lock:
+            self._check_version()
+            if version != self._version:
+                self.stale_puts += 1
+                return
+            self._entries[key] = {
+                "vector": vector,
+                "answer": answer,
+                "identifiers": _identifiers(question),
+                "created": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+
+def is_cacheable(result: dict) -> bool:
+    """
+    Only answers that actually passed validation are cached. The validator
+    force-accepts the answer once the retry limit (3) is reached, so those
+    are excluded.
+    """
+    return bool(result.get("validated")) and result.get("retries", 0) < 3 and bool(result.get("final_answer"))
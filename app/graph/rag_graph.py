@@ -1,30 +1,32 @@
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
-from app.agents.retriever import retriever_agent
-from app.agents.generator import generator_agent
-from app.agents.validator import validator_agent
+from app.agents.retriever import retriever_agent, aretriever_agent
+from app.agents.generator import generator_agent, agenerator_agent
+from app.agents.validator import validator_agent, avalidator_agent
+from app.agents.context import context_agent
+from app.agents.reranker import rerank_agent, arerank_agent
 from app.agents.responder import responder_agent
 from app.state import AgentState
+from app.tracing import traced
 
-def build_graph(retriever, llm):
-    graph = StateGraph(AgentState)
-    
-    graph.add_node("retrieve", lambda state: retriever_agent(state, retriever))
-    graph.add_node("generate", lambda state: generator_agent(state, llm))
-    graph.add_node("validate", lambda state: validator_agent(state, llm))
-    graph.add_node("respond", responder_agent)
+def routing_logic(state):
+    if state["validated"]:
+        return "respond"
+    if state.get("retries",0)< 3:
+        return "generate"
+    return "respond"
 
+def _add_edges(graph: StateGraph, rerank: bool = False):
     graph.set_entry_point("retrieve")
-    graph.add_edge("retrieve", "generate")
+    if rerank:
+        graph.add_edge("retrieve", "rerank")
+        graph.add_edge("rerank", "assemble")
+    else:
+        graph.add_edge("retrieve", "assemble")
+    graph.add_edge("assemble", "generate")
     graph.add_edge("generate", "validate")
 
-    def routing_logic(state):
-        if state["validated"]:
-            return "respond"
-        if state.get("retries",0)< 3:
-            return "generate"
-        return "respond"
-
     graph.add_conditional_edges(
         "validate",
         routing_logic,
@@ -36,4 +38,61 @@ def build_graph(retriever, llm):
 
     graph.add_edge("respond", END)
 
-    return graph.compile()
\ No newline at end of file
+def build_graph(retriever, llm, reranker=None):
+    """
+    Compile the RAG graph.
+
+    With a reranker (see app.embeddings.reranker), a rerank node between
+    retrieve and assemble narrows the retriever's wider candidate set down
+    to RERANK_TOP_N chunks.
+
+    Every node runs in a "node.<name>" span (see app.tracing).
+    """
+    graph = StateGraph(AgentState)
+    
+    graph.add_node("retrieve", traced("node.retrieve")(lambda state: retriever_agent(state, retriever)))
+    if reranker is not None:
+        graph.add_node("rerank", traced("node.rerank")(lambda state: rerank_agent(state, reranker)))
+    graph.add_node("assemble", traced("node.assemble")(context_agent))
+    graph.add_node("generate", traced("node.generate")(lambda state: generator_agent(state, llm)))
+    graph.add_node("validate", traced("node.validate")(lambda state: validator_agent(state, llm)))
+    graph.add_node("respond", traced("node.respond")(responder_agent))
+
+    _add_edges(graph, rerank=reranker is not None)
+
+    return graph.compile()
+
+def build_async_graph(retriever, llm, reranker=None):
+    """
+    Same graph as build_graph, with coroutine nodes for ainvoke/astream.
+
+    Nodes await the retriever and LLM instead of blocking, so one event loop
+    can serve many concurrent questions. The node config is forwarded to
+    every call so astream(stream_mode="messages") yields generator tokens
+    as they arrive.
+    """
+    graph = StateGraph(AgentState)
+
+    async def retrieve(state: AgentState, config: RunnableConfig):
+        return await aretriever_agent(state, retriever, config)
+
+    async def rerank(state: AgentState):
+        return await arerank_agent(state, reranker)
+
+    async def generate(state: AgentState, config: RunnableConfig):
+        return await agenerator_agent(state, llm, config)
+
+    async def validate(state: AgentState, config: RunnableConfig):
+        return await avalidator_agent(state, llm, config)
+
+    graph.add_node("retrieve", traced("node.retrieve")(retrieve))
+    if reranker is not None:
+        graph.add_node("rerank", traced("node.rerank")(rerank))
+    graph.add_node("assemble", traced("node.assemble")(context_agent))
+    graph.add_node("generate", traced("node.generate")(generate))
+    graph.add_node("validate", traced("node.validate")(validate))
+    graph.add_node("respond", traced("node.respond")(responder_agent))
+
+    _add_edges(graph, rerank=reranker is not None)
+
+    return graph.compile()
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+
+def message_text(content) -> str:
+    """Text of a message or chunk whose content may be a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content or []:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running forever on a daemon thread.
+
+    Lets synchronous callers (Streamlit reruns, scripts) drive coroutines and
+    async generators on one long-lived loop, so async LLM clients bound to
+    that loop can be reused across calls.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-rag-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the loop and block until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        """
+        Consume an async generator from synchronous code, item by item. If
+        the consumer stops early (closes this generator), the async generator
+        is closed on the loop too, so its spans and graph run finish.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
+
+_background_loop: Optional[BackgroundLoop] = None
+_background_loop_lock = threading.Lock()
+
+def get_background_loop() -> BackgroundLoop:
+    """Return the process-wide background event loop, starting it on first use"""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundLoop()
+        return _background_loop
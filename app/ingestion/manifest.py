@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from app.embeddings.vector_store import get_tenant_directory
+
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+# Version of the chunking and chunk metadata; entries written by an older
+# version are re-chunked on the next ingestion even if the file is unchanged
+CHUNK_SCHEMA = 4
+
+
+def normalize_source(path: str) -> str:
+    """
+    Canonical manifest key for a document path: absolute, so the same file
+    reached through different relative paths (or from another working
+    directory) is one document
+    """
+    return os.path.abspath(path)
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 of a file's content, streamed in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_stream(digest, obj) -> None:
+    """Feed the decoded data of a PDF stream object (if any) into the digest"""
+    try:
+        digest.update(obj.get_object().get_data())
+    except Exception:
+        digest.update(repr(obj).encode("utf-8"))
+
+
+def hash_pages(path: str) -> List[str]:
+    """
+    Return one fingerprint per page of a PDF.
+
+    A page fingerprint covers its content stream and the XObjects it draws
+    (scanned pages are a single image XObject, so the image data must be
+    part of the hash). Two files whose bytes differ only in document-level
+    metadata produce identical page fingerprints.
+    """
+    from pypdf import PdfReader
+
+    page_hashes = []
+    with open(path, 'rb') as file:
+        reader = PdfReader(file)
+        for page in reader.pages:
+            digest = hashlib.sha256()
+            contents = page.get_contents()
+            if contents is not None:
+                _hash_stream(digest, contents)
+
+            resources = page.get("/Resources")
+            xobjects = resources.get_object().get("/XObject") if resources else None
+            if xobjects:
+                xobjects = xobjects.get_object()
+                for name in sorted(xobjects.keys()):
+                    digest.update(name.encode("utf-8"))
+                    _hash_stream(digest, xobjects[name])
+
+            page_hashes.append(digest.hexdigest())
+    return page_hashes
+
+
+def is_current(entry: Optional[dict]) -> bool:
+    """
+    Whether a manifest entry's chunks were written with the current
+    CHUNK_SCHEMA from a complete extraction (see IngestionManifest.update)
+    """
+    return entry is not None and entry.get("chunk_schema", 1) == CHUNK_SCHEMA and entry.get("complete", True)
+
+
+def chunk_ids(source: str, chunks) -> List[str]:
+    """
+    Build deterministic IDs for a document's chunks.
+
+    IDs depend only on the source, the page and the chunk text, so chunks
+    that survive an edit on the same page keep their ID (and their stored
+    embedding), while a chunk whose text moved to another page is rewritten
+    with its new page metadata. Repeated chunk text within one document gets
+    an occurrence suffix to stay unique.
+    """
+    seen: Dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        page = chunk.metadata.get("page", "")
+        base = hashlib.sha256(f"{source}\0{page}\0{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        ids.append(base if occurrence == 0 else f"{base}-{occurrence}")
+    return ids
+
+
+class IngestionManifest:
+    """
+    Record of what has been ingested into the vector store.
+
+    Keyed by source path. Each entry stores the file content hash, the
+    per-page fingerprints and the IDs of the chunks written to the store,
+    which is what incremental ingestion needs to skip, diff or prune a
+    document. Each tenant has its own manifest inside its directory under
+    the persist directory, so wiping the store also wipes the manifest.
+    """
+
+    def __init__(self, path: Optional[str] = None, tenant: Optional[str] = None):
+        self.path = path or os.path.join(get_tenant_directory(tenant), MANIFEST_FILENAME)
+        self.entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                documents = json.load(file).get("documents", {})
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable ingestion manifest {self.path}: {e}")
+            return {}
+
+        # Manifests written with relative keys: resolve them against the working directory, and
+        # merge keys naming the same file so the next ingestion deletes both sets of chunks
+        entries: Dict[str, dict] = {}
+        for source, entry in documents.items():
+            key = normalize_source(source)
+            if key in entries:
+                merged = entries[key]
+                merged["chunk_ids"] = list(dict.fromkeys(merged["chunk_ids"] + entry["chunk_ids"]))
+                merged["complete"] = False
+            else:
+                entries[key] = entry
+        return entries
+
+    def get(self, source: str) -> Optional[dict]:
+        return self.entries.get(source)
+
+    def update(self, source: str, file_hash: str, page_hashes: List[str], ids: List[str],
+               chunk_schema: int = CHUNK_SCHEMA, complete: bool = True) -> None:
+        """
+        Record a document's chunks. An incomplete entry (OCR failed on some
+        pages, or nothing could be extracted) keeps its chunks searchable but
+        is never current, so the next ingestion extracts the document again.
+        """
+        self.entries[source] = {
+            "file_hash": file_hash,
+            "page_hashes": page_hashes,
+            "chunk_ids": ids,
+            "chunk_schema": chunk_schema,
+            "complete": complete,
+        }
+
+    def remove(self, source: str) -> Optional[dict]:
+        return self.entries.pop(source, None)
+
+    def missing_sources(self) -> List[str]:
+        """Sources recorded in the manifest whose file no longer exists"""
+        return [source for source in self.entries if not os.path.exists(source)]
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"version": 1, "documents": self.entries}, file, indent=2)
+        os.replace(tmp_path, self.path)
@@ -1,11 +1,10 @@
 import os
-import pytesseract
-import base64
-import requests
 from dotenv import load_dotenv
-from typing import Optional
-from PIL import Image
 import io
+from typing import List, Optional, Sequence, Tuple
+from .ocr_cache import OCRCache, get_ocr_cache
+from .ocr_transport import OCRTransport, get_ocr_transport
+from app.tracing import get_tracer
 
 
 load_dotenv()
@@ -21,20 +20,45 @@ class DeepSeekOCRClient:
     - API_ENDPOINT: DeepSeek OCR API(simplismart) endpoint URL
     - DEFAULT_HEADERS_ID : Header ID from simplismart
     - extract_text(): Main method that calls DeepSeek OCR API
+
+    Results are memoized in the persistent OCRCache, keyed by the page image
+    bytes and the backend identity (see backend_id()).
+
+    API calls go through the process-wide OCRTransport (pooled connections,
+    rate limiting, retries with backoff, deadlines; see ocr_transport).
     """
+
+    MODEL = OCRTransport.MODEL
     
-    def __init__(self, api_key: Optional[str] = None, api_endpoint: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, api_endpoint: Optional[str] = None,
+                 cache: Optional[OCRCache] = None):
         """
         Initialize DeepSeek OCR Client.
         
         Args:
             api_key: DeepSeek API key. If None, reads from DEEPSEEK_API_KEY env var.
             api_endpoint: DeepSeek OCR API endpoint. If None, uses default endpoint.
+            cache: OCR result cache. If None, uses the process-wide cache (if enabled).
         """
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         self.api_endpoint = api_endpoint or os.getenv(
             "DEEPSEEK_OCR_ENDPOINT" 
         )
+        self._cache = cache
+        self._tesseract_version = None
+
+    @property
+    def cache(self) -> Optional[OCRCache]:
+        return self._cache if self._cache is not None else get_ocr_cache()
+
+    def backend_id(self, backend: str) -> str:
+        """Identity of an OCR backend + model, used in cache keys"""
+        if backend == "deepseek":
+            return f"deepseek:{self.MODEL}"
+        if self._tesseract_version is None:
+            pytesseract = self._configure_tesseract()
+            self._tesseract_version = str(pytesseract.get_tesseract_version())
+        return f"tesseract:{self._tesseract_version}"
     
     def extract_text(self, image_bytes: bytes) -> str:
         """
@@ -43,31 +67,106 @@ class DeepSeekOCRClient:
         This is the main integration point for DeepSeek OCR API.
         
         Args:
-            image_bytes: Image data as bytes (e.g., from PIL Image.tobytes())
+            image_bytes: Encoded image data as bytes (e.g., PNG)
             
         Returns:
             Extracted text as string
         """
+        return self.extract_text_cached(image_bytes)[0]
 
-        if self.api_key:
-            try:
-                return self._real_api_extract_text(image_bytes)
-            except Exception as e:
-                print(f"DeepSeek API failed, falling back to Tesseract: {e}")
-                return self._mocked_extract_text(image_bytes)
-
-        print("No API Key found. Using local Tesseract.")
-        
-        return self._mocked_extract_text(image_bytes)
+    def extract_text_cached(self, image_bytes: bytes) -> Tuple[str, bool]:
+        """
+        Same as extract_text, also reporting whether the result came from the cache.
 
-       
-        
-    def _mocked_extract_text(self, image_bytes: bytes) -> str:
+        Returns:
+            Tuple of (extracted text, cache hit)
         """
-        This method simulates OCR output when DeepSeek OCR API is unavailable.
+        tracer = get_tracer()
+        with tracer.span("ocr.page", bytes=len(image_bytes)) as span:
+            text, cache_hit, backend = self._extract_text(image_bytes)
+            span.set(backend=backend, cache_hit=cache_hit, chars=len(text))
+        tracer.count("rag_ocr_pages_total", backend=backend, cache="hit" if cache_hit else "miss")
+        return text, cache_hit
+
+    def extract_texts_cached(self, images: Sequence[bytes]) -> List[Tuple[str, bool]]:
         """
+        extract_text_cached for several pages, sending the uncached ones to
+        the API together (OCR_API_BATCH_SIZE pages per request). If the API
+        fails, the pages fall back to Tesseract as in extract_text_cached.
 
-        image = Image.open(io.BytesIO(image_bytes))
+        Returns:
+            One (extracted text, cache hit) per image, in order
+        """
+        if not self.api_key or len(images) == 1:
+            return [self.extract_text_cached(image) for image in images]
+
+        tracer = get_tracer()
+        results: List[Optional[Tuple[str, bool]]] = []
+        for image in images:
+            cached = self._cache_get(image, "deepseek")
+            if cached is not None:
+                tracer.count("rag_ocr_pages_total", backend="deepseek", cache="hit")
+            results.append((cached, True) if cached is not None else None)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        with tracer.span("ocr.batch", pages=len(missing)) as span:
+            try:
+                texts, backend = self._real_api_extract_texts([images[i] for i in missing]), "deepseek"
+            except Exception as e:
+                print(f"DeepSeek API failed, falling back to Tesseract: {e}")
+                span.set(error=str(e))
+                texts, backend = None, "tesseract"
+            span.set(backend=backend)
+        for n, i in enumerate(missing):
+            if texts is not None:
+                self._cache_put(images[i], "deepseek", texts[n])
+                results[i] = (texts[n], False)
+            else:
+                results[i] = self._local_extract_text(images[i])[:2]
+            tracer.count("rag_ocr_pages_total", backend=backend, cache="hit" if results[i][1] else "miss")
+        return results
+
+    def _extract_text(self, image_bytes: bytes) -> Tuple[str, bool, str]:
+        """Returns: Tuple of (extracted text, cache hit, backend used)"""
+        if self.api_key:
+            cached = self._cache_get(image_bytes, "deepseek")
+            if cached is not None:
+                return cached, True, "deepseek"
+            try:
+                text = self._real_api_extract_text(image_bytes)
+                self._cache_put(image_bytes, "deepseek", text)
+                return text, False, "deepseek"
+            except Exception as e:
+                print(f"DeepSeek API failed, falling back to Tesseract: {e}")
+        else:
+            print("No API Key found. Using local Tesseract.")
+        return self._local_extract_text(image_bytes)
+
+    def _local_extract_text(self, image_bytes: bytes) -> Tuple[str, bool, str]:
+        cached = self._cache_get(image_bytes, "tesseract")
+        if cached is not None:
+            return cached, True, "tesseract"
+        text = self._mocked_extract_text(image_bytes)
+        self._cache_put(image_bytes, "tesseract", text)
+        return text, False, "tesseract"
+
+    def _cache_get(self, image_bytes: bytes, backend: str) -> Optional[str]:
+        cache = self.cache
+        if cache is None:
+            return None
+        return cache.get(OCRCache.make_key(image_bytes, self.backend_id(backend)))
+
+    def _cache_put(self, image_bytes: bytes, backend: str, text: str) -> None:
+        cache = self.cache
+        if cache is not None:
+            cache.put(OCRCache.make_key(image_bytes, self.backend_id(backend)), text)
+
+    def _configure_tesseract(self):
+        """Point pytesseract at the Tesseract binary and return the module"""
+        # Imported on first use, so API-only ingestion never loads pytesseract
+        import pytesseract
 
         # Configure Tesseract path (cross-platform support)
         tesseract_cmd = os.getenv("TESSERACT_CMD")
@@ -79,61 +178,29 @@ class DeepSeekOCRClient:
                 tesseract_cmd = 'tesseract'
 
         pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        return pytesseract
+        
+    def _mocked_extract_text(self, image_bytes: bytes) -> str:
+        """
+        This method simulates OCR output when DeepSeek OCR API is unavailable.
+        """
 
-        text = pytesseract.image_to_string(image)
+        from PIL import Image
 
-        print(f"DEBUG OCR Result: {text.strip()}")
+        image = Image.open(io.BytesIO(image_bytes))
 
-        return text
-        
-    def _real_api_extract_text(self, image_bytes: bytes) -> str:
+        pytesseract = self._configure_tesseract()
 
-        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+        return pytesseract.image_to_string(image)
         
-        header_id = os.getenv("DEFAULT_HEADERS_ID")
-        if not header_id:
-            raise ValueError("Missing DEFAULT_HEADERS_ID in environment variables")
-
-        payload = {
-            "model": "deepseek-ai/DeepSeek-OCR",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Free OCR."},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            "max_tokens": 2048,
-            "temperature": 0  
-        }
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-            "id": header_id  
-        }
-
-        try:
-            response = requests.post(
-                f"{self.api_endpoint}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            return result['choices'][0]['message']['content']
+    @property
+    def transport(self) -> OCRTransport:
+        return get_ocr_transport(self.api_endpoint, self.api_key)
 
-        except Exception as e:
-            print(f"DeepSeek API Error: {e}")
-            return e
+    def _real_api_extract_text(self, image_bytes: bytes) -> str:
+        """Transcribe one page with the DeepSeek API; raises OCRTransportError on failure"""
+        return self.transport.extract([image_bytes])[0]
 
-        
\ No newline at end of file
+    def _real_api_extract_texts(self, images: Sequence[bytes]) -> List[str]:
+        """Transcribe several pages with the DeepSeek API, batched per OCR_API_BATCH_SIZE"""
+        return self.transport.extract(images)
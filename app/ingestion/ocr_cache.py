@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def get_ocr_cache_path() -> str:
+    """Location of the on-disk OCR cache"""
+    return os.getenv("OCR_CACHE_PATH", "./.cache/ocr_cache.sqlite")
+
+def get_ocr_cache_max_bytes() -> int:
+    """Size bound of the OCR cache (OCR_CACHE_MAX_MB)"""
+    return int(float(os.getenv("OCR_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+def ocr_cache_enabled() -> bool:
+    return os.getenv("OCR_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+class OCRCache:
+    """
+    Persistent, size-bounded LRU cache of OCR results.
+
+    Backed by SQLite so it is safe to share between threads and between the
+    processes of an OCR process pool. Entries are keyed by a hash of the
+    rendered page bytes plus the OCR backend identity, so the same scan
+    uploaded under a different file name hits the cache, while switching
+    backend or model does not serve stale text.
+
+    The total size is tracked as entries are written and evicted. Once it
+    goes over `max_bytes` the table is summed exactly (pool processes share
+    the file) and the least recently used entries are evicted down to
+    EVICT_TO of the bound, so the full scan runs rarely.
+    """
+
+    EVICT_TO = 0.9
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = path or get_ocr_cache_path()
+        self.max_bytes = max_bytes if max_bytes is not None else get_ocr_cache_max_bytes()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL,"
+                " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ocr_results_last_access ON ocr_results(last_access)"
+            )
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+
+    @staticmethod
+    def make_key(image_bytes: bytes, backend: str) -> str:
+        digest = hashlib.sha256(backend.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE ocr_results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8")) + len(key)
+        with self._lock, self._conn:
+            # A row already present was written concurrently by another worker for the same page
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO ocr_results (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()),
+            ).rowcount
+            if inserted > 0:
+                self._bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries once the cache holds more than max_bytes"""
+        if self._bytes <= self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+        target = int(self.max_bytes * self.EVICT_TO)
+        stale = []
+        if total > self.max_bytes:
+            for key, size in self._conn.execute("SELECT key, size FROM ocr_results ORDER BY last_access"):
+                if total <= target:
+                    break
+                stale.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM ocr_results WHERE key = ?", stale)
+            self.evictions += len(stale)
+        self._bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+_ocr_cache: Optional[OCRCache] = None
+_ocr_cache_pid: Optional[int] = None
+_ocr_cache_lock = threading.Lock()
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Process-wide OCR cache, or None when OCR_CACHE_ENABLED is off"""
+    global _ocr_cache, _ocr_cache_pid
+    if not ocr_cache_enabled():
+        return None
+    with _ocr_cache_lock:
+        # SQLite connections must not cross a fork; forked pool workers reopen
+        if _ocr_cache is None or _ocr_cache_pid != os.getpid():
+            _ocr_cache = OCRCache()
+            _ocr_cache_pid = os.getpid()
+        return _ocr_cache
@@ -0,0 +1,314 @@
+import base64
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.tracing import get_tracer
+
+
+def get_ocr_api_concurrency() -> int:
+    """Maximum concurrent requests to the remote OCR API (and pooled connections)"""
+    return int(os.getenv("OCR_API_CONCURRENCY", "4"))
+
+def get_ocr_api_requests_per_second() -> Optional[float]:
+    """Client-side request rate limit for the OCR API, or None for unlimited"""
+    value = os.getenv("OCR_API_REQUESTS_PER_SECOND")
+    return float(value) if value else None
+
+def get_ocr_api_max_retries() -> int:
+    """Retries of a request after a 429, 5xx, timeout or connection error"""
+    return int(os.getenv("OCR_API_MAX_RETRIES", "4"))
+
+def get_ocr_api_timeout() -> float:
+    """Deadline in seconds for one OCR request, including its retries"""
+    return float(os.getenv("OCR_API_TIMEOUT_S", "60"))
+
+def get_ocr_api_batch_size() -> int:
+    """Pages sent per OCR API request (1 = one page per request)"""
+    return max(1, int(os.getenv("OCR_API_BATCH_SIZE", "1")))
+
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+# Printed by the model between pages of a batched request
+PAGE_SEPARATOR = "<<<PAGE BREAK>>>"
+
+
+class OCRTransportError(RuntimeError):
+    """
+    An OCR API request failed. `retryable` is False for errors a retry
+    cannot fix; `retry_after` is the delay the server asked for, if any.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts of up to
+    `capacity`. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """
+        Take one token, waiting if necessary.
+
+        Returns:
+            Seconds waited
+        Raises:
+            OCRTransportError: if no token is available before `deadline` (time.monotonic())
+        """
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if not wait:
+                return waited
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise OCRTransportError("OCR request deadline exceeded waiting for the rate limiter", retryable=False)
+            time.sleep(wait)
+            waited += wait
+
+    def try_acquire(self) -> bool:
+        """Take one token if one is available right now"""
+        return not self._take()
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Full-jitter exponential backoff before retry `attempt` (1-based)"""
+    return random.uniform(0.0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds requested by a Retry-After header (delta or HTTP date), if any"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        # A malformed header must not turn a retryable response into a hard failure
+        return None
+    return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def image_mime_type(image: bytes) -> str:
+    """MIME type of an encoded page image, from its magic bytes (PNG when unknown)"""
+    if image[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if image[:4] == b"RIFF" and image[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def split_pages(content: str, pages: int) -> Optional[List[str]]:
+    """Split a batched reply into one text per page, or None if the page count does not match"""
+    if pages == 1:
+        return [content]
+    parts = [part.strip() for part in content.split(PAGE_SEPARATOR)]
+    return parts if len(parts) == pages else None
+
+
+class OCRTransport:
+    """
+    HTTP client for the DeepSeek OCR chat-completions endpoint.
+
+    - One requests.Session with a keep-alive pool of `concurrency`
+      connections, shared by every OCR thread of the process
+    - At most `concurrency` requests in flight, and a token bucket holding
+      them to `requests_per_second`
+    - 429/5xx responses, timeouts and connection errors are retried with
+      full-jitter exponential backoff (after the server's Retry-After), until
+      `max_retries` or the request's `timeout` deadline runs out
+    - extract() can send several pages in one request; replies that do not
+      split back into one text per page are redone page by page
+
+    Failures raise OCRTransportError; nothing is ever returned as page text
+    except the model's transcription.
+    """
+
+    MODEL = "deepseek-ai/DeepSeek-OCR"
+
+    def __init__(self, endpoint: str, api_key: str, header_id: Optional[str] = None,
+                 concurrency: Optional[int] = None, requests_per_second: Optional[float] = None,
+                 max_retries: Optional[int] = None, timeout: Optional[float] = None,
+                 backoff_base: float = 0.5, backoff_cap: float = 20.0):
+        if not endpoint:
+            raise ValueError("Missing DEEPSEEK_OCR_ENDPOINT in environment variables")
+        header_id = header_id if header_id is not None else os.getenv("DEFAULT_HEADERS_ID")
+        if not header_id:
+            raise ValueError("Missing DEFAULT_HEADERS_ID in environment variables")
+        self.url = f"{endpoint.rstrip('/')}/chat/completions"
+        self.concurrency = concurrency or get_ocr_api_concurrency()
+        self.max_retries = max_retries if max_retries is not None else get_ocr_api_max_retries()
+        self.timeout = timeout or get_ocr_api_timeout()
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        requests_per_second = requests_per_second or get_ocr_api_requests_per_second()
+        self._bucket = TokenBucket(requests_per_second) if requests_per_second else None
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+            "id": header_id,
+        })
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "pages": 0, "retries": 0, "failures": 0, "split_failures": 0,
+                      "throttled_s": 0.0, "seconds": 0.0}
+
+    def _count(self, **changes) -> None:
+        with self._stats_lock:
+            for key, value in changes.items():
+                self.stats[key] += value
+
+    def _payload(self, images: Sequence[bytes], mime_type: Optional[str] = None) -> dict:
+        prompt = "Free OCR."
+        if len(images) > 1:
+            prompt = (f"Free OCR. Transcribe each of the {len(images)} images in order, "
+                      f"with a line containing only {PAGE_SEPARATOR} between consecutive images.")
+        content = [{"type": "text", "text": prompt}]
+        for image in images:
+            data = base64.b64encode(image).decode("utf-8")
+            content.append({"type": "image_url",
+                            "image_url": {"url": f"data:{mime_type or image_mime_type(image)};base64,{data}"}})
+        return {
+            "model": self.MODEL,
+            "messages": [{"role": "user", "content": content}],
+            "max_tokens": 2048 * len(images),
+            "temperature": 0,
+        }
+
+    def _post(self, payload: dict, deadline: float) -> str:
+        """One HTTP attempt; returns the reply text or raises OCRTransportError"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise OCRTransportError("OCR request deadline exceeded", retryable=False)
+        try:
+            response = self.session.post(self.url, json=payload, timeout=(min(10.0, remaining), remaining))
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise OCRTransportError(f"{type(e).__name__}: {e}", retryable=True) from e
+
+        if response.status_code >= 400:
+            raise OCRTransportError(f"OCR API returned HTTP {response.status_code}: {response.text[:200]}",
+                                    status=response.status_code,
+                                    retryable=response.status_code in RETRYABLE_STATUS,
+                                    retry_after=_retry_after(response))
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise OCRTransportError(f"Malformed OCR API response: {e}", status=response.status_code) from e
+
+    def request(self, images: Sequence[bytes], mime_type: Optional[str] = None) -> str:
+        """
+        Send one request for `images`, retrying transient failures within the deadline.
+        Images are labelled with `mime_type`, or the type detected from their bytes.
+
+        Returns:
+            The model's reply text
+        """
+        tracer = get_tracer()
+        payload = self._payload(images, mime_type)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        attempt = 0
+        with tracer.span("ocr.request", pages=len(images)) as span:
+            while True:
+                attempt += 1
+                try:
+                    if self._bucket is not None:
+                        self._count(throttled_s=self._bucket.acquire(deadline))
+                    with self._slots:
+                        text = self._post(payload, deadline)
+                    span.set(attempts=attempt, status=200)
+                    tracer.count("rag_ocr_requests_total", status="ok")
+                    self._count(requests=1, pages=len(images), seconds=time.monotonic() - start)
+                    return text
+                except OCRTransportError as e:
+                    tracer.count("rag_ocr_requests_total", status=str(e.status or "error"))
+                    # Jitter on top of Retry-After too, or every throttled thread retries at once
+                    delay = (e.retry_after or 0.0) + backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                    if not e.retryable or attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                        span.set(attempts=attempt, status=e.status, error=str(e))
+                        self._count(requests=1, failures=1, seconds=time.monotonic() - start)
+                        raise
+                    self._count(requests=1, retries=1)
+                    time.sleep(delay)
+
+    def extract(self, images: Sequence[bytes], mime_type: Optional[str] = None,
+                batch_size: Optional[int] = None) -> List[str]:
+        """
+        Transcribe pages, `batch_size` (default OCR_API_BATCH_SIZE) per request.
+
+        Returns:
+            One text per image, in order
+        """
+        batch_size = batch_size or get_ocr_api_batch_size()
+        texts: List[str] = []
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            pages = split_pages(self.request(batch, mime_type), len(batch))
+            if pages is None:
+                # The model merged or dropped a page boundary; redo those pages one by one
+                self._count(split_failures=1)
+                pages = [self.request([image], mime_type) for image in batch]
+            texts.extend(pages)
+        return texts
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_transports: Dict[Tuple, OCRTransport] = {}
+_transports_lock = threading.Lock()
+
+def get_ocr_transport(endpoint: str, api_key: str) -> OCRTransport:
+    """
+    Process-wide transport for an endpoint and key, so every OCR thread
+    shares one connection pool, concurrency limit and rate limiter. Rebuilt
+    when the OCR_API_* configuration changes.
+    """
+    key = (endpoint, api_key, os.getenv("DEFAULT_HEADERS_ID"), get_ocr_api_concurrency(),
+           get_ocr_api_requests_per_second(), get_ocr_api_max_retries(), get_ocr_api_timeout())
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = OCRTransport(endpoint, api_key)
+        return transport
@@ -0,0 +1,35 @@
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def make_executor(kind: str, workers: int) -> Executor:
+    """Create a thread or process pool ('thread' | 'process')"""
+    kind = kind.lower()
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unsupported executor: {kind}. Choose 'thread' or 'process'")
+
+
+def bounded_ordered_map(fn: Callable[[T], R], items: Iterable[T], executor: Executor, max_inflight: int) -> Iterator[R]:
+    """
+    Like executor.map, but lazy and bounded.
+
+    executor.map consumes the whole input iterable up front, which defeats a
+    streaming producer (e.g. lazily rendered pages). This pulls at most
+    `max_inflight` items ahead of the consumer and yields results in input
+    order regardless of completion order.
+    """
+    max_inflight = max(1, max_inflight)
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_inflight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
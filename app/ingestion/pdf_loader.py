@@ -1,61 +1,261 @@
-from pdf2image import convert_from_path
-from .ocr import DeepSeekOCRClient
+from .ocr_transport import get_ocr_api_batch_size, get_ocr_api_concurrency
+from .parallel import bounded_ordered_map, make_executor
+from app.tracing import get_tracer, traced
 from pypdf import PdfReader
-import io
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import os
+import time
 import logging
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text directly from a standard PDF (text-based)"""
-    text_content = []
+def extract_pages_from_pdf(pdf_path: str) -> List[str]:
+    """Extract the text layer of every page (empty string for pages without one)"""
     try:
         with open(pdf_path, 'rb') as file:
             pdf_reader = PdfReader(file)
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text = page.extract_text()
-                if text.strip():  
-                    text_content.append(text)
-        return "\n".join(text_content)
+            return [page.extract_text() or "" for page in pdf_reader.pages]
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
-        return ""
+        return []
+
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """Extract text directly from a standard PDF (text-based)"""
+    return "\n".join(text for text in extract_pages_from_pdf(pdf_path) if text.strip())
+
+
+def page_text_density(text: str) -> int:
+    """Score a page's text layer by its number of alphanumeric characters"""
+    return sum(1 for char in text if char.isalnum())
 
 logger = logging.getLogger(__name__)
 
-def load_pdf(path: str) -> str:
-    # 1. Try Direct Extraction First (Cost & Speed Optimization)
-    direct_text = extract_text_from_pdf(path)
-    
-    # Threshold check: If we got enough text, skip heavy OCR
-    if len(direct_text.strip()) > 150: 
-        print("✅ Standard PDF detected: Using direct extraction.")
-        return direct_text
-    
-    # 2. Fallback to OCR
-    print("🔍 Low text density: Attempting OCR Pathway...")
-    
-    poppler_path = find_poppler()
-    
+def get_ocr_workers() -> int:
+    """Number of local OCR (Tesseract) workers"""
+    return int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+def get_ocr_executor() -> str:
+    """Pool type for local OCR: 'thread' or 'process'"""
+    return os.getenv("OCR_EXECUTOR", "thread").lower()
+
+def get_render_window() -> int:
+    """Number of pages rasterized per pdf2image call"""
+    return int(os.getenv("OCR_RENDER_WINDOW", "4"))
+
+def get_min_page_density() -> int:
+    """Pages whose text layer scores below this are sent to OCR"""
+    return int(os.getenv("MIN_PAGE_TEXT_DENSITY", "50"))
+
+
+def _page_windows(page_numbers: Sequence[int], window: int) -> List[Tuple[int, int]]:
+    """Group sorted page numbers into contiguous (first, last) runs of at most `window` pages"""
+    runs: List[List[int]] = []
+    for page_number in sorted(page_numbers):
+        if runs and page_number == runs[-1][1] + 1 and runs[-1][1] - runs[-1][0] + 1 < window:
+            runs[-1][1] = page_number
+        else:
+            runs.append([page_number, page_number])
+    return [(first, last) for first, last in runs]
+
+
+def iter_page_images(path: str, poppler_path: Optional[str] = None, window: Optional[int] = None,
+                     timings: Optional[dict] = None, page_numbers: Optional[Sequence[int]] = None,
+                     dpi: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Lazily rasterize a PDF, yielding (page_number, encoded page image).
+
+    Pages are rendered in `first_page`/`last_page` windows so only a window's
+    worth of page images is held in memory at a time, instead of the whole
+    document as with a bare convert_from_path. `page_numbers` (1-based)
+    restricts rendering to those pages. Pages are rendered at `dpi` (default
+    OCR_RENDER_DPI) and prepared for OCR with preprocess_page.
+    """
+    # Rendering and OCR modules (poppler bindings, PIL, the OCR client) load only
+    # when a document actually has pages to OCR
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    from .preprocess import get_ocr_image_mode, get_ocr_render_dpi, preprocess_page
+
+    window = max(1, window or get_render_window())
+    dpi = dpi or get_ocr_render_dpi()
+    grayscale = get_ocr_image_mode() != "color"
+    if page_numbers is None:
+        total_pages = pdfinfo_from_path(path, poppler_path=poppler_path)["Pages"]
+        page_numbers = range(1, total_pages + 1)
+
+    for first_page, last_page in _page_windows(page_numbers, window):
+        start = time.perf_counter()
+        images = convert_from_path(path, dpi=dpi, first_page=first_page, last_page=last_page,
+                                   poppler_path=poppler_path, grayscale=grayscale)
+        rendered_at = time.perf_counter()
+        rendered = []
+        for offset, img in enumerate(images):
+            rendered.append((first_page + offset, preprocess_page(img)))
+            img.close()
+        del images
+        if timings is not None:
+            timings["render_s"] = timings.get("render_s", 0.0) + rendered_at - start
+            timings["preprocess_s"] = timings.get("preprocess_s", 0.0) + time.perf_counter() - rendered_at
+            timings["image_bytes"] = timings.get("image_bytes", 0) + sum(len(data) for _, data in rendered)
+
+        yield from rendered
+
+
+_worker_ocr_client = None
+
+def _ocr_pages(pages: List[Tuple[int, bytes]]) -> List[Tuple[int, str, float, bool]]:
+    """OCR a group of rendered pages (one API request when batching); module-level so process pools can pickle it"""
+    global _worker_ocr_client
+    if _worker_ocr_client is None:
+        from .ocr import DeepSeekOCRClient
+
+        _worker_ocr_client = DeepSeekOCRClient()
+    start = time.perf_counter()
+    results = _worker_ocr_client.extract_texts_cached([image_bytes for _, image_bytes in pages])
+    elapsed = (time.perf_counter() - start) / len(pages)
+    return [(page_number, text, elapsed, cache_hit) for (page_number, _), (text, cache_hit) in zip(pages, results)]
+
+
+def _groups(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while group := list(islice(iterator, size)):
+        yield group
+
+
+@traced("ingest.ocr")
+def ocr_pdf(path: str, poppler_path: Optional[str] = None, workers: Optional[int] = None,
+            executor_kind: Optional[str] = None,
+            page_numbers: Optional[Sequence[int]] = None) -> Tuple[List[str], dict]:
+    """
+    OCR the pages of a PDF (all, or the 1-based `page_numbers`) through a
+    bounded, streaming worker pool.
+
+    The remote DeepSeek API is I/O bound and is driven by a thread pool capped
+    at OCR_API_CONCURRENCY in-flight requests, each carrying
+    OCR_API_BATCH_SIZE pages; local Tesseract is CPU bound and runs on
+    OCR_WORKERS threads or processes (OCR_EXECUTOR). Results are reassembled
+    in page order.
+
+    Returns:
+        Tuple of (page texts in page order, per-stage timings)
+    """
+    from .ocr import DeepSeekOCRClient
+    from .preprocess import get_ocr_render_dpi
+
+    remote = bool(DeepSeekOCRClient().api_key)
+    if remote:
+        executor_kind, workers = "thread", workers or get_ocr_api_concurrency()
+        batch_size = get_ocr_api_batch_size()
+    else:
+        executor_kind, workers = executor_kind or get_ocr_executor(), workers or get_ocr_workers()
+        batch_size = 1
+
+    timings = {"pages": 0, "render_s": 0.0, "preprocess_s": 0.0, "ocr_s": 0.0, "image_bytes": 0, "cache_hits": 0,
+               "workers": workers, "executor": executor_kind, "backend": "deepseek" if remote else "tesseract",
+               "batch_size": batch_size, "dpi": get_ocr_render_dpi()}
+    start = time.perf_counter()
+
+    pages = iter_page_images(path, poppler_path=poppler_path, timings=timings, page_numbers=page_numbers)
+    texts = []
+    with make_executor(executor_kind, workers) as executor:
+        # Keep at most two page groups per worker queued so rendering stays just ahead of OCR
+        groups = _groups(pages, batch_size)
+        for results in bounded_ordered_map(_ocr_pages, groups, executor, workers * 2):
+            for page_number, text, elapsed, cache_hit in results:
+                texts.append(text)
+                timings["pages"] += 1
+                timings["ocr_s"] += elapsed
+                timings["cache_hits"] += int(cache_hit)
+
+    timings["wall_s"] = time.perf_counter() - start
+    get_tracer().current_span().set(**timings)
+    return texts, timings
+
+
+@traced("ingest.load_pages")
+def load_pdf_pages(path: str) -> List[Dict]:
+    """
+    Extract a PDF page by page, OCR'ing only the pages that need it.
+
+    Each page's text layer is scored with page_text_density; pages below
+    MIN_PAGE_TEXT_DENSITY are rasterized and sent to OCR, the rest use the
+    direct text. Mixed documents (text cover letter + scanned annexes) keep
+    every page, and mostly-scanned documents don't pay OCR for pages that
+    already have text.
+
+    Returns:
+        One dict per page, in order: {"page": 1-based number, "text": str,
+        "path": "direct" | "ocr" | "ocr_failed"}
+    """
+    direct_pages = extract_pages_from_pdf(path)
+    threshold = get_min_page_density()
+    pages = [
+        {"page": i + 1, "text": text, "path": "direct"}
+        for i, text in enumerate(direct_pages)
+    ]
+    ocr_page_numbers = [page["page"] for page in pages if page_text_density(page["text"]) < threshold]
+    get_tracer().current_span().set(path=path, pages=len(pages),
+                                    ocr_pages=len(ocr_page_numbers) if direct_pages else None)
+
+    if not direct_pages:
+        # The text layer could not be read at all; let poppler enumerate the pages
+        ocr_page_numbers = None
+    if ocr_page_numbers == []:
+        return pages
+
     try:
-        images = convert_from_path(path, poppler_path=poppler_path)
-        ocr = DeepSeekOCRClient()
-        
-        ocr_results = []
-        for i, img in enumerate(images):
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            text = ocr.extract_text(img_byte_arr.getvalue())
-            ocr_results.append(text)
-            
-        return "\n".join(ocr_results)
+        ocr_results, timings = ocr_pdf(path, poppler_path=find_poppler(), page_numbers=ocr_page_numbers)
+        print(
+            f"⏱️ OCR: {timings['pages']} pages in {timings['wall_s']:.2f}s "
+            f"(render {timings['render_s']:.2f}s, preprocess {timings['preprocess_s']:.2f}s, "
+            f"{timings['image_bytes'] / max(1, timings['pages']) / 1024:.0f} KB/page, "
+            f"{timings['backend']} {timings['ocr_s']:.2f}s "
+            f"across {timings['workers']} {timings['executor']} workers, "
+            f"{timings['cache_hits']} served from OCR cache)"
+        )
+        if ocr_page_numbers is None:
+            return [{"page": i + 1, "text": text, "path": "ocr"} for i, text in enumerate(ocr_results)]
+        for page_number, text in zip(ocr_page_numbers, ocr_results):
+            pages[page_number - 1].update(text=text, path="ocr")
 
     except Exception as e:
         logger.error(f"OCR Pathway failed: {e}")
-        # Final Fallback: Return whatever little direct text we found
+        # Fallback: keep whatever little direct text those pages had
         print("⚠️ OCR Failed (Poppler missing?). Falling back to partial direct text.")
-        return direct_text
+        for page_number in ocr_page_numbers or []:
+            pages[page_number - 1]["path"] = "ocr_failed"
+
+    return pages
+
+
+def summarize_page_paths(pages: List[Dict]) -> Dict[str, int]:
+    """Count pages per extraction path, e.g. {"direct": 3, "ocr": 2}"""
+    stats: Dict[str, int] = {}
+    for page in pages:
+        stats[page["path"]] = stats.get(page["path"], 0) + 1
+    return stats
+
+
+def report_page_paths(path: str, pages: List[Dict]) -> Dict[str, int]:
+    """Print and return the per-page extraction path statistics of a document"""
+    stats = summarize_page_paths(pages)
+    print(
+        f"📄 Page routing for {os.path.basename(path)}: "
+        + ", ".join(f"{count} {route}" for route, count in sorted(stats.items()))
+        + f" ({stats.get('ocr', 0)}/{len(pages)} pages OCR'd)"
+    )
+    return stats
+
+
+def pages_to_text(pages: List[Dict]) -> str:
+    """Merge per-page results back into document text, in page order"""
+    return "\n".join(page["text"] for page in pages if page["text"].strip())
+
+
+def load_pdf(path: str) -> str:
+    pages = load_pdf_pages(path)
+    report_page_paths(path, pages)
+    return pages_to_text(pages)
 
 def find_poppler():
     """Dynamically finds poppler"""
@@ -0,0 +1,372 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.embeddings.embedder import get_embeddings
+from app.embeddings.vector_store import (bump_corpus_version, count_vectors, get_tenant, load_bm25_index,
+                                         load_vector_store)
+from app.ingestion.cleaner import chunk_pages
+from app.ingestion.manifest import IngestionManifest, chunk_ids, hash_file, hash_pages, is_current, normalize_source
+from app.ingestion.pdf_loader import get_ocr_workers, load_pdf_pages, report_page_paths
+from app.tracing import get_tracer, traced
+
+
+def get_ingest_batch_size() -> int:
+    """Number of chunks embedded and upserted per micro-batch"""
+    return int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+def get_ingest_workers() -> int:
+    """Number of worker processes extracting and chunking documents"""
+    return int(os.getenv("INGEST_WORKERS", "1"))
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of at most `size` items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@traced("ingest.delete")
+def _delete_chunks(db, bm25, ids: List[str]) -> None:
+    for batch in batched(ids, 500):
+        db.delete(ids=batch)
+        bm25.delete(batch)
+
+
+def _backfill_bm25(db, bm25) -> None:
+    """Build the BM25 index from a vector store ingested before BM25 existed"""
+    stored = db.get(include=["documents", "metadatas"])
+    if not stored["ids"]:
+        return
+    print(f"Backfilling BM25 index from {len(stored['ids'])} stored chunks...")
+    docs = [Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(stored["documents"], stored["metadatas"])]
+    for start in range(0, len(docs), 500):
+        bm25.add(stored["ids"][start:start + 500], docs[start:start + 500])
+
+
+# Set in document worker processes, whose spans are shipped back with each plan
+_in_worker = False
+
+
+def plan_document(job: Tuple[str, Optional[dict]]) -> dict:
+    """
+    Load, clean and chunk one document against its manifest entry.
+
+    Module-level and side-effect free (no store or manifest writes) so it can
+    run in a worker process. Failures are returned as a "failed" plan rather
+    than raised, so one bad document cannot abort a batch.
+
+    Runs in an "ingest.plan" span; in a worker process, the worker's spans
+    and counters are returned under "trace" for the writer to merge.
+
+    Returns:
+        {"path", "source", "status": "new" | "updated" | "unchanged" | "failed",
+         "file_hash", "page_hashes", "chunks", "ids", "page_stats", "complete", "error"}
+
+        "complete" is False when OCR failed on a page or no chunks came out,
+        so the document is extracted again on the next run.
+    """
+    tracer = get_tracer()
+    with tracer.span("ingest.plan", path=job[0]) as span:
+        plan = _plan_document(job)
+        span.set(status=plan["status"], chunks=len(plan["chunks"]), error=plan["error"])
+    if _in_worker:
+        plan["trace"] = tracer.drain()
+    return plan
+
+
+def _new_plan(path: str) -> dict:
+    return {"path": path, "source": normalize_source(path), "file_hash": None, "page_hashes": [],
+            "chunks": [], "ids": [], "page_stats": {}, "complete": True, "error": None}
+
+
+def _plan_document(job: Tuple[str, Optional[dict]]) -> dict:
+    path, entry = job
+    plan = _new_plan(path)
+    source = plan["source"]
+    try:
+        file_hash = hash_file(path)
+        plan["file_hash"] = file_hash
+
+        # Chunks written by an older CHUNK_SCHEMA are redone even if the file is unchanged
+        current = is_current(entry)
+        if current and entry["file_hash"] == file_hash:
+            print(f"⏭️ Unchanged, skipping: {path}")
+            return dict(plan, status="unchanged", page_hashes=entry["page_hashes"])
+
+        page_hashes = hash_pages(path)
+        if current and entry["page_hashes"] == page_hashes:
+            print(f"⏭️ Pages unchanged, refreshing manifest only: {path}")
+            return dict(plan, status="unchanged", page_hashes=page_hashes)
+
+        if entry:
+            changed_pages = sum(
+                1 for i, page_hash in enumerate(page_hashes)
+                if i >= len(entry["page_hashes"]) or entry["page_hashes"][i] != page_hash
+            )
+            print(f"\n--- Updating: {path} ({changed_pages}/{len(page_hashes)} pages changed) ---")
+        else:
+            print(f"\n--- Processing: {path} ---")
+        pages = load_pdf_pages(path)
+        page_stats = report_page_paths(path, pages)
+
+        print(f"Cleaning and chunking text from {os.path.basename(path)}...")
+        with get_tracer().span("ingest.chunk", chars=sum(len(page["text"]) for page in pages)) as span:
+            chunks = chunk_pages(pages)
+            span.set(chunks=len(chunks))
+        del pages
+        for chunk in chunks:
+            chunk.metadata['source'] = source
+
+        return dict(plan, status="updated" if entry else "new", page_hashes=page_hashes,
+                    chunks=chunks, ids=chunk_ids(source, chunks), page_stats=page_stats,
+                    complete=bool(chunks) and not page_stats.get("ocr_failed"))
+
+    except Exception as e:
+        return dict(plan, status="failed", error=f"{type(e).__name__}: {e}")
+
+
+def _init_ingest_worker(ocr_workers: int) -> None:
+    """Split the OCR thread budget across document workers to avoid oversubscription"""
+    global _in_worker
+    _in_worker = True
+    os.environ["OCR_WORKERS"] = str(ocr_workers)
+    os.environ["OCR_EXECUTOR"] = "thread"
+
+
+def iter_document_plans(pdf_paths: Iterable[str], manifest: IngestionManifest,
+                        workers: Optional[int] = None) -> Iterator[dict]:
+    """
+    Lazily plan documents, serially or across a process pool.
+
+    With INGEST_WORKERS > 1, extraction, OCR, cleaning and chunking run in
+    worker processes while the caller stays the single writer. Plans are
+    yielded in input order regardless of completion order, so the resulting
+    store is deterministic, and at most two documents per worker are held in
+    memory ahead of the writer.
+    """
+    workers = workers or get_ingest_workers()
+
+    def jobs():
+        for path in pdf_paths:
+            if not os.path.exists(path):
+                print(f"Warning: File not found at {path}")
+                continue
+            yield path, manifest.get(normalize_source(path))
+
+    if workers <= 1:
+        for job in jobs():
+            yield plan_document(job)
+        return
+
+    yield from _plan_in_processes(jobs(), workers)
+
+
+def _plan_result(job: Tuple[str, Optional[dict]], future: Future) -> dict:
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        return dict(_new_plan(job[0]), status="failed", error=f"{type(e).__name__}: {e}")
+
+
+def _plan_in_processes(jobs: Iterator[Tuple[str, Optional[dict]]], workers: int) -> Iterator[dict]:
+    """
+    plan_document across a process pool, at most two jobs per worker ahead
+    of the consumer and in input order (like parallel.bounded_ordered_map).
+
+    A worker that dies (e.g. killed for running out of memory) breaks the
+    whole pool: the documents in flight become "failed" plans, to be retried
+    on the next ingestion, and the remaining ones continue in a fresh pool.
+    """
+    ocr_workers = max(1, get_ocr_workers() // workers)
+    # Spawn, not fork: forking a process that already loaded torch and started threads can deadlock the child
+    context = multiprocessing.get_context("spawn")
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_ingest_worker,
+                                   initargs=(ocr_workers,))
+
+    executor = new_pool()
+    pending = deque()
+    try:
+        for job in jobs:
+            try:
+                future = executor.submit(plan_document, job)
+            except BrokenProcessPool:
+                executor.shutdown()
+                executor = new_pool()
+                future = executor.submit(plan_document, job)
+            pending.append((job, future))
+            if len(pending) >= workers * 2:
+                yield _plan_result(*pending.popleft())
+        while pending:
+            yield _plan_result(*pending.popleft())
+    finally:
+        executor.shutdown()
+
+
+@traced("ingest")
+def ingest_documents(pdf_paths: list, db=None, manifest: Optional[IngestionManifest] = None,
+                     prune: bool = True, batch_size: Optional[int] = None,
+                     on_progress: Optional[Callable[[dict], None]] = None,
+                     workers: Optional[int] = None, tenant: Optional[str] = None):
+    """
+    Incrementally stream PDFs into a tenant's persistent vector store and
+    the BM25 index kept alongside it.
+
+    Documents flow through load -> clean -> chunk one at a time (or across
+    `workers` processes, see iter_document_plans), and their chunks are embedded and upserted in INGEST_BATCH_SIZE micro-batches, so
+    memory stays flat regardless of corpus size and every finished batch is
+    immediately searchable.
+
+    - Unchanged files (same content hash) are skipped without being opened.
+    - Files whose bytes changed but whose pages did not (e.g. a metadata-only
+      edit) only get their manifest entry refreshed.
+    - Changed files are re-extracted and re-chunked; only new chunks are
+      embedded, and chunks that no longer exist are deleted afterwards.
+    - Files recorded in the manifest that no longer exist on disk are pruned.
+    - Files whose OCR failed on some page, or that produced no chunks, keep
+      whatever chunks they did produce but are processed again next run.
+
+    Documents that fail to load are reported and left untouched in the
+    store and manifest; the rest of the batch continues.
+
+    Chunks are cut page by page and carry "source", "page", "extraction",
+    "chunk_index" and "total_chunks" metadata (see chunk_pages), which
+    retrieval can filter on.
+
+    Every stage runs in a span ("ingest.plan", "ingest.load_pages",
+    "ingest.ocr", "ingest.chunk", "ingest.upsert", ... see app.tracing),
+    including the stages run in worker processes.
+
+    Args:
+        on_progress: Called after every micro-batch and document with
+            {"path", "documents_done", "documents_total", "chunks_written"}
+        workers: Document worker processes (default INGEST_WORKERS); the
+            calling process remains the only writer to the store.
+        tenant: Corpus to ingest into (default RAG_TENANT); `db` and
+            `manifest`, when given, must belong to the same tenant.
+
+    Returns:
+        Tuple of (vector store, stats dict)
+    """
+    tenant = get_tenant(tenant)
+    db = db if db is not None else load_vector_store(tenant)
+    # The embedding service is process-wide; the summary reports this run's share of its stats
+    embeddings = get_embeddings()
+    embeddings_before = dict(embeddings.stats)
+    manifest = manifest if manifest is not None else IngestionManifest(tenant=tenant)
+    bm25 = load_bm25_index(tenant)
+    if manifest.entries and not count_vectors(db):
+        # e.g. after switching VECTOR_BACKEND; the embedding cache keeps this cheap
+        print("Vector store is empty, forgetting the manifest and re-ingesting...")
+        manifest.entries.clear()
+        bm25.clear()
+    if manifest.entries and not bm25.count():
+        _backfill_bm25(db, bm25)
+    batch_size = batch_size or get_ingest_batch_size()
+    stats = {"new": 0, "updated": 0, "unchanged": 0, "pruned": 0, "failed": 0,
+             "chunks_added": 0, "chunks_deleted": 0, "pages": {}}
+    progress = {"path": None, "documents_done": 0, "documents_total": len(pdf_paths), "chunks_written": 0}
+
+    def report(**changes):
+        progress.update(changes)
+        if on_progress:
+            on_progress(dict(progress))
+
+    tracer = get_tracer()
+    for plan in iter_document_plans(pdf_paths, manifest, workers=workers):
+        tracer.merge(plan.pop("trace", None))
+        source = plan["source"]
+        entry = manifest.get(source)
+
+        if plan["status"] == "failed":
+            print(f"❌ Failed to ingest {plan['path']}: {plan['error']}")
+            stats["failed"] += 1
+            report(path=plan["path"], documents_done=progress["documents_done"] + 1)
+            continue
+
+        if plan["status"] == "unchanged":
+            if entry["page_hashes"] != plan["page_hashes"] or entry["file_hash"] != plan["file_hash"]:
+                manifest.update(source, plan["file_hash"], plan["page_hashes"], entry["chunk_ids"])
+                manifest.save()
+            stats["unchanged"] += 1
+            report(path=plan["path"], documents_done=progress["documents_done"] + 1)
+            continue
+
+        for route, count in plan["page_stats"].items():
+            stats["pages"][route] = stats["pages"].get(route, 0) + count
+
+        old_ids = set(entry["chunk_ids"]) if entry else set()
+        new_ids = set(plan["ids"])
+        fresh = ((chunk_id, chunk) for chunk_id, chunk in zip(plan["ids"], plan["chunks"]) if chunk_id not in old_ids)
+
+        added = 0
+        for batch in batched(fresh, batch_size):
+            batch_ids, batch_chunks = [chunk_id for chunk_id, _ in batch], [chunk for _, chunk in batch]
+            with tracer.span("ingest.upsert", chunks=len(batch)):
+                db.add_documents(batch_chunks, ids=batch_ids)
+                bm25.add(batch_ids, batch_chunks)
+            added += len(batch)
+            report(path=plan["path"], chunks_written=progress["chunks_written"] + len(batch))
+
+        # Delete stale chunks only once their replacements are searchable
+        stale_ids = [chunk_id for chunk_id in entry["chunk_ids"] if chunk_id not in new_ids] if entry else []
+        _delete_chunks(db, bm25, stale_ids)
+        print(f"Chunks: {added} added, {len(stale_ids)} deleted, {len(plan['ids']) - added} kept")
+        if not plan["complete"]:
+            print(f"⚠️ Incomplete extraction, will retry on the next ingestion: {plan['path']}")
+
+        manifest.update(source, plan["file_hash"], plan["page_hashes"], plan["ids"], complete=plan["complete"])
+        manifest.save()
+        if added or stale_ids:
+            bump_corpus_version(tenant)
+        stats[plan["status"]] += 1
+        stats["chunks_added"] += added
+        stats["chunks_deleted"] += len(stale_ids)
+        report(path=plan["path"], documents_done=progress["documents_done"] + 1)
+
+    if prune:
+        missing = manifest.missing_sources()
+        for source in missing:
+            entry = manifest.remove(source)
+            print(f"🗑️ Pruning deleted file: {source}")
+            _delete_chunks(db, bm25, entry["chunk_ids"])
+            stats["pruned"] += 1
+            stats["chunks_deleted"] += len(entry["chunk_ids"])
+        if missing:
+            bump_corpus_version(tenant)
+
+    manifest.save()
+    if hasattr(db, "optimize"):
+        with tracer.span("ingest.optimize"):
+            db.optimize()
+    for key in ("new", "updated", "unchanged", "pruned", "failed"):
+        tracer.count("rag_ingest_documents_total", stats[key], status=key)
+    tracer.count("rag_ingest_chunks_total", stats["chunks_added"], op="added")
+    tracer.count("rag_ingest_chunks_total", stats["chunks_deleted"], op="deleted")
+    for route, count in stats["pages"].items():
+        tracer.count("rag_ingest_pages_total", count, path=route)
+    print(
+        f"\nIngestion summary: {stats['new']} new, {stats['updated']} updated, "
+        f"{stats['unchanged']} unchanged, {stats['pruned']} pruned, {stats['failed']} failed "
+        f"(+{stats['chunks_added']}/-{stats['chunks_deleted']} chunks)"
+    )
+    embedding_stats = embeddings.stats_since(embeddings_before)
+    if embedding_stats["texts"]:
+        print(
+            f"Embedding throughput: {embedding_stats['chunks_per_s']:.1f} chunks/s "
+            f"({embedding_stats['cache_hits']} cache hits, {embedding_stats['computed']} computed)"
+        )
+    if stats["pages"]:
+        print("Pages by extraction path: " + ", ".join(
+            f"{count} {route}" for route, count in sorted(stats["pages"].items())))
+    return db, stats
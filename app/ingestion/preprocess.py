@@ -0,0 +1,154 @@
+import io
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps, features
+
+
+def get_ocr_render_dpi() -> int:
+    """Resolution pages are rasterized at for OCR"""
+    return int(os.getenv("OCR_RENDER_DPI", "200"))
+
+def get_ocr_image_mode() -> str:
+    """Colour handling before OCR: 'color', 'gray' or 'binary' (Otsu threshold)"""
+    return os.getenv("OCR_IMAGE_MODE", "gray").lower()
+
+def get_ocr_deskew() -> bool:
+    return os.getenv("OCR_DESKEW", "false").lower() in ("1", "true", "yes")
+
+def get_ocr_crop_margins() -> bool:
+    return os.getenv("OCR_CROP_MARGINS", "true").lower() in ("1", "true", "yes")
+
+def get_ocr_image_format() -> str:
+    """Encoding of page images sent to OCR: 'png', 'jpeg' or 'webp'"""
+    return os.getenv("OCR_IMAGE_FORMAT", "jpeg").lower()
+
+def get_ocr_image_quality() -> int:
+    """Starting quality for lossy formats (1-100)"""
+    return int(os.getenv("OCR_IMAGE_QUALITY", "80"))
+
+def get_ocr_image_max_kb() -> Optional[int]:
+    """Lossy encodings are re-encoded at lower quality until a page fits, or None for no target"""
+    value = os.getenv("OCR_IMAGE_MAX_KB")
+    return int(value) if value else None
+
+
+MIN_QUALITY = 30
+_QUALITY_STEP = 10
+_DESKEW_MAX_ANGLE = 5.0
+_DESKEW_STEP = 0.5
+_DESKEW_WIDTH = 800
+
+
+def otsu_threshold(gray: Image.Image) -> int:
+    """Grey level separating ink from paper, maximizing between-class variance"""
+    histogram = np.array(gray.histogram()[:256], dtype=np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(histogram)
+    mean = np.cumsum(histogram * levels)
+    total, total_mean = weight[-1], mean[-1]
+    background = total - weight
+    valid = (weight > 0) & (background > 0)
+    variance = np.zeros(256)
+    variance[valid] = (total_mean * weight[valid] - total * mean[valid]) ** 2 / (weight[valid] * background[valid])
+    return int(variance.argmax())
+
+
+def skew_angle(gray: Image.Image, threshold: Optional[int] = None) -> float:
+    """
+    Estimate the page's skew in degrees by projection profile: the rotation
+    whose row sums of ink vary the most is the one that lines text rows up.
+    Computed on a downscaled copy; 0.0 for blank pages.
+    """
+    threshold = otsu_threshold(gray) if threshold is None else threshold
+    scale = min(1.0, _DESKEW_WIDTH / gray.width)
+    small = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))))
+    ink = small.point(lambda p: 255 if p <= threshold else 0)
+    best_angle, best_score = 0.0, None
+    steps = int(_DESKEW_MAX_ANGLE / _DESKEW_STEP)
+    for step in range(-steps, steps + 1):
+        angle = step * _DESKEW_STEP
+        rows = np.asarray(ink.rotate(angle, resample=Image.NEAREST), dtype=np.float64).sum(axis=1)
+        score = float(np.var(rows))
+        if best_score is None or score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle if best_score else 0.0
+
+
+def crop_margins(image: Image.Image, gray: Image.Image, threshold: int, padding: float = 0.01) -> Image.Image:
+    """Crop blank margins around the ink, keeping `padding` (fraction of the page) around it"""
+    bbox = gray.point(lambda p: 255 if p <= threshold else 0).getbbox()
+    if bbox is None:
+        return image
+    pad = int(max(image.size) * padding)
+    left, top, right, bottom = bbox
+    return image.crop((max(0, left - pad), max(0, top - pad),
+                       min(image.width, right + pad), min(image.height, bottom + pad)))
+
+
+def encode_image(image: Image.Image, format: str, quality: int, max_kb: Optional[int] = None) -> Tuple[bytes, str]:
+    """
+    Encode a page image. Lossy formats start at `quality` and step down to
+    MIN_QUALITY until the page fits in `max_kb`. WebP falls back to JPEG
+    when Pillow was built without it.
+
+    Returns:
+        (encoded bytes, format used)
+    """
+    if format == "webp" and not features.check("webp"):
+        format = "jpeg"
+    if format not in ("jpeg", "webp"):
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=image.mode == "1")
+        return buffer.getvalue(), "png"
+
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("L" if image.mode in ("1", "LA") else "RGB")
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, format=format.upper(), quality=quality)
+        data = buffer.getvalue()
+        if max_kb is None or len(data) <= max_kb * 1024 or quality <= MIN_QUALITY:
+            return data, format
+        quality = max(MIN_QUALITY, quality - _QUALITY_STEP)
+
+
+def preprocess_page(image: Image.Image, mode: Optional[str] = None, deskew: Optional[bool] = None,
+                    crop: Optional[bool] = None, format: Optional[str] = None, quality: Optional[int] = None,
+                    max_kb: Optional[int] = None) -> bytes:
+    """
+    Prepare a rendered page for OCR: convert it to grayscale or black and
+    white, straighten it, crop its margins and encode it compactly. Every
+    option defaults to its OCR_* environment variable.
+
+    Returns:
+        The encoded page image (PNG, JPEG or WebP; see ocr_transport.image_mime_type)
+    """
+    mode = mode or get_ocr_image_mode()
+    deskew = get_ocr_deskew() if deskew is None else deskew
+    crop = get_ocr_crop_margins() if crop is None else crop
+    format = format or get_ocr_image_format()
+    quality = quality or get_ocr_image_quality()
+    max_kb = max_kb or get_ocr_image_max_kb()
+
+    if mode != "color" or deskew or crop:
+        gray = image if image.mode == "L" else ImageOps.grayscale(image)
+        threshold = otsu_threshold(gray)
+        if mode != "color":
+            image = gray
+        if deskew:
+            angle = skew_angle(gray, threshold)
+            if angle:
+                fill = 255 if image.mode == "L" else (255, 255, 255)
+                image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+                gray = image if image.mode == "L" else ImageOps.grayscale(image)
+        if crop:
+            image = crop_margins(image, gray, threshold)
+        if mode == "binary":
+            # Lossy codecs smear bilevel edges, so JPEG/WebP keep the thresholded page in grayscale
+            image = image.point(lambda p: 255 if p > threshold else 0)
+            if format == "png":
+                image = image.convert("1")
+
+    return encode_image(image, format, quality, max_kb)[0]
@@ -0,0 +1,108 @@
+import asyncio
+import math
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_CONTEXT_RE = re.compile(r'Context:\n(.*?)\n\s*User Question:(.*?)\n\s*Answer:', re.DOTALL)
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_WORD_RE = re.compile(r'\w+')
+
+_STOPWORDS = frozenset(
+    "the and for are was were what which who whom whose when where why how does did has have had this that "
+    "these those with from into about its their there then than can could would should will shall not any "
+    "all some per our your his her they them you".split()
+)
+
+REFUSAL = "The provided documents do not contain this information."
+
+
+def _terms(text: str) -> set:
+    return {word for word in _WORD_RE.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS}
+
+
+def fake_answer(prompt: str) -> str:
+    """
+    Deterministic reply to a generator or validator prompt.
+
+    Validation prompts are answered "Yes"; generation prompts with the
+    context sentence sharing the most words with the question (the earliest
+    on ties), so answers are grounded and reproducible across runs.
+    """
+    if prompt.startswith("You are a validator"):
+        return "Yes"
+    match = _CONTEXT_RE.search(prompt)
+    if not match:
+        return REFUSAL
+    context, question = match.group(1), _terms(match.group(2))
+    best, best_score = None, 0
+    for sentence in _SENTENCE_RE.split(context.strip()):
+        score = len(question & _terms(sentence))
+        if score > best_score:
+            best, best_score = sentence.strip(), score
+    return best or REFUSAL
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for the provider chat models (LLM_PROVIDER=fake).
+
+    Replies with fake_answer after a fixed per-call latency, streams word by
+    word and reports estimated token usage, so benchmarks exercise the full
+    graph (retries, validation, streaming) without network calls or
+    nondeterminism.
+    """
+
+    latency_s: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = messages[-1].content if messages else ""
+        answer = fake_answer(prompt if isinstance(prompt, str) else str(prompt))
+        input_tokens = sum(math.ceil(len(str(message.content)) / 4) for message in messages)
+        output_tokens = math.ceil(len(answer) / 4)
+        return AIMessage(content=answer, usage_metadata={
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        words = reply.content.split(" ")
+        chunks = [ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+                  for i, word in enumerate(words)]
+        chunks[-1].message.usage_metadata = reply.usage_metadata
+        return chunks
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_s)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_s)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -1,17 +1,72 @@
+import math
 import os
 from dotenv import load_dotenv
 from langchain_core.language_models import BaseLanguageModel
 
+from app.tracing import get_tracer
+
 
 # Load environment variables
 load_dotenv()
 
-def get_llm() -> BaseLanguageModel:
+def get_llm_rate_limiter():
+    """
+    Client-side rate limiter from LLM_REQUESTS_PER_SECOND, or None if unset.
+
+    Keeps concurrent callers (batch runs, many async sessions) under the
+    provider's request quota instead of failing with rate-limit errors.
+    """
+    requests_per_second = os.getenv("LLM_REQUESTS_PER_SECOND")
+    if not requests_per_second:
+        return None
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+
+    return InMemoryRateLimiter(
+        requests_per_second=float(requests_per_second),
+        check_every_n_seconds=0.05,
+        max_bucket_size=max(1, int(float(requests_per_second))),
+    )
+
+def _estimate_tokens(messages) -> int:
+    # Same ~4 characters per token heuristic as the context packer
+    return sum(math.ceil(len(str(getattr(message, "content", message))) / 4) for message in messages)
+
+def record_llm_usage(node: str, messages, response) -> dict:
+    """
+    Count an LLM call's tokens on the current span and in the
+    rag_llm_tokens_total counter.
+
+    Providers that report usage_metadata are counted exactly; otherwise the
+    counts are estimated from text length and flagged as such.
+
+    Returns:
+        {"input_tokens", "output_tokens", "estimated"}
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        tokens = {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0),
+                  "estimated": False}
+    else:
+        tokens = {"input_tokens": _estimate_tokens(messages), "output_tokens": _estimate_tokens([response]),
+                  "estimated": True}
+    tracer = get_tracer()
+    tracer.current_span().set(**tokens)
+    tracer.count("rag_llm_tokens_total", tokens["input_tokens"], node=node, kind="input")
+    tracer.count("rag_llm_tokens_total", tokens["output_tokens"], node=node, kind="output")
+    return tokens
+
+def get_llm(rate_limiter=None) -> BaseLanguageModel:
     """
     Initialize and return an LLM based on environment configuration.
-    Supports: Google Gemini, OpenAI GPT, or Ollama (local)
+    Supports: Google Gemini, OpenAI GPT, Ollama (local), or a deterministic
+    offline fake for benchmarks (LLM_PROVIDER=fake, see app.llm.fake)
+
+    Args:
+        rate_limiter: langchain rate limiter shared by every call of the
+            client (default: get_llm_rate_limiter())
     """
     provider = os.getenv("LLM_PROVIDER", "gemini").lower()
+    rate_limiter = rate_limiter or get_llm_rate_limiter()
     
     if provider == "gemini":
         from langchain_google_genai import ChatGoogleGenerativeAI
@@ -24,7 +79,8 @@ def get_llm() -> BaseLanguageModel:
         return ChatGoogleGenerativeAI(
             model=model_name,
             google_api_key=api_key,
-            temperature=0
+            temperature=0,
+            rate_limiter=rate_limiter
         )
     
     elif provider == "openai":
@@ -38,7 +94,8 @@ def get_llm() -> BaseLanguageModel:
         return ChatOpenAI(
             model=model_name,
             api_key=api_key,
-            temperature=0.7
+            temperature=0.7,
+            rate_limiter=rate_limiter
         )
     
     elif provider == "ollama":
@@ -50,9 +107,18 @@ def get_llm() -> BaseLanguageModel:
         return ChatOllama(
             model=model_name,
             base_url=base_url,
-            temperature=0.7
+            temperature=0.7,
+            rate_limiter=rate_limiter
+        )
+    
+    elif provider == "fake":
+        from app.llm.fake import FakeChatModel
+        
+        return FakeChatModel(
+            latency_s=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")) / 1000,
+            rate_limiter=rate_limiter
         )
     
     else:
-        raise ValueError(f"Unsupported LLM provider: {provider}. Choose 'gemini', 'openai', or 'ollama'")
+        raise ValueError(f"Unsupported LLM provider: {provider}. Choose 'gemini', 'openai', 'ollama' or 'fake'")
 
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.embeddings.embedder import get_embedding_model, get_embeddings
+from app.embeddings.query_cache import QueryCache, get_query_cache
+from app.embeddings.reranker import get_rerank_candidates, get_reranker, get_reranker_model, rerank_enabled
+from app.embeddings.vector_store import (DEFAULT_TENANT, get_corpus_version, get_hybrid_fetch_k,
+                                         get_persist_directory, get_retrieval_mode, get_retriever, get_retriever_k,
+                                         get_tenant, get_vector_backend, load_vector_store)
+from app.graph.answer_cache import SemanticAnswerCache, answer_cache_enabled
+from app.llm.models import get_llm
+
+def get_max_tenants() -> int:
+    """Tenants whose resources stay built at once; the least recently used beyond this are dropped"""
+    return int(os.getenv("RAG_MAX_TENANTS", "32"))
+
+
+# Environment variables that change which LLM client get_llm() builds
+LLM_CONFIG_VARS = (
+    "LLM_PROVIDER", "GOOGLE_API_KEY", "GEMINI_MODEL", "OPENAI_API_KEY", "OPENAI_MODEL",
+    "OLLAMA_MODEL", "OLLAMA_BASE_URL", "LLM_REQUESTS_PER_SECOND", "FAKE_LLM_LATENCY_MS",
+)
+
+LOCAL_INDEX_CONFIG_VARS = (
+    "LOCAL_INDEX_DTYPE", "LOCAL_INDEX_MODE", "LOCAL_INDEX_NPROBE", "LOCAL_INDEX_NLIST",
+    "LOCAL_INDEX_QUANTIZATION", "LOCAL_INDEX_PQ_M", "LOCAL_INDEX_RERANK_FACTOR",
+)
+
+ANSWER_CACHE_CONFIG_VARS = (
+    "ANSWER_CACHE_ENABLED", "ANSWER_CACHE_THRESHOLD", "ANSWER_CACHE_TTL", "ANSWER_CACHE_MAX_ENTRIES",
+)
+
+QUERY_CACHE_CONFIG_VARS = ("QUERY_CACHE_ENABLED", "QUERY_CACHE_MAX_ENTRIES")
+
+
+def _env_key(names) -> Tuple:
+    return tuple(os.getenv(name) for name in names)
+
+
+class ResourceRegistry:
+    """
+    Lazily built, process-wide RAG resources: LLM client, embeddings, vector
+    store, retriever, reranker, compiled graphs, the answer cache and the
+    query cache.
+
+    Each resource is stored with the configuration key it was built from and
+    is rebuilt only when that key changes (a relevant environment variable,
+    or the corpus version for the retriever and graphs). Dependent resources
+    are fetched through the registry, so a rebuilt LLM client also yields a
+    recompiled graph.
+
+    The vector store, retriever, graphs and answer cache are per tenant
+    (see app.embeddings.vector_store.get_tenant); `tenant=None` means
+    RAG_TENANT. The LLM client, embeddings, reranker and query cache are
+    shared by all tenants. Resources of at most RAG_MAX_TENANTS tenants
+    besides the default one are kept; the least recently used tenant's are
+    dropped (and rebuilt if it is used again).
+
+    Build and lookup times are recorded so the cold-start cost can be
+    compared with the warm per-request overhead (see report()).
+    """
+
+    def __init__(self):
+        self._resources: Dict[str, Tuple[Tuple, object]] = {}
+        self._stats: Dict[str, dict] = {}
+        # Non-default tenants with built resources, least recently used first
+        self._tenants: "OrderedDict[str, None]" = OrderedDict()
+        # Re-entrant: building a graph fetches the LLM and retriever
+        self._lock = threading.RLock()
+        # Build time of nested resources, so each build is timed exclusively
+        self._nested_build_s = 0.0
+
+    def _get(self, name: str, key_fn: Callable[[], Tuple], factory: Callable[[], object]):
+        start = time.perf_counter()
+        key = key_fn()
+        with self._lock:
+            stats = self._stats.setdefault(name, {"builds": 0, "build_s": 0.0, "cold_s": None,
+                                                  "hits": 0, "lookup_s": 0.0})
+            cached = self._resources.get(name)
+            if cached is not None and cached[0] == key:
+                stats["hits"] += 1
+                stats["lookup_s"] += time.perf_counter() - start
+                return cached[1]
+
+            outer_nested, self._nested_build_s = self._nested_build_s, 0.0
+            try:
+                value = factory()
+            finally:
+                total = time.perf_counter() - start
+                elapsed = total - self._nested_build_s
+                self._nested_build_s = outer_nested + total
+            self._resources[name] = (key, value)
+            stats["builds"] += 1
+            stats["build_s"] += elapsed
+            if stats["cold_s"] is None:
+                stats["cold_s"] = elapsed
+            return value
+
+    def _tenant_get(self, name: str, tenant: str, key_fn: Callable[[], Tuple], factory: Callable[[], object]):
+        with self._lock:
+            if tenant != DEFAULT_TENANT:
+                self._tenants[tenant] = None
+                self._tenants.move_to_end(tenant)
+                while len(self._tenants) > max(1, get_max_tenants()):
+                    self.forget_tenant(next(iter(self._tenants)))
+        return self._get(self._tenant_name(name, tenant), key_fn, factory)
+
+    def _llm_key(self) -> Tuple:
+        return _env_key(LLM_CONFIG_VARS)
+
+    def _store_key(self, tenant: str) -> Tuple:
+        return (get_persist_directory(), tenant, get_embedding_model(), get_vector_backend(),
+                *_env_key(LOCAL_INDEX_CONFIG_VARS))
+
+    def _reranker_key(self) -> Tuple:
+        return (get_reranker_model(),) if rerank_enabled() else (None,)
+
+    def _retriever_key(self, tenant: str) -> Tuple:
+        return (*self._store_key(tenant), get_retrieval_mode(), get_retriever_k(), get_hybrid_fetch_k(),
+                get_corpus_version(tenant), *self._reranker_key(), get_rerank_candidates(),
+                *_env_key(QUERY_CACHE_CONFIG_VARS))
+
+    def _graph_key(self, tenant: str) -> Tuple:
+        return self._llm_key() + self._retriever_key(tenant)
+
+    @staticmethod
+    def _tenant_name(name: str, tenant: str) -> str:
+        # The default tenant keeps the plain names, so report() reads as before
+        return name if tenant == DEFAULT_TENANT else f"{name}[{tenant}]"
+
+    def retriever_k(self) -> int:
+        """Chunks retrieved per question; the reranker picks the final few from a wider set"""
+        return get_rerank_candidates() if rerank_enabled() else get_retriever_k()
+
+    def llm(self):
+        return self._get("llm", self._llm_key, get_llm)
+
+    def embeddings(self):
+        return self._get("embeddings", get_embedding_model, get_embeddings)
+
+    def vector_store(self, tenant: Optional[str] = None):
+        tenant = get_tenant(tenant)
+        return self._tenant_get("vector_store", tenant, lambda: self._store_key(tenant),
+                               lambda: load_vector_store(tenant))
+
+    def retriever(self, tenant: Optional[str] = None):
+        tenant = get_tenant(tenant)
+        return self._tenant_get("retriever", tenant, lambda: self._retriever_key(tenant),
+                               lambda: get_retriever(self.vector_store(tenant), k=self.retriever_k(),
+                                                     cache=self.query_cache(), tenant=tenant))
+
+    def reranker(self):
+        """Cross-encoder reranker, or None when RERANK_ENABLED is off"""
+        return self._get("reranker", self._reranker_key, lambda: get_reranker() if rerank_enabled() else None)
+
+    def graph(self, tenant: Optional[str] = None):
+        """Compiled synchronous graph (invoke)"""
+        from app.graph.rag_graph import build_graph
+
+        tenant = get_tenant(tenant)
+        return self._tenant_get("graph", tenant, lambda: self._graph_key(tenant),
+                               lambda: build_graph(self.retriever(tenant), self.llm(), self.reranker()))
+
+    def async_graph(self, tenant: Optional[str] = None):
+        """Compiled async graph (ainvoke/astream)"""
+        from app.graph.rag_graph import build_async_graph
+
+        tenant = get_tenant(tenant)
+        return self._tenant_get("async_graph", tenant, lambda: self._graph_key(tenant),
+                               lambda: build_async_graph(self.retriever(tenant), self.llm(), self.reranker()))
+
+    def answer_cache(self, tenant: Optional[str] = None) -> Optional[SemanticAnswerCache]:
+        tenant = get_tenant(tenant)
+        return self._tenant_get("answer_cache", tenant, lambda: _env_key(ANSWER_CACHE_CONFIG_VARS),
+                               lambda: SemanticAnswerCache(self.embeddings(), tenant=tenant)
+                               if answer_cache_enabled() else None)
+
+    def query_cache(self) -> Optional[QueryCache]:
+        """Query embedding and retrieval result cache shared across turns, or None when disabled"""
+        return self._get("query_cache", lambda: _env_key(QUERY_CACHE_CONFIG_VARS), get_query_cache)
+
+    def forget_tenant(self, tenant: str) -> None:
+        """Drop a tenant's resources and statistics; they are rebuilt if the tenant is used again"""
+        suffix = f"[{tenant}]"
+        with self._lock:
+            self._tenants.pop(tenant, None)
+            for name in [name for name in self._resources if name.endswith(suffix)]:
+                del self._resources[name]
+            for name in [name for name in self._stats if name.endswith(suffix)]:
+                del self._stats[name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._resources.clear()
+            self._tenants.clear()
+
+    def report(self) -> dict:
+        """
+        Returns:
+            {"cold_start_s": sum of every resource's first build time,
+             "warm_lookup_ms": mean cost of fetching an already built resource,
+             "resources": {name: {"builds", "build_s", "cold_s", "hits", "lookup_s"}}}
+        """
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        hits = sum(values["hits"] for values in stats.values())
+        return {
+            "cold_start_s": sum(values["cold_s"] or 0.0 for values in stats.values()),
+            "warm_lookup_ms": 1000 * sum(values["lookup_s"] for values in stats.values()) / hits if hits else 0.0,
+            "resources": stats,
+        }
+
+
+_registry: Optional[ResourceRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ResourceRegistry:
+    """Return the process-wide resource registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ResourceRegistry()
+        return _registry
@@ -1,6 +1,6 @@
 from typing import TypedDict, List, Optional
 from langchain_core.documents import Document
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, HumanMessage
 
 class AgentState(TypedDict):
     messages: List[BaseMessage]
@@ -8,4 +8,21 @@ class AgentState(TypedDict):
     retries: int
     validated: bool
     final_answer: Optional[str]
-    
\ No newline at end of file
+    # Retrieved documents packed into the prompt budget (see app.agents.context)
+    context: Optional[str]
+    # Metadata filter applied by the retrieve node (see app.embeddings.filters)
+    filter: Optional[dict]
+
+
+def initial_state(question: str, documents: Optional[List[Document]] = None,
+                  filter: Optional[dict] = None) -> AgentState:
+    """State for a new question; prefilled documents skip the retrieve node"""
+    return {
+        "messages": [HumanMessage(content=question)],
+        "documents": documents or [],
+        "retries": 0,
+        "validated": False,
+        "final_answer": None,
+        "context": None,
+        "filter": filter
+    }
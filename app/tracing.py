@@ -0,0 +1,309 @@
+import atexit
+import contextvars
+import cProfile
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def tracing_enabled() -> bool:
+    return os.getenv("TRACING_ENABLED", "true").lower() not in ("0", "false", "no")
+
+def get_trace_export_dir() -> Optional[str]:
+    """Directory receiving spans.jsonl, metrics.prom and profiles/ (unset = keep in memory only)"""
+    return os.getenv("TRACE_EXPORT_DIR") or None
+
+def get_trace_buffer_size() -> int:
+    """Finished spans held in memory until the next export"""
+    return int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+
+def get_profile_spans() -> frozenset:
+    """Span names run under cProfile (comma-separated, '*' for every span)"""
+    return frozenset(name.strip() for name in os.getenv("PROFILE_SPANS", "").split(",") if name.strip())
+
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Span:
+    """A timed operation; attributes can be added while it is open"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration_s", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.duration_s: Optional[float] = None
+        self.attributes = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start": self.start, "duration_s": self.duration_s, "attributes": self.attributes, "error": self.error,
+            "pid": os.getpid(),
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when tracing is disabled"""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _label_text(labels: Tuple) -> str:
+    return ",".join(f'{key}="{str(value)}"' for key, value in labels)
+
+
+class Tracer:
+    """
+    In-process spans and metrics for ingestion stages and graph nodes.
+
+    Every finished span is kept in a bounded buffer (exported as JSON lines)
+    and folded into a per-name latency histogram; counters (LLM tokens,
+    retries, cache hits) are labelled sums. Both are exported in Prometheus
+    text format. Spans named in PROFILE_SPANS run under cProfile, with one
+    accumulated profile per span name.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, buffer_size: Optional[int] = None):
+        self.enabled = tracing_enabled() if enabled is None else enabled
+        self.profile_spans = get_profile_spans()
+        self._lock = threading.Lock()
+        self._pending: deque = deque(maxlen=buffer_size or get_trace_buffer_size())
+        # name -> [bucket counts..., +Inf count], sum, max
+        self._durations: Dict[str, dict] = {}
+        self._errors: Dict[str, int] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        # cProfile supports one active profiler at a time, so one profiled span runs at once
+        self._profiling = False
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        profiler = self._start_profile(name)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_s = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    self._profiling = False
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                pass  # an async generator resumed in another task's context
+            self._record(span.to_dict())
+
+    def current_span(self):
+        """The innermost open span of this thread/task (a no-op span if none)"""
+        return _current_span.get() or _NOOP_SPAN
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a labelled counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _start_profile(self, name: str) -> Optional[cProfile.Profile]:
+        if not self.profile_spans or ("*" not in self.profile_spans and name not in self.profile_spans):
+            return None
+        with self._lock:
+            if self._profiling:
+                return None  # nested in (or concurrent with) a profiled span
+            profiler = self._profiles.setdefault(name, cProfile.Profile())
+            try:
+                profiler.enable()
+            except ValueError:
+                return None  # another profiler (e.g. an outer cProfile run) is active
+            self._profiling = True
+        return profiler
+
+    def _record(self, record: dict) -> None:
+        name, duration = record["name"], record["duration_s"]
+        with self._lock:
+            self._pending.append(record)
+            histogram = self._durations.setdefault(
+                name, {"buckets": [0] * (len(DURATION_BUCKETS) + 1), "sum": 0.0, "max": 0.0})
+            index = next((i for i, bound in enumerate(DURATION_BUCKETS) if duration <= bound), len(DURATION_BUCKETS))
+            histogram["buckets"][index] += 1
+            histogram["sum"] += duration
+            histogram["max"] = max(histogram["max"], duration)
+            if record["error"]:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def drain(self) -> dict:
+        """
+        Take and reset everything recorded so far.
+
+        Used by worker processes to ship their spans and counters back to
+        the parent, which folds them in with merge().
+        """
+        with self._lock:
+            data = {"spans": list(self._pending),
+                    "counters": [(name, list(labels), value) for (name, labels), value in self._counters.items()]}
+            self._pending.clear()
+            self._durations.clear()
+            self._errors.clear()
+            self._counters.clear()
+        return data
+
+    def merge(self, data: Optional[dict]) -> None:
+        """Fold in the output of another process's drain()"""
+        if not data or not self.enabled:
+            return
+        for record in data["spans"]:
+            self._record(record)
+        for name, labels, value in data["counters"]:
+            self.count(name, value, **dict(labels))
+
+    def summary(self) -> Dict[str, dict]:
+        """Per span name: {"count", "total_s", "mean_ms", "max_ms", "errors"}"""
+        with self._lock:
+            durations = {name: dict(values) for name, values in self._durations.items()}
+            errors = dict(self._errors)
+        summary = {}
+        for name, values in sorted(durations.items()):
+            count = sum(values["buckets"])
+            summary[name] = {"count": count, "total_s": values["sum"], "mean_ms": 1000 * values["sum"] / count,
+                             "max_ms": 1000 * values["max"], "errors": errors.get(name, 0)}
+        return summary
+
+    def counters(self) -> Dict[str, float]:
+        """Counter values keyed by Prometheus-style name{labels}"""
+        with self._lock:
+            items = sorted(self._counters.items())
+        return {f"{name}{{{_label_text(labels)}}}" if labels else name: value for (name, labels), value in items}
+
+    def prometheus_text(self) -> str:
+        """Span latency histograms, error counts and counters in Prometheus text format"""
+        with self._lock:
+            durations = {name: dict(values) for name, values in self._durations.items()}
+            errors = dict(self._errors)
+            counters = sorted(self._counters.items())
+        lines = ["# HELP rag_span_duration_seconds Duration of traced spans",
+                 "# TYPE rag_span_duration_seconds histogram"]
+        for name, values in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip((*DURATION_BUCKETS, "+Inf"), values["buckets"]):
+                cumulative += count
+                lines.append(f'rag_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'rag_span_duration_seconds_sum{{span="{name}"}} {values["sum"]:.6f}')
+            lines.append(f'rag_span_duration_seconds_count{{span="{name}"}} {cumulative}')
+        lines += ["# HELP rag_span_errors_total Traced spans that raised",
+                  "# TYPE rag_span_errors_total counter"]
+        lines += [f'rag_span_errors_total{{span="{name}"}} {count}' for name, count in sorted(errors.items())]
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{{{_label_text(labels)}}} {value:g}" if labels else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: Optional[str] = None) -> Optional[str]:
+        """
+        Append pending spans to <dir>/spans.jsonl and rewrite <dir>/metrics.prom
+        and <dir>/profiles/<span>.prof (default dir: TRACE_EXPORT_DIR).
+
+        Returns:
+            The export directory, or None if there is none configured
+        """
+        directory = directory or get_trace_export_dir()
+        if not directory or not self.enabled:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            spans = list(self._pending)
+            self._pending.clear()
+            profiles = dict(self._profiles)
+        with open(os.path.join(directory, "spans.jsonl"), "a", encoding="utf-8") as file:
+            for record in spans:
+                file.write(json.dumps(record, default=str) + "\n")
+        tmp_path = os.path.join(directory, "metrics.prom.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.prometheus_text())
+        os.replace(tmp_path, os.path.join(directory, "metrics.prom"))
+        if profiles:
+            os.makedirs(os.path.join(directory, "profiles"), exist_ok=True)
+            for name, profiler in profiles.items():
+                profiler.dump_stats(os.path.join(directory, "profiles", f"{name}.prof"))
+        return directory
+
+    def format_summary(self) -> str:
+        """Human-readable per-span latency table"""
+        rows = [f"{'span':<28} {'count':>6} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'errors':>6}"]
+        for name, values in self.summary().items():
+            rows.append(f"{name:<28} {values['count']:>6} {values['total_s']:9.2f} {values['mean_ms']:9.1f} "
+                        f"{values['max_ms']:9.1f} {values['errors']:>6}")
+        for name, value in self.counters().items():
+            rows.append(f"{name} = {value:g}")
+        return "\n".join(rows)
+
+
+def traced(name: str):
+    """
+    Decorator running a function (sync or async) inside a span.
+
+    functools.wraps keeps the wrapped signature visible, so LangGraph still
+    passes `config` to nodes that declare it.
+    """
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer, exporting it at exit when TRACE_EXPORT_DIR is set"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+            atexit.register(_tracer.export)
+        return _tracer
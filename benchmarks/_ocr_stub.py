@@ -0,0 +1,145 @@
+"""
+Local stand-in for the DeepSeek OCR chat-completions endpoint.
+
+Answers POST /chat/completions like the real API, with a configurable
+per-request latency (plus a per-page cost), its own server-side rate limit
+(429 with Retry-After beyond it) and a fraction of injected 503s, so the
+OCR transport's pooling, throttling and retries can be exercised offline.
+Each page is "transcribed" as a line derived from its image hash, and
+batched requests are answered with one line per image joined by the
+transport's page separator.
+
+Usage (then point DEEPSEEK_OCR_ENDPOINT at it, with any DEEPSEEK_API_KEY
+and DEFAULT_HEADERS_ID):
+    python -m benchmarks._ocr_stub --port 8765 --latency-ms 200 --rps 20 --error-rate 0.05
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.ingestion.ocr_transport import PAGE_SEPARATOR, TokenBucket
+
+
+def stub_transcription(image: bytes) -> str:
+    return f"Stub transcription of page {hashlib.sha256(image).hexdigest()[:12]}."
+
+
+class OCRStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_s: float = 0.1, page_latency_s: float = 0.02,
+                 requests_per_second: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(address, _Handler)
+        self.latency_s = latency_s
+        self.page_latency_s = page_latency_s
+        self.bucket = TokenBucket(requests_per_second) if requests_per_second else None
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "requests": 0, "pages": 0, "throttled": 0, "errors": 0}
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, **changes) -> None:
+        with self.lock:
+            for key, value in changes.items():
+                self.stats[key] += value
+
+    def admit(self) -> int:
+        """HTTP status for the next request: 200, 429 (over the rate limit) or 503 (injected failure)"""
+        # A real API rejects excess requests rather than queueing them
+        if self.bucket is not None and not self.bucket.try_acquire():
+            self.count(throttled=1)
+            return 429
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            self.count(errors=1)
+            return 503
+        return 200
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible in the stats
+    disable_nagle_algorithm = True  # headers and body are written separately; avoid delayed-ACK stalls
+
+    def setup(self):
+        super().setup()
+        self.server.count(connections=1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers: dict = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.count(requests=1)
+        if self.path.rstrip("/") != "/chat/completions" or not self.headers.get("Authorization"):
+            self._reply(404 if self.headers.get("Authorization") else 401, {"error": "bad request"})
+            return
+
+        status = self.server.admit()
+        if status == 429:
+            self._reply(429, {"error": "rate limited"}, {"Retry-After": "0.2"})
+            return
+        if status == 503:
+            time.sleep(self.server.latency_s / 2)
+            self._reply(503, {"error": "unavailable"})
+            return
+
+        images = [base64.b64decode(part["image_url"]["url"].split(",", 1)[1])
+                  for message in payload.get("messages", []) for part in message.get("content", [])
+                  if part.get("type") == "image_url"]
+        time.sleep(self.server.latency_s + self.server.page_latency_s * len(images))
+        self.server.count(pages=len(images))
+        text = f"\n{PAGE_SEPARATOR}\n".join(stub_transcription(image) for image in images)
+        self._reply(200, {"choices": [{"message": {"role": "assistant", "content": text}}]})
+
+
+def start_stub_server(port: int = 0, **options) -> OCRStubServer:
+    """Start a stub server on a background thread (port 0 = any free port)"""
+    server = OCRStubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="fixed latency per request")
+    parser.add_argument("--page-latency-ms", type=float, default=20.0, help="extra latency per page in a request")
+    parser.add_argument("--rps", type=float, default=0.0, help="server-side rate limit (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = OCRStubServer(("127.0.0.1", args.port), latency_s=args.latency_ms / 1000,
+                           page_latency_s=args.page_latency_ms / 1000, requests_per_second=args.rps,
+                           error_rate=args.error_rate)
+    print(f"OCR stub listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Helpers for building benchmark inputs from the sample PDFs in data/."""
+import os
+import random
+from typing import List
+
+from pypdf import PdfReader, PdfWriter
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+STANDARD_PDF = os.path.join(DATA_DIR, "standard_test.pdf")
+SCANNED_PDF = os.path.join(DATA_DIR, "scanned_test.pdf")
+
+
+def replicate_pdf(src_path: str, copies: int, out_path: str) -> str:
+    """Write a PDF containing every page of `src_path` repeated `copies` times"""
+    reader = PdfReader(src_path)
+    writer = PdfWriter()
+    for _ in range(copies):
+        for page in reader.pages:
+            writer.add_page(page)
+    with open(out_path, "wb") as file:
+        writer.write(file)
+    return out_path
+
+
+# Vocabulary for synthetic pages; every page also quotes the text of the sample PDF
+_TEAMS = ["infrastructure", "compliance", "security", "logistics", "finance", "research", "facilities", "legal"]
+_CODES = ["ALPHA", "BETA", "GAMMA", "DELTA", "KAPPA", "OMEGA", "SIGMA", "THETA"]
+_SUBJECTS = ["The review board", "The northern facility", "Each quarterly audit", "The maintenance crew",
+             "The archive office", "Every visitor", "The procurement desk", "The field inspector"]
+_VERBS = ["recorded", "approved", "inspected", "rescheduled", "documented", "escalated", "archived", "verified"]
+_OBJECTS = ["the pump replacement", "the badge request", "the safety drill", "the budget variance",
+            "the vendor contract", "the incident report", "the storage migration", "the access log"]
+
+
+def synthetic_record(index: int) -> dict:
+    """The fact planted on synthetic page `index`, with a question it answers"""
+    rng = random.Random(index)
+    code = f"REC-{index:04d}-{_CODES[index % len(_CODES)]}"
+    team, budget, year = rng.choice(_TEAMS), rng.randint(10, 990), rng.randint(2005, 2024)
+    return {
+        "code": code,
+        "sentence": f"Record {code} was filed by the {team} team in {year} with a budget of {budget} thousand dollars.",
+        "question": f"What budget was filed for record {code}?",
+        "expected": f"{budget} thousand dollars",
+    }
+
+
+def synthetic_page_text(index: int, sentences: int = 30, sample_text: str = "") -> str:
+    """Deterministic prose for one page: filler, the page's record and a quote of the sample PDF"""
+    rng = random.Random(f"page-{index}")
+    lines = [
+        f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} on day {rng.randint(1, 365)} "
+        f"after {rng.randint(2, 40)} weeks of review."
+        for _ in range(sentences)
+    ]
+    lines.insert(rng.randint(0, len(lines)), synthetic_record(index)["sentence"])
+    if sample_text:
+        lines.append(sample_text)
+    return " ".join(lines)
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + ([line] if line else [])
+
+
+def text_pdf_lines(text: str) -> List[str]:
+    """The lines of `text` that write_text_pdf puts on its page (long texts are cut off)"""
+    return _wrap(text, 95)[:54]
+
+
+def write_text_pdf(page_texts: List[str], out_path: str) -> str:
+    """
+    Write a PDF with one page of Helvetica text per entry (a text layer that
+    pypdf extracts), without needing a PDF authoring library.
+    """
+    def escape(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    page_count = len(page_texts)
+    # 1: catalog, 2: page tree, 3: font, then a (page, content stream) pair per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Count %d /Kids [%s] >>" % (
+            page_count, " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count)))).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, text in enumerate(page_texts):
+        body = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(
+            f"({escape(line)}) Tj T*" for line in text_pdf_lines(text)) + " ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                        "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i)).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(out_path, "wb") as file:
+        file.write(out)
+    return out_path
+
+
+def synthetic_page_texts(pages: int, first_index: int = 0) -> List[str]:
+    """The text of `pages` distinct synthetic pages seeded with the standard sample's text"""
+    sample = " ".join(page.extract_text() or "" for page in PdfReader(STANDARD_PDF).pages).strip()
+    return [synthetic_page_text(first_index + i, sample_text=sample) for i in range(pages)]
+
+
+def synthetic_text_pdf(pages: int, out_path: str, first_index: int = 0) -> str:
+    """A text PDF of `pages` distinct synthetic pages seeded with the standard sample's text"""
+    return write_text_pdf(synthetic_page_texts(pages, first_index), out_path)
+
+
+def synthetic_scanned_pdf(pages: int, out_path: str, first_index: int = 0, dpi: int = 150) -> str:
+    """
+    An image-only PDF of `pages` distinct synthetic pages (a rasterized
+    synthetic text PDF). Falls back to replicating the scanned sample when
+    poppler is unavailable; its pages are identical, so OCR cache hits are
+    likely.
+    """
+    from pdf2image import convert_from_path
+
+    text_path = synthetic_text_pdf(pages, f"{out_path}.text.pdf", first_index)
+    try:
+        images = convert_from_path(text_path, dpi=dpi, grayscale=True)
+    except Exception as e:
+        print(f"Could not rasterize synthetic pages ({e}); replicating {os.path.basename(SCANNED_PDF)} instead")
+        return replicate_pdf(SCANNED_PDF, pages, out_path)
+    finally:
+        os.remove(text_path)
+    images[0].save(out_path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return out_path
@@ -0,0 +1,48 @@
+"""
+Benchmark the streaming OCR pipeline on data/scanned_test.pdf replicated N times.
+
+Usage:
+    python -m benchmarks.bench_ocr --copies 20 --workers 1 2 4 --executor thread
+
+Replicated pages render to identical images, so run with OCR_CACHE_ENABLED=false
+to measure raw OCR throughput rather than cache hits.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from app.ingestion.pdf_loader import find_poppler, ocr_pdf
+from benchmarks._pdfs import SCANNED_PDF, replicate_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=10, help="times to replicate the scanned sample")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--json", help="optional path to write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = replicate_pdf(SCANNED_PDF, args.copies, os.path.join(tmp, "scanned_replicated.pdf"))
+        for workers in args.workers:
+            _, timings = ocr_pdf(pdf_path, poppler_path=find_poppler(), workers=workers, executor_kind=args.executor)
+            timings["pages_per_s"] = timings["pages"] / timings["wall_s"] if timings["wall_s"] else 0.0
+            results.append(timings)
+            print(
+                f"{timings['backend']:>9} {timings['executor']:>7} x{workers:<3} "
+                f"{timings['pages']:>4} pages  wall {timings['wall_s']:7.2f}s  "
+                f"render {timings['render_s']:6.2f}s  preprocess {timings['preprocess_s']:6.2f}s  "
+                f"{timings['image_bytes'] / max(1, timings['pages']) / 1024:7.1f} KB/page  ocr {timings['ocr_s']:7.2f}s  "
+                f"{timings['pages_per_s']:6.2f} pages/s  cache hits {timings['cache_hits']}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
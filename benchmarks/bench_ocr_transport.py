@@ -0,0 +1,133 @@
+"""
+Benchmark the DeepSeek OCR transport against a local stub of the API.
+
+Starts benchmarks._ocr_stub in-process and sends the same synthetic pages
+through:
+
+- naive:     the previous client, one requests.post (new connection, no
+             retries) per page from a thread pool
+- transport: OCRTransport with a pooled session, bounded concurrency,
+             retries and optional batching
+
+at each concurrency level and batch size, reporting pages/s, connections
+the server accepted, retries and failed pages. Use --error-rate and --rps
+to inject 503s and server-side 429s, and --client-rps to throttle the
+transport below the server's limit.
+
+Usage:
+    python -m benchmarks.bench_ocr_transport --pages 64 --concurrency 1 4 8 --batch-size 1 4 --error-rate 0.05
+"""
+import argparse
+import base64
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.ingestion.ocr_transport import OCRTransport
+from benchmarks._ocr_stub import start_stub_server, stub_transcription
+
+
+def naive_extract(endpoint: str, image: bytes) -> str:
+    """One page per request on a fresh connection, the way the OCR client used to call the API"""
+    payload = {
+        "model": OCRTransport.MODEL,
+        "messages": [{"role": "user", "content": [
+            {"type": "text", "text": "Free OCR."},
+            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64.b64encode(image).decode('utf-8')}"}},
+        ]}],
+        "max_tokens": 2048,
+        "temperature": 0,
+    }
+    response = requests.post(f"{endpoint}/chat/completions", json=payload, timeout=60,
+                             headers={"Authorization": "Bearer bench", "id": "bench"})
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def run(client: str, images, concurrency: int, batch_size: int, client_rps: float, stub_options: dict) -> dict:
+    server = start_stub_server(**stub_options)
+    transport = None
+    if client == "transport":
+        transport = OCRTransport(server.endpoint, "bench", header_id="bench", concurrency=concurrency,
+                                 requests_per_second=client_rps or None, max_retries=6, timeout=120,
+                                 backoff_base=0.05, backoff_cap=1.0)
+    batches = [images[start:start + batch_size] for start in range(0, len(images), batch_size)]
+
+    def extract(batch):
+        try:
+            if transport is not None:
+                return transport.extract(batch, batch_size=batch_size)
+            return [naive_extract(server.endpoint, image) for image in batch]
+        except Exception:
+            return [None] * len(batch)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        texts = [text for batch_texts in pool.map(extract, batches) for text in batch_texts]
+    wall = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    if transport is not None:
+        transport.close()
+
+    correct = sum(text == stub_transcription(image) for text, image in zip(texts, images))
+    return {
+        "client": client,
+        "client_rps": client_rps if transport else None,
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "pages": len(images),
+        "correct": correct,
+        "failed": sum(text is None for text in texts),
+        "wall_s": wall,
+        "pages_per_s": len(images) / wall if wall else 0.0,
+        "connections": server.stats["connections"],
+        "requests": server.stats["requests"],
+        "throttled": server.stats["throttled"],
+        "errors": server.stats["errors"],
+        "retries": transport.stats["retries"] if transport else 0,
+        "split_failures": transport.stats["split_failures"] if transport else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub latency per request")
+    parser.add_argument("--page-latency-ms", type=float, default=10.0, help="stub latency per page")
+    parser.add_argument("--rps", type=float, default=0.0, help="stub server-side rate limit (0 = unlimited)")
+    parser.add_argument("--client-rps", type=float, default=0.0, help="OCRTransport rate limit (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests answered with 503")
+    parser.add_argument("--json", help="optional path to write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    images = [rng.randbytes(2048) for _ in range(args.pages)]
+    stub_options = {"latency_s": args.latency_ms / 1000, "page_latency_s": args.page_latency_ms / 1000,
+                    "requests_per_second": args.rps, "error_rate": args.error_rate}
+
+    results = []
+    for concurrency in args.concurrency:
+        runs = [("naive", 1)] + [("transport", batch_size) for batch_size in args.batch_size]
+        for client, batch_size in runs:
+            result = run(client, images, concurrency, batch_size, args.client_rps, stub_options)
+            results.append(result)
+            print(
+                f"{client:>9} x{concurrency:<3} batch {batch_size:<3} "
+                f"{result['correct']:>4}/{result['pages']} pages  wall {result['wall_s']:6.2f}s  "
+                f"{result['pages_per_s']:7.2f} pages/s  connections {result['connections']:>4}  "
+                f"requests {result['requests']:>4}  retries {result['retries']:>3}  failed {result['failed']}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
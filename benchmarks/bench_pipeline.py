@@ -0,0 +1,307 @@
+"""
+Reproducible ingestion and query benchmark with JSON results.
+
+Generates synthetic text and scanned PDFs (distinct pages seeded with the
+text of the data/ samples, each planting a record that a question asks
+about), then measures:
+
+- per-stage throughput: extract, OCR, clean, chunk, embed and index, each
+  in isolation and with the embedding and OCR caches disabled
+- end-to-end ingestion through ingest_documents
+- end-to-end query latency p50/p95 through the async graph with the
+  deterministic fake LLM (LLM_PROVIDER=fake), plus answer accuracy and the
+  per-node span breakdown
+
+Results are written as JSON; --baseline compares the run with an earlier
+one and --diff compares two result files without running anything.
+
+Usage:
+    python -m benchmarks.bench_pipeline --text-pages 200 --scanned-pages 10 --output results/base.json
+    python -m benchmarks.bench_pipeline --output results/new.json --baseline results/base.json
+    python -m benchmarks.bench_pipeline --diff results/base.json results/new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.embeddings.bm25 import BM25Index
+from app.embeddings.embedder import CachedEmbeddings
+from app.embeddings.vector_store import get_vector_backend
+from app.ingestion.cleaner import chunk_documents, clean_text
+from app.ingestion.manifest import chunk_ids
+from app.ingestion.pdf_loader import extract_pages_from_pdf, find_poppler, ocr_pdf
+from app.ingestion.pipeline import ingest_documents
+from app.resources import ResourceRegistry
+from app.state import initial_state
+from app.tracing import get_tracer
+from benchmarks._pdfs import synthetic_record, synthetic_scanned_pdf, synthetic_text_pdf
+
+# Metrics compared between runs: (path, True if higher is better)
+COMPARED_METRICS = [
+    ("stages.extract.per_s", True),
+    ("stages.ocr.per_s", True),
+    ("stages.clean.per_s", True),
+    ("stages.chunk.per_s", True),
+    ("stages.embed.per_s", True),
+    ("stages.index.per_s", True),
+    ("ingest.pages_per_s", True),
+    ("query.p50_ms", False),
+    ("query.p95_ms", False),
+    ("query.accuracy", True),
+]
+
+# Configuration recorded with every run so results are only compared like for like
+RECORDED_ENV = ["VECTOR_BACKEND", "RETRIEVAL_MODE", "RETRIEVER_K", "EMBEDDING_MODEL", "EMBEDDING_BATCH_SIZE",
+                "VALIDATOR_MODE", "RERANK_ENABLED", "CONTEXT_TOKEN_BUDGET", "LOCAL_INDEX_MODE",
+                "LOCAL_INDEX_QUANTIZATION", "INGEST_BATCH_SIZE", "OCR_WORKERS", "OCR_RENDER_DPI", "OCR_IMAGE_MODE",
+                "OCR_IMAGE_FORMAT", "FAKE_LLM_LATENCY_MS"]
+
+
+def _rate(items: int, seconds: float, unit: str) -> dict:
+    return {"items": items, "unit": unit, "seconds": seconds, "per_s": items / seconds if seconds else 0.0}
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_stages(text_pdfs: List[str], scanned_pdfs: List[str], workdir: str) -> Dict[str, dict]:
+    """Throughput of every ingestion stage in isolation"""
+    stages = {}
+    pages, seconds = [], 0.0
+    for path in text_pdfs:
+        extracted, elapsed = _timed(extract_pages_from_pdf, path)
+        pages += extracted
+        seconds += elapsed
+    stages["extract"] = _rate(len(pages), seconds, "pages")
+
+    if not scanned_pdfs:
+        stages["ocr"] = {"skipped": "no scanned pages"}
+    else:
+        ocr_pages, seconds = 0, 0.0
+        try:
+            for path in scanned_pdfs:
+                (texts, _), elapsed = _timed(lambda p: ocr_pdf(p, poppler_path=find_poppler()), path)
+                ocr_pages += len(texts)
+                seconds += elapsed
+            stages["ocr"] = _rate(ocr_pages, seconds, "pages")
+        except Exception as e:
+            stages["ocr"] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    text = "\n".join(pages)
+    cleaned, seconds = _timed(clean_text, text)
+    stages["clean"] = dict(_rate(len(text), seconds, "chars"), mb_per_s=len(text) / 1e6 / seconds if seconds else 0.0)
+
+    chunks, seconds = _timed(chunk_documents, cleaned)
+    stages["chunk"] = _rate(len(chunks), seconds, "chunks")
+    for chunk in chunks:
+        chunk.metadata["source"] = "benchmark"
+    texts = [chunk.page_content for chunk in chunks]
+
+    embeddings = CachedEmbeddings(cache=None)
+    embeddings.embed_documents(texts[:8], log=False)  # load the model outside the timing
+    vectors, seconds = _timed(lambda batch: embeddings.embed_documents(batch, log=False), texts)
+    stages["embed"] = _rate(len(texts), seconds, "chunks")
+
+    class Precomputed(Embeddings):
+        """Serves the vectors computed above, so indexing is timed without embedding"""
+
+        def __init__(self):
+            self.vectors = dict(zip(texts, vectors))
+
+        def embed_documents(self, batch):
+            return [self.vectors[text] for text in batch]
+
+        def embed_query(self, query):
+            return self.vectors[query]
+
+    store = _open_store(os.path.join(workdir, "stage_index"), Precomputed())
+    bm25 = BM25Index(os.path.join(workdir, "stage_index", "bm25.sqlite"))
+    ids = chunk_ids("benchmark", chunks)
+    batch_size = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    start = time.perf_counter()
+    for batch_start in range(0, len(chunks), batch_size):
+        batch = slice(batch_start, batch_start + batch_size)
+        store.add_documents(chunks[batch], ids=ids[batch])
+        bm25.add(ids[batch], chunks[batch])
+    stages["index"] = _rate(len(chunks), time.perf_counter() - start, "chunks")
+    return stages
+
+
+def _open_store(path: str, embeddings):
+    os.makedirs(path, exist_ok=True)
+    if get_vector_backend() == "local":
+        from app.embeddings.local_index import LocalVectorIndex
+
+        return LocalVectorIndex(os.path.join(path, "local_index"), embedding_function=embeddings)
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma(persist_directory=path, embedding_function=embeddings)
+
+
+def bench_end_to_end(pdfs: List[str], page_count: int, records: List[dict]) -> dict:
+    """Full ingestion, then the records' questions answered one at a time through the async graph"""
+    get_tracer().drain()
+    start = time.perf_counter()
+    _, stats = ingest_documents(pdfs)
+    ingest_s = time.perf_counter() - start
+    ingest = {"seconds": ingest_s, "documents": len(pdfs), "pages": page_count,
+              "chunks": stats["chunks_added"], "pages_per_s": page_count / ingest_s if ingest_s else 0.0}
+
+    graph = ResourceRegistry().async_graph()
+    ingest_spans = get_tracer().summary()
+
+    async def run() -> List[dict]:
+        await graph.ainvoke(initial_state(records[0]["question"]))  # warm up models and caches
+        # Keep only the measured questions' spans
+        get_tracer().drain()
+        results = []
+        for record in records:
+            question_start = time.perf_counter()
+            state = await graph.ainvoke(initial_state(record["question"]))
+            results.append({"latency_s": time.perf_counter() - question_start,
+                            "correct": record["expected"] in (state.get("final_answer") or ""),
+                            "retries": state.get("retries", 0)})
+        return results
+
+    results = asyncio.run(run())
+    latencies = sorted(result["latency_s"] for result in results)
+    query = {
+        "questions": len(results),
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "mean_ms": 1000 * statistics.mean(latencies),
+        "accuracy": sum(result["correct"] for result in results) / len(results),
+        "mean_retries": statistics.mean(result["retries"] for result in results),
+    }
+    return {"ingest": ingest, "query": query, "spans": {"ingest": ingest_spans, "query": get_tracer().summary()}}
+
+
+def _lookup(results: dict, path: str) -> Optional[float]:
+    value = results
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> List[str]:
+    """
+    Print every compared metric side by side.
+
+    Returns:
+        The metrics that regressed by more than `threshold` (a fraction)
+    """
+    print(f"{'metric':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+    regressions = []
+    for path, higher_is_better in COMPARED_METRICS:
+        old, new = _lookup(baseline, path), _lookup(current, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        regressed = -change > threshold if higher_is_better else change > threshold
+        if regressed:
+            regressions.append(path)
+        print(f"{path:<24} {old:12.2f} {new:12.2f} {change:+8.1%}" + ("  REGRESSION" if regressed else ""))
+    for key in sorted(set(baseline.get("config", {})) | set(current.get("config", {}))):
+        if baseline.get("config", {}).get(key) != current.get("config", {}).get(key):
+            print(f"note: config {key} differs: {baseline['config'].get(key)!r} -> {current['config'].get(key)!r}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text-pages", type=int, default=100, help="synthetic text pages in total")
+    parser.add_argument("--scanned-pages", type=int, default=5, help="synthetic scanned pages in total")
+    parser.add_argument("--docs", type=int, default=4, help="documents the text pages are split across")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated latency per fake LLM call")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", help="compare with an earlier results JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="fractional change counted as a regression")
+    parser.add_argument("--diff", nargs=2, metavar=("BASELINE", "CURRENT"), help="only compare two result files")
+    args = parser.parse_args()
+
+    if args.diff:
+        with open(args.diff[0]) as old, open(args.diff[1]) as new:
+            sys.exit(1 if compare(json.load(old), json.load(new), args.threshold) else 0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Isolate the run: fresh store and caches, offline deterministic LLM
+        os.environ.update({
+            "LLM_PROVIDER": "fake",
+            "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+            "VECTOR_DB_DIR": os.path.join(workdir, "vector_db"),
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "OCR_CACHE_ENABLED": "false",
+            "ANSWER_CACHE_ENABLED": "false",
+        })
+        # Documents hold consecutive synthetic pages 0..text_pages-1; scanned pages follow
+        docs = max(1, min(args.docs, args.text_pages))
+        text_pdfs, first_index = [], 0
+        for i in range(docs):
+            pages = len(range(i, args.text_pages, docs))
+            text_pdfs.append(synthetic_text_pdf(pages, os.path.join(workdir, f"text_{i}.pdf"), first_index))
+            first_index += pages
+        scanned_pdfs = [synthetic_scanned_pdf(args.scanned_pages, os.path.join(workdir, "scanned.pdf"),
+                                              first_index)] if args.scanned_pages else []
+
+        stages = bench_stages(text_pdfs, scanned_pdfs, workdir)
+        records = [synthetic_record(i * 7919 % args.text_pages) for i in range(args.questions)]
+        end_to_end = bench_end_to_end(text_pdfs + scanned_pdfs, args.text_pages + args.scanned_pages, records)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "config": dict(vars(args), **{name: os.getenv(name) for name in RECORDED_ENV}),
+        "stages": stages,
+        **end_to_end,
+    }
+
+    for name, stage in stages.items():
+        if "skipped" in stage:
+            print(f"{name:<8} skipped ({stage['skipped']})")
+        else:
+            print(f"{name:<8} {stage['items']:>8} {stage['unit']:<6} {stage['seconds']:8.2f}s "
+                  f"{stage['per_s']:12.1f} {stage['unit']}/s")
+    ingest, query = results["ingest"], results["query"]
+    print(f"ingest   {ingest['pages']:>8} pages  {ingest['seconds']:8.2f}s {ingest['pages_per_s']:12.1f} pages/s")
+    print(f"query    {query['questions']:>8} q      p50 {query['p50_ms']:.1f}ms  p95 {query['p95_ms']:.1f}ms  "
+          f"accuracy {query['accuracy']:.0%}  mean retries {query['mean_retries']:.2f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(json.load(file), results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark OCR image preprocessing: bytes per page, OCR latency and text
+accuracy for a set of render/preprocess configurations.
+
+Each configuration sets the OCR_RENDER_DPI / OCR_IMAGE_* / OCR_DESKEW /
+OCR_CROP_MARGINS variables and runs ocr_pdf on the same document with the
+configured backend (Tesseract unless DEEPSEEK_API_KEY is set) and the OCR
+cache disabled. "baseline" always runs first; it is the previous
+behaviour: full-colour PNGs at pdf2image's default 200 DPI, nothing else.
+
+Accuracy is word-level similarity to a reference text: --reference if
+given, the known text of the pages with --synthetic-pages, and otherwise
+the baseline's own output (so it measures agreement, not correctness).
+
+Usage:
+    python -m benchmarks.bench_preprocess
+    python -m benchmarks.bench_preprocess --synthetic-pages 4 --configs baseline gray-jpeg binary-png
+"""
+import argparse
+import difflib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+from app.ingestion.pdf_loader import find_poppler, ocr_pdf
+from benchmarks._pdfs import SCANNED_PDF, synthetic_page_texts, synthetic_scanned_pdf, text_pdf_lines
+
+CONFIGS = {
+    "baseline": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "color", "OCR_CROP_MARGINS": "false",
+                 "OCR_DESKEW": "false", "OCR_IMAGE_FORMAT": "png"},
+    "gray-png": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "gray", "OCR_IMAGE_FORMAT": "png"},
+    "gray-jpeg": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "gray", "OCR_IMAGE_FORMAT": "jpeg",
+                  "OCR_IMAGE_QUALITY": "80"},
+    "gray-webp": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "gray", "OCR_IMAGE_FORMAT": "webp",
+                  "OCR_IMAGE_QUALITY": "80"},
+    "binary-png": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "binary", "OCR_IMAGE_FORMAT": "png"},
+    "deskew-jpeg": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "gray", "OCR_DESKEW": "true",
+                    "OCR_IMAGE_FORMAT": "jpeg", "OCR_IMAGE_QUALITY": "80"},
+    "150dpi-jpeg": {"OCR_RENDER_DPI": "150", "OCR_IMAGE_MODE": "gray", "OCR_IMAGE_FORMAT": "jpeg",
+                    "OCR_IMAGE_QUALITY": "70"},
+    "300dpi-binary": {"OCR_RENDER_DPI": "300", "OCR_IMAGE_MODE": "binary", "OCR_IMAGE_FORMAT": "png"},
+    "jpeg-100kb": {"OCR_RENDER_DPI": "200", "OCR_IMAGE_MODE": "gray", "OCR_IMAGE_FORMAT": "jpeg",
+                   "OCR_IMAGE_QUALITY": "90", "OCR_IMAGE_MAX_KB": "100"},
+}
+
+_PREPROCESS_VARS = sorted({name for config in CONFIGS.values() for name in config})
+
+
+@contextmanager
+def _environment(config: dict):
+    """Apply a configuration on top of cleared preprocessing variables, restoring them afterwards"""
+    saved = {name: os.environ.pop(name, None) for name in _PREPROCESS_VARS + ["OCR_CACHE_ENABLED"]}
+    os.environ.update(config, OCR_CACHE_ENABLED="false")
+    try:
+        yield
+    finally:
+        for name in _PREPROCESS_VARS + ["OCR_CACHE_ENABLED"]:
+            os.environ.pop(name, None)
+            if saved[name] is not None:
+                os.environ[name] = saved[name]
+
+
+def word_accuracy(reference: str, text: str) -> float:
+    """Similarity of the two texts' word sequences (1.0 = identical)"""
+    expected, actual = reference.lower().split(), text.lower().split()
+    if not expected:
+        return float(not actual)
+    return difflib.SequenceMatcher(None, expected, actual, autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=SCANNED_PDF, help="scanned PDF to OCR")
+    parser.add_argument("--synthetic-pages", type=int, default=0,
+                        help="OCR this many synthetic scanned pages with known text instead of --pdf")
+    parser.add_argument("--reference", help="text file with the expected text of --pdf")
+    parser.add_argument("--configs", nargs="+", choices=sorted(CONFIGS), default=list(CONFIGS))
+    parser.add_argument("--json", help="optional path to write results as JSON")
+    args = parser.parse_args()
+
+    configs = ["baseline"] + [name for name in args.configs if name != "baseline"]
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as file:
+            reference = file.read()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if args.synthetic_pages:
+            pdf_path = synthetic_scanned_pdf(args.synthetic_pages, os.path.join(tmp, "synthetic_scanned.pdf"))
+            page_texts = synthetic_page_texts(args.synthetic_pages)
+            reference = "\n".join(" ".join(text_pdf_lines(text)) for text in page_texts)
+
+        for name in configs:
+            with _environment(CONFIGS[name]):
+                texts, timings = ocr_pdf(pdf_path, poppler_path=find_poppler())
+            text = "\n".join(texts)
+            if reference is None:
+                reference = text
+            pages = max(1, timings["pages"])
+            result = {
+                "config": name,
+                "env": CONFIGS[name],
+                "backend": timings["backend"],
+                "pages": timings["pages"],
+                "kb_per_page": timings["image_bytes"] / pages / 1024,
+                "render_ms_per_page": timings["render_s"] / pages * 1000,
+                "preprocess_ms_per_page": timings["preprocess_s"] / pages * 1000,
+                "ocr_ms_per_page": timings["ocr_s"] / pages * 1000,
+                "wall_s": timings["wall_s"],
+                "accuracy": word_accuracy(reference, text),
+            }
+            results.append(result)
+            print(
+                f"{name:>14} {result['backend']:>9}  {result['kb_per_page']:8.1f} KB/page  "
+                f"render {result['render_ms_per_page']:6.0f} ms  preprocess {result['preprocess_ms_per_page']:5.0f} ms  "
+                f"ocr {result['ocr_ms_per_page']:7.0f} ms/page  accuracy {result['accuracy']:6.1%}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Memory footprint, QPS and recall@k of quantized local indexes.
+
+Builds the local vector index over the same synthetic embeddings with no
+quantization, int8 scalar codes and product-quantized codes, and reports
+for each: bytes scanned per query (the memory a serving node must keep
+resident), batched QPS and recall@k against exact float32 search, for
+several full-precision rerank factors.
+
+Usage:
+    python -m benchmarks.bench_quantization --rows 200000
+    python -m benchmarks.bench_quantization --pq-m 24 48 96 --rerank-factor 1 4 16
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.embeddings.local_index import LocalVectorIndex, normalize_rows
+from benchmarks.bench_vector_index import ground_truth, recall, synthetic_embeddings
+
+
+def build(path: str, vectors: np.ndarray, quantization: str, mode: str, pq_m: int = 0) -> float:
+    if pq_m:
+        os.environ["LOCAL_INDEX_PQ_M"] = str(pq_m)
+    start = time.perf_counter()
+    index = LocalVectorIndex(path, mode=mode, quantization=quantization)
+    for batch in range(0, len(vectors), 10000):
+        rows = range(batch, min(batch + 10000, len(vectors)))
+        index.add_vectors([str(row) for row in rows], vectors[batch:batch + 10000], [""] * len(rows))
+    if mode == "ivf":
+        index.train_ivf()
+    if quantization != "none":
+        index.train_quantizer()
+    return time.perf_counter() - start
+
+
+def measure(path: str, queries: np.ndarray, truth: list, k: int, quantization: str, mode: str,
+            rerank_factor: int) -> dict:
+    index = LocalVectorIndex(path, mode=mode, quantization=quantization, rerank_factor=rerank_factor)
+    index.search_vectors(queries[:1], k)
+    start = time.perf_counter()
+    hits = index.search_vectors(queries, k)
+    elapsed = time.perf_counter() - start
+    footprint = index.memory_footprint()
+    return {
+        "scanned_mb": footprint["scanned"] / 1e6,
+        "compression": footprint["vectors"] / footprint["scanned"],
+        "qps": len(queries) / elapsed,
+        "recall": recall([[row for row, _ in query_hits] for query_hits in hits], truth, k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--mode", choices=["exact", "ivf"], default="exact")
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[48])
+    parser.add_argument("--rerank-factor", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = normalize_rows(vectors[rng.integers(0, args.rows, args.queries)]
+                             + 0.3 * rng.normal(size=(args.queries, args.dim)) / np.sqrt(args.dim))
+    truth = ground_truth(vectors, queries, args.k)
+
+    configs = [("none", 0), ("int8", 0)] + [("pq", m) for m in args.pq_m]
+    reports = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for quantization, pq_m in configs:
+            name = quantization + (f" m={pq_m}" if pq_m else "")
+            path = os.path.join(workdir, name.replace(" ", "_"))
+            build_s = build(path, vectors, quantization, args.mode, pq_m)
+            for factor in (args.rerank_factor if quantization != "none" else [1]):
+                report = measure(path, queries, truth, args.k, quantization, args.mode, factor)
+                reports.append(dict(report, quantization=name, rerank_factor=factor, build_s=build_s))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print(f"{args.rows} x {args.dim} vectors, {args.mode} search, {args.queries} queries, recall@{args.k}")
+    print(f"{'storage':<10} {'rerank':>6} {'scanned MB':>10} {'x smaller':>9} {'build s':>8} {'QPS':>9} {'recall':>7}")
+    for report in reports:
+        print(f"{report['quantization']:<10} {report['rerank_factor']:>6} {report['scanned_mb']:10.1f} "
+              f"{report['compression']:9.1f} {report['build_s']:8.2f} {report['qps']:9.1f} {report['recall']:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
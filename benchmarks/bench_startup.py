@@ -0,0 +1,143 @@
+"""
+Startup cost of the entry points, from `python -X importtime`.
+
+Each scenario runs in a fresh interpreter (best of --repeat) and reports
+total import time, the number of modules loaded and the packages that
+cost the most (self time summed per top-level package):
+
+- main:   `import main`, what the CLI and gui.py load before doing anything
+- query:  main plus what a query-only session loads to answer questions
+          (graph, vector store backend, embedding model class)
+- ingest: main plus the ingestion and OCR stack
+
+main and query must not load ingestion/OCR modules, and main must not load
+the graph, vector store or model libraries either; --check exits with
+status 1 when they do. Missing optional dependencies are reported per
+scenario rather than failing the run.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5 --top 10 --check
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "main": "import main",
+    "query": (
+        "import main\n"
+        "import app.graph.rag_graph\n"
+        "import langchain_huggingface\n"
+        "from app.embeddings.vector_store import get_vector_backend\n"
+        "if get_vector_backend() == 'local':\n"
+        "    import app.embeddings.local_index\n"
+        "else:\n"
+        "    import langchain_community.vectorstores\n"
+    ),
+    "ingest": (
+        "import main\n"
+        "import app.ingestion.pipeline, app.ingestion.ocr, app.ingestion.preprocess\n"
+        "import pdf2image, langchain_text_splitters\n"
+    ),
+}
+
+INGESTION_MODULES = ["app.ingestion.pipeline", "app.ingestion.pdf_loader", "app.ingestion.cleaner",
+                     "app.ingestion.ocr", "app.ingestion.preprocess", "pdf2image", "pytesseract", "PIL",
+                     "langchain_text_splitters"]
+QUERY_MODULES = ["app.graph.rag_graph", "langgraph", "langchain_community", "chromadb", "langchain_huggingface",
+                 "sentence_transformers", "torch"]
+# Modules each scenario must not import
+FORBIDDEN = {"main": INGESTION_MODULES + QUERY_MODULES, "query": INGESTION_MODULES, "ingest": []}
+
+_REPORT = "import json, sys\nprint(json.dumps(sorted(name for name in {watched!r} if name in sys.modules)))\n"
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Rows of -X importtime output: {"module", "self_us", "cumulative_us", "depth"}"""
+    rows = []
+    for line in stderr.splitlines():
+        fields = line[len("import time:"):].split("|", 2) if line.startswith("import time:") else []
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header, or output that is not importtime's
+        name = fields[2][1:]  # nesting is shown as indentation after the separator's space
+        rows.append({"module": name.strip(), "self_us": int(fields[0]), "cumulative_us": int(fields[1]),
+                     "depth": len(name) - len(name.lstrip())})
+    return rows
+
+
+def run_scenario(code: str, watched: List[str]) -> dict:
+    """Run `code` in a fresh interpreter with -X importtime"""
+    command = [sys.executable, "-X", "importtime", "-c", code + "\n" + _REPORT.format(watched=watched)]
+    process = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    rows = parse_importtime(process.stderr)
+    if process.returncode != 0:
+        error = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        return {"error": error[-1] if error else f"exit status {process.returncode}", "rows": rows}
+    return {"loaded": json.loads(process.stdout.strip().splitlines()[-1]), "rows": rows}
+
+
+def summarize(rows: List[dict], top: int) -> dict:
+    top_level = min((row["depth"] for row in rows), default=0)
+    by_package: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        by_package[row["module"].split(".")[0]] += row["self_us"]
+    return {
+        "import_ms": sum(row["cumulative_us"] for row in rows if row["depth"] == top_level) / 1000,
+        "modules": len(rows),
+        "top_packages": [{"package": package, "self_ms": self_us / 1000}
+                         for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the fastest is reported")
+    parser.add_argument("--top", type=int, default=8, help="most expensive packages to list")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with status 1 if a scenario imports a module it must not")
+    parser.add_argument("--json", help="optional path to write results as JSON")
+    args = parser.parse_args()
+
+    watched = sorted(set(INGESTION_MODULES + QUERY_MODULES))
+    results, violations = [], []
+    for name in args.scenarios:
+        best = None
+        for _ in range(max(1, args.repeat)):
+            run = run_scenario(SCENARIOS[name], watched)
+            if "error" in run:
+                best = run
+                break
+            run.update(summarize(run["rows"], args.top))
+            if best is None or run["import_ms"] < best["import_ms"]:
+                best = run
+        del best["rows"]
+        result = {"scenario": name, **best}
+        results.append(result)
+
+        if "error" in result:
+            print(f"{name:>7}  failed: {result['error']}")
+            continue
+        forbidden = [module for module in result["loaded"] if module in FORBIDDEN[name]]
+        violations.extend(f"{name} imports {module}" for module in forbidden)
+        print(f"{name:>7}  imports {result['import_ms']:8.1f} ms  {result['modules']:5d} modules"
+              + (f"  UNEXPECTED: {', '.join(forbidden)}" if forbidden else ""))
+        for package in result["top_packages"]:
+            print(f"{'':>9}{package['package']:<28} {package['self_ms']:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.check and violations:
+        print("\n".join(violations))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Agreement and latency of the local groundedness validator vs the LLM judge.
+
+Builds labelled (answer, retrieved chunks) cases: answers copied or
+paraphrased from the context (grounded), answers with a mutated identifier
+or off-topic claims (not grounded) and refusals. Every case is scored with
+the local embedding scorer; with --llm it is also sent to the LLM judge
+(LLM_PROVIDER from .env), and the script reports accuracy against the
+labels, agreement with the LLM, latency per verdict and how many LLM calls
+VALIDATOR_MODE=hybrid avoids.
+
+Usage:
+    python -m benchmarks.bench_validator            # local scorer only
+    python -m benchmarks.bench_validator --llm      # compare with the LLM judge
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+from app.agents.groundedness import (get_groundedness_scorer, get_validator_accept_threshold,
+                                     get_validator_reject_threshold, split_sentences)
+from app.agents.validator import _parse_verdict, _validation_prompt
+from benchmarks._pdfs import STANDARD_PDF
+
+CONTEXT = [
+    "The ALPHA-999-BETA project was approved in March 2021 with a budget of 2.4 million dollars. "
+    "It is led by the infrastructure team and targets a 40 percent reduction in ingestion latency.",
+    "The OMEGA-123-GAMMA archive contains scanned maintenance logs from the northern facility. "
+    "Logs are retained for seven years and reviewed every quarter by the compliance office.",
+    "Access to the archive requires a badge issued by the security desk. Visitors must be escorted "
+    "at all times and may not photograph equipment.",
+]
+
+OFF_TOPIC = [
+    "The project was cancelled after the CEO resigned in 2019.",
+    "Employees receive a bonus of 15 percent when the archive is migrated to the cloud.",
+    "The northern facility was converted into a data center for machine learning training.",
+]
+
+PARAPHRASES = [
+    ("ALPHA-999-BETA received approval in March 2021 and has a 2.4 million dollar budget.", True),
+    ("Maintenance logs in the OMEGA-123-GAMMA archive are kept for seven years.", True),
+    ("Visitors to the archive need an escort and cannot take photos of equipment.", True),
+    ("The ALPHA-998-BETA project was approved in March 2021.", False),
+    ("The OMEGA-123-GAMMA archive is reviewed every week by the finance office and stored for 20 years.", False),
+]
+
+REFUSAL = "The provided documents do not contain this information."
+
+
+def _mutate_identifier(sentence: str):
+    match = re.search(r'\d', sentence)
+    if not match:
+        return None
+    digit = str((int(match.group()) + 1) % 10)
+    return sentence[:match.start()] + digit + sentence[match.end():]
+
+
+def _pdf_chunks():
+    try:
+        from app.ingestion.cleaner import clean_and_chunk
+        from app.ingestion.pdf_loader import extract_text_from_pdf
+        return [chunk.page_content for chunk in clean_and_chunk(extract_text_from_pdf(STANDARD_PDF))]
+    except Exception:
+        return []
+
+
+def build_cases(chunks):
+    """Labelled (answer, documents, grounded) cases; each answer is checked against 3 chunks"""
+    cases = []
+    docs = [Document(page_content=text) for text in chunks]
+    for index, text in enumerate(chunks):
+        window = docs[max(0, index - 1):index + 2]
+        sentences = [s for s in split_sentences(text) if len(s.split()) >= 6]
+        if sentences:
+            cases.append({"kind": "copied", "answer": sentences[0], "docs": window, "grounded": True})
+            mutated = next(filter(None, map(_mutate_identifier, sentences)), None)
+            if mutated:
+                cases.append({"kind": "mutated_id", "answer": mutated, "docs": window, "grounded": False})
+        off_topic = OFF_TOPIC[index % len(OFF_TOPIC)]
+        cases.append({"kind": "off_topic", "answer": off_topic, "docs": window, "grounded": False})
+    context_docs = [Document(page_content=text) for text in CONTEXT]
+    for answer, grounded in PARAPHRASES:
+        cases.append({"kind": "paraphrase", "answer": answer, "docs": context_docs, "grounded": grounded})
+    cases.append({"kind": "refusal", "answer": REFUSAL, "docs": context_docs, "grounded": True})
+    return cases
+
+
+def run(cases, llm=None):
+    scorer = get_groundedness_scorer()
+    accept, reject = get_validator_accept_threshold(), get_validator_reject_threshold()
+    scorer.score("warm up the embedding model.", [Document(page_content=CONTEXT[0])])
+
+    for case in cases:
+        start = time.perf_counter()
+        case["score"] = scorer.score(case["answer"], case["docs"])["score"]
+        case["local_s"] = time.perf_counter() - start
+        case["local"] = case["score"] >= (accept + reject) / 2
+        case["ambiguous"] = reject <= case["score"] < accept
+        if llm is not None:
+            state = {"documents": case["docs"]}
+            start = time.perf_counter()
+            case["llm"] = _parse_verdict(llm.invoke([_validation_prompt(state, case["answer"])]))
+            case["llm_s"] = time.perf_counter() - start
+            case["hybrid"] = case["llm"] if case["ambiguous"] else case["score"] >= accept
+
+    def accuracy(key):
+        return sum(case[key] == case["grounded"] for case in cases) / len(cases)
+
+    report = {
+        "cases": len(cases),
+        "thresholds": {"accept": accept, "reject": reject},
+        "local": {"accuracy": accuracy("local"),
+                  "mean_ms": 1000 * statistics.mean(case["local_s"] for case in cases)},
+        "ambiguous_fraction": sum(case["ambiguous"] for case in cases) / len(cases),
+        "by_kind": {},
+    }
+    for kind in sorted({case["kind"] for case in cases}):
+        scores = [case["score"] for case in cases if case["kind"] == kind]
+        report["by_kind"][kind] = {"n": len(scores), "min": min(scores), "mean": statistics.mean(scores),
+                                   "max": max(scores)}
+    if llm is not None:
+        report["llm"] = {"accuracy": accuracy("llm"),
+                         "mean_ms": 1000 * statistics.mean(case["llm_s"] for case in cases)}
+        report["hybrid"] = {
+            "accuracy": accuracy("hybrid"),
+            "llm_calls_avoided": 1 - report["ambiguous_fraction"],
+            "mean_ms": 1000 * statistics.mean(
+                case["local_s"] + (case["llm_s"] if case["ambiguous"] else 0.0) for case in cases),
+        }
+        report["local_vs_llm_agreement"] = sum(case["local"] == case["llm"] for case in cases) / len(cases)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="also run the LLM judge (uses LLM_PROVIDER)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    llm = None
+    if args.llm:
+        from app.llm.models import get_llm
+        llm = get_llm()
+
+    report = run(build_cases(CONTEXT + _pdf_chunks()), llm)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['cases']} cases, thresholds accept>={report['thresholds']['accept']} "
+          f"reject<{report['thresholds']['reject']}")
+    for kind, scores in report["by_kind"].items():
+        print(f"  {kind:<11} n={scores['n']:<4} score min {scores['min']:.2f} "
+              f"mean {scores['mean']:.2f} max {scores['max']:.2f}")
+    print(f"local : accuracy {report['local']['accuracy']:.1%}, {report['local']['mean_ms']:.1f} ms/verdict")
+    if llm is not None:
+        print(f"llm   : accuracy {report['llm']['accuracy']:.1%}, {report['llm']['mean_ms']:.1f} ms/verdict")
+        print(f"hybrid: accuracy {report['hybrid']['accuracy']:.1%}, {report['hybrid']['mean_ms']:.1f} ms/verdict, "
+              f"{report['hybrid']['llm_calls_avoided']:.0%} of LLM calls avoided")
+        print(f"local vs llm agreement: {report['local_vs_llm_agreement']:.1%}")
+    else:
+        print(f"{report['ambiguous_fraction']:.0%} of cases fall in the ambiguous band (LLM judge in hybrid mode)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Recall and latency of the local memory-mapped vector index vs Chroma.
+
+Generates clustered, unit-normalized synthetic embeddings (the shape of
+sentence-transformers output), computes exact top-k ground truth with
+NumPy and measures for every backend: build time, time to open an existing
+index and answer a first query, single-query latency, batched QPS and
+recall@k.
+
+Usage:
+    python -m benchmarks.bench_vector_index --rows 100000 --queries 200
+    python -m benchmarks.bench_vector_index --nprobe 4 8 16 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.embeddings.local_index import LocalVectorIndex, normalize_rows
+
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.normal(size=(rows, dim))
+    return normalize_rows(vectors)
+
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    scores = queries @ vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+
+def recall(results: list, truth: list, k: int) -> float:
+    return statistics.mean(len(set(found) & expected) / k for found, expected in zip(results, truth))
+
+
+def measure(search_one, search_batch, queries: np.ndarray, truth: list, k: int) -> dict:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search_one(query)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    results = search_batch(queries)
+    batch_s = time.perf_counter() - start
+    return {
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * sorted(latencies)[int(len(latencies) * 0.95) - 1],
+        "batch_qps": len(queries) / batch_s,
+        "recall": recall(results, truth, k),
+    }
+
+
+def bench_local(workdir: str, vectors: np.ndarray, queries: np.ndarray, truth: list, k: int,
+                dtype: str, mode: str, nprobes: list) -> list:
+    path = os.path.join(workdir, f"local_{dtype}")
+    start = time.perf_counter()
+    index = LocalVectorIndex(path, dtype=dtype, mode=mode)
+    for batch in range(0, len(vectors), 10000):
+        rows = range(batch, min(batch + 10000, len(vectors)))
+        index.add_vectors([str(row) for row in rows], vectors[batch:batch + 10000], [""] * len(rows))
+    if mode == "ivf":
+        index.train_ivf()
+    build_s = time.perf_counter() - start
+
+    reports = []
+    for nprobe in (nprobes if mode == "ivf" else [None]):
+        start = time.perf_counter()
+        index = LocalVectorIndex(path, mode=mode, nprobe=nprobe)
+        index.search_vectors(queries[:1], k)
+        open_s = time.perf_counter() - start
+
+        def rows_of(hits):
+            return [[row for row, _ in query_hits] for query_hits in hits]
+
+        report = measure(lambda query: index.search_vectors([query], k),
+                         lambda batch: rows_of(index.search_vectors(batch, k)), queries, truth, k)
+        name = f"local {mode} {dtype}" + (f" nprobe={nprobe}" if nprobe else "")
+        reports.append(dict(report, backend=name, build_s=build_s, open_s=open_s))
+    return reports
+
+
+def bench_chroma(workdir: str, vectors: np.ndarray, queries: np.ndarray, truth: list, k: int) -> list:
+    try:
+        import chromadb
+    except ImportError:
+        print("chromadb not installed, skipping Chroma")
+        return []
+    path = os.path.join(workdir, "chroma")
+    start = time.perf_counter()
+    collection = chromadb.PersistentClient(path=path).create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for batch in range(0, len(vectors), 5000):
+        rows = range(batch, min(batch + 5000, len(vectors)))
+        collection.add(ids=[str(row) for row in rows], embeddings=vectors[batch:batch + 5000].tolist())
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    collection = chromadb.PersistentClient(path=path).get_collection("bench")
+    collection.query(query_embeddings=queries[:1].tolist(), n_results=k, include=["distances"])
+    open_s = time.perf_counter() - start
+
+    def search(batch):
+        found = collection.query(query_embeddings=np.atleast_2d(batch).tolist(), n_results=k, include=["distances"])
+        return [[int(chunk_id) for chunk_id in ids] for ids in found["ids"]]
+
+    report = measure(search, search, queries, truth, k)
+    return [dict(report, backend="chroma (hnsw)", build_s=build_s, open_s=open_s)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--no-chroma", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = normalize_rows(vectors[rng.integers(0, args.rows, args.queries)]
+                             + 0.3 * rng.normal(size=(args.queries, args.dim)) / np.sqrt(args.dim))
+    truth = ground_truth(vectors, queries, args.k)
+
+    reports = []
+    with tempfile.TemporaryDirectory() as workdir:
+        reports += bench_local(workdir, vectors, queries, truth, args.k, "float32", "exact", args.nprobe)
+        reports += bench_local(workdir, vectors, queries, truth, args.k, "float16", "exact", args.nprobe)
+        reports += bench_local(os.path.join(workdir, "ivf"), vectors, queries, truth, args.k,
+                               "float32", "ivf", args.nprobe)
+        if not args.no_chroma:
+            reports += bench_chroma(workdir, vectors, queries, truth, args.k)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print(f"{args.rows} x {args.dim} vectors, {args.queries} queries, recall@{args.k}")
+    print(f"{'backend':<32} {'build s':>8} {'open ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'QPS':>9} {'recall':>7}")
+    for report in reports:
+        print(f"{report['backend']:<32} {report['build_s']:8.2f} {1000 * report['open_s']:8.1f} "
+              f"{report['p50_ms']:8.2f} {report['p95_ms']:8.2f} {report['batch_qps']:9.1f} {report['recall']:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
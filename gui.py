@@ -1,42 +1,122 @@
 import streamlit as st
 import os
-from main import ingest_multiple_documents, chat_with_document
-from app.embeddings.vector_store import load_vector_store, get_retriever_k
-from app.graph.rag_graph import build_graph
-from app.llm.models import get_llm
+import uuid
+from main import delete_workspace, ingest_multiple_documents, astream_answer
+from app.embeddings.vector_store import DEFAULT_TENANT, get_tenant
+from app.graph.streaming import get_background_loop
+from app.ingestion.manifest import IngestionManifest
+from app.resources import ResourceRegistry, get_registry
+from app.tracing import get_tracer
 
 st.set_page_config(page_title="Agentic RAG Assistant", layout="wide")
 
+
+@st.cache_resource
+def get_resources() -> ResourceRegistry:
+    """
+    LLM client, embeddings, vector store, compiled graph and answer cache,
+    built once and shared by every session and rerun of this server
+    """
+    return get_registry()
+
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "retriever" not in st.session_state:
-    st.session_state.retriever = None
+if "tenant" not in st.session_state:
+    # Every session gets its own corpus, so one user's uploads never show up in another's answers
+    st.session_state.tenant = f"session-{uuid.uuid4().hex[:12]}"
 
 with st.sidebar:
     st.title("📂 Document Management")
+    workspace = st.text_input("Workspace", value=st.session_state.tenant,
+                              help="Documents are searched per workspace; enter a name to reopen or share one")
+    try:
+        # get_tenant("") would fall back to RAG_TENANT, the corpus the command line ingests into
+        if workspace.strip() in ("", DEFAULT_TENANT):
+            raise ValueError("Enter a workspace name; the default workspace is reserved for the command line")
+        tenant = get_tenant(workspace.strip())
+        st.session_state.tenant = tenant
+    except ValueError as e:
+        st.error(str(e))
+        tenant = st.session_state.tenant
+
+    if st.button("Delete workspace", help="Remove this workspace's documents, index and uploads"):
+        delete_workspace(tenant, resources=get_resources())
+        st.session_state.tenant = f"session-{uuid.uuid4().hex[:12]}"
+        st.session_state.messages = []
+        st.rerun()
+
     uploaded_files = st.file_uploader("Upload PDFs", type="pdf", accept_multiple_files=True)
     
     if st.button("Process Documents"):
         if uploaded_files:
             
             pdf_paths = []
-            if not os.path.exists("data"):
-                os.makedirs("data")
+            upload_dir = os.path.join("data", "uploads", tenant)
+            if not os.path.exists(upload_dir):
+                os.makedirs(upload_dir)
             
             for uploaded_file in uploaded_files:
-                path = os.path.join("data", uploaded_file.name)
+                path = os.path.join(upload_dir, uploaded_file.name)
                 with open(path, "wb") as f:
                     f.write(uploaded_file.getbuffer())
                 pdf_paths.append(path)
             
             with st.spinner("Ingesting documents (Direct & OCR)..."):
-                db = ingest_multiple_documents(pdf_paths)
-                st.session_state.retriever = db.as_retriever(search_kwargs={"k": get_retriever_k()})
+                progress_bar = st.progress(0.0, text="Starting ingestion...")
+
+                def show_progress(progress):
+                    done, total = progress["documents_done"], progress["documents_total"]
+                    progress_bar.progress(
+                        done / total if total else 1.0,
+                        text=f"{done}/{total} documents, {progress['chunks_written']} chunks indexed",
+                    )
+
+                ingest_multiple_documents(pdf_paths, on_progress=show_progress, resources=get_resources(),
+                                          tenant=tenant)
                 st.success("Documents Ingested Successfully!")
         else:
             st.error("Please upload at least one PDF.")
 
+    sources = sorted(IngestionManifest(tenant=tenant).entries)
+    selected_sources = st.multiselect(
+        "Search only in", sources, format_func=os.path.basename,
+        help="Leave empty to search every document in the workspace",
+    )
+    search_filter = {"source": selected_sources} if selected_sources else None
+
+    answer_cache = get_resources().answer_cache(tenant)
+    if answer_cache is not None:
+        cache_stats = answer_cache.stats()
+        st.caption(
+            f"Answer cache: {cache_stats['entries']} entries, "
+            f"{cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']} hits, {cache_stats['misses']} misses)"
+        )
+
+    query_cache = get_resources().query_cache()
+    if query_cache is not None:
+        query_stats = query_cache.stats()
+        st.caption(
+            f"Query cache: {query_stats['results']} result lists, {query_stats['embeddings']} embeddings, "
+            f"{query_stats['hit_rate']:.0%} retrieval hit rate "
+            f"({query_stats['result_hits']} hits, {query_stats['result_misses']} misses)"
+        )
+
+    resource_report = get_resources().report()
+    st.caption(
+        f"Resources: cold start {resource_report['cold_start_s']:.2f}s, "
+        f"warm lookup {resource_report['warm_lookup_ms']:.3f}ms"
+    )
+
+    span_summary = get_tracer().summary()
+    if span_summary:
+        with st.expander("Latency by stage"):
+            st.dataframe(
+                [{"span": name, **values} for name, values in span_summary.items()],
+                hide_index=True,
+            )
+
 st.title("🤖 Agentic RAG Assistant")
 st.caption("Powered by LangGraph, MCP OCR, and Gemini")
 
@@ -45,7 +125,7 @@ for message in st.session_state.messages:
         st.markdown(message["content"])
 
 if prompt := st.chat_input("Ask about your documents..."):
-    if st.session_state.retriever is None:
+    if not sources:
         st.warning("Please process documents in the sidebar first.")
     else:
     
@@ -55,11 +135,31 @@ if prompt := st.chat_input("Ask about your documents..."):
 
         
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing documents..."):
-                llm = get_llm()
-                graph = build_graph(st.session_state.retriever, llm)
-                answer = chat_with_document(prompt, st.session_state.retriever, graph)
+            graph = get_resources().async_graph(tenant)
+            final = {"retried": False}
+
+            def stream_tokens():
+                # Drive the async graph on the shared background loop and
+                # hand tokens to Streamlit as they are generated
+                events = astream_answer(prompt, graph, get_resources().answer_cache(tenant), search_filter)
+                for event in get_background_loop().iterate(events):
+                    if event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "retry":
+                        final["retried"] = True
+                        yield "\n\n---\n*Answer was not grounded in the documents, regenerating...*\n\n"
+                    else:
+                        final.update(event)
+
+            streamed = st.write_stream(stream_tokens())
+            answer = final.get("answer", streamed)
+            # Cached answers are not streamed; retries leave earlier drafts on screen
+            if final.get("cached"):
                 st.markdown(answer)
+            elif final["retried"]:
+                st.markdown(f"**Final answer:**\n\n{answer}")
         
         
-        st.session_state.messages.append({"role": "assistant", "content": answer})
\ No newline at end of file
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        # No-op unless TRACE_EXPORT_DIR is set
+        get_tracer().export()
\ No newline at end of file
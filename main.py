@@ -1,83 +1,247 @@
-from langchain_core.messages import HumanMessage
-from app.embeddings.vector_store import build_vector_store, load_vector_store, get_retriever_k
-from app.graph.rag_graph import build_graph
-from app.ingestion.cleaner import clean_and_chunk
-from app.ingestion.pdf_loader import load_pdf
-from app.llm.models import get_llm
-from app.state import AgentState
+from app.batch import run_batch
+from app.embeddings.filters import filter_key, normalize_filter
+from app.embeddings.vector_store import delete_tenant, get_persist_directory
+from app.graph.answer_cache import SemanticAnswerCache, is_cacheable
+from app.graph.streaming import message_text
+from app.ingestion.manifest import normalize_source
+from app.resources import ResourceRegistry, get_registry
+from app.state import initial_state
+from app.tracing import get_tracer
+import asyncio
 import os
 import shutil
+import time
 
-def ingest_multiple_documents(pdf_paths: list):
-    """Ingest multiple PDFs into a single consolidated vector store"""
-    all_docs = []
-    
-    for path in pdf_paths:
-        if not os.path.exists(path):
-            print(f"Warning: File not found at {path}")
-            continue
-            
-        print(f"\n--- Processing: {path} ---")
-        text = load_pdf(path) 
-        
-        print(f"Cleaning and chunking text from {os.path.basename(path)}...")
-        chunks = clean_and_chunk(text)
-        all_docs.extend(chunks)
-    
-    if not all_docs:
+def ingest_multiple_documents(pdf_paths: list, on_progress=None, resources: ResourceRegistry = None,
+                              tenant: str = None):
+    """Incrementally stream multiple PDFs into a tenant's consolidated vector store"""
+    # Ingestion pulls in PDF parsing, OCR and text splitting; query-only sessions never import it
+    from app.ingestion.pipeline import ingest_documents
+
+    resources = resources or get_registry()
+    db, stats = ingest_documents(pdf_paths, db=resources.vector_store(tenant), on_progress=on_progress,
+                                 tenant=tenant)
+    get_tracer().export()
+
+    if not any(stats[key] for key in ("new", "updated", "unchanged")):
         raise ValueError("No documents were successfully processed.")
 
-    print(f"\nBuilding consolidated vector store with {len(all_docs)} total chunks...")
-    db = build_vector_store(all_docs)
     return db
 
-def chat_with_document(question: str, retriever, graph):
-    """Chat with the document using the RAG system"""
-    state: AgentState = {
-        "messages": [HumanMessage(content=question)],
-        "documents": [],
-        "retries": 0,
-        "validated": False,
-        "final_answer": None
-    }
-    result = graph.invoke(state)
-    return result.get("final_answer", "No answer generated")
+def delete_workspace(tenant: str, resources: ResourceRegistry = None):
+    """Delete a tenant's corpus, the uploads the Streamlit app saved for it and its built resources"""
+    delete_tenant(tenant)
+    shutil.rmtree(os.path.join("data", "uploads", tenant), ignore_errors=True)
+    (resources or get_registry()).forget_tenant(tenant)
+
+def chat_with_document(question: str, retriever, graph, answer_cache: SemanticAnswerCache = None,
+                       filter: dict = None):
+    """Chat with the document using the RAG system, optionally only over chunks matching `filter`"""
+    scope = filter_key(filter)
+    with get_tracer().span("rag.question") as span:
+        if answer_cache is not None:
+            # Read before retrieval, so an answer built from a corpus changed meanwhile is not cached
+            version = answer_cache.corpus_version()
+            query_vector = answer_cache.embed(question)
+            cached_answer = answer_cache.get(question, query_vector, scope)
+            span.set(cached=cached_answer is not None)
+            if cached_answer is not None:
+                return cached_answer
+
+        result = graph.invoke(initial_state(question, filter=normalize_filter(filter)))
+        span.set(retries=result.get("retries", 0), validated=bool(result.get("validated")))
+
+        if answer_cache is not None and is_cacheable(result):
+            answer_cache.put(question, query_vector, result["final_answer"], scope, version=version)
+        return result.get("final_answer", "No answer generated")
+
+async def astream_answer(question: str, graph, answer_cache: SemanticAnswerCache = None, filter: dict = None):
+    """
+    Run the async graph and yield events as they happen:
+
+    - {"type": "token", "content"}: a chunk of the answer being generated
+    - {"type": "retry", "attempt"}: validation rejected the previous answer
+      and the generator started again (attempt counts from 2)
+    - {"type": "answer", "answer", "cached"}: the final answer, always last
+
+    Tokens are streamed from the generate node only; validation runs after
+    generation finishes, so a rejected answer is followed by a retry event.
+    The whole question is timed in a "rag.question" span, with the time to
+    first token recorded on it. With a metadata `filter` (see
+    app.embeddings.filters) only matching chunks are retrieved.
+    """
+    scope = filter_key(filter)
+    with get_tracer().span("rag.question", streamed=True) as span:
+        query_vector = version = None
+        if answer_cache is not None:
+            # Read before retrieval, so an answer built from a corpus changed meanwhile is not cached
+            version = answer_cache.corpus_version()
+            # Embedding is CPU-bound; keep the event loop free for other questions
+            query_vector = await asyncio.to_thread(answer_cache.embed, question)
+            cached_answer = answer_cache.get(question, query_vector, scope)
+            span.set(cached=cached_answer is not None)
+            if cached_answer is not None:
+                yield {"type": "answer", "answer": cached_answer, "cached": True}
+                return
+
+        start = time.perf_counter()
+        result = {}
+        attempts = []
+        state = initial_state(question, filter=normalize_filter(filter))
+        async for mode, chunk in graph.astream(state, stream_mode=["messages", "values"]):
+            if mode == "values":
+                result = chunk
+                continue
+            message, metadata = chunk
+            if metadata.get("langgraph_node") != "generate":
+                continue
+            step = metadata.get("langgraph_step")
+            if step not in attempts:
+                attempts.append(step)
+                if len(attempts) > 1:
+                    yield {"type": "retry", "attempt": len(attempts)}
+            text = message_text(message.content)
+            if text:
+                if len(attempts) == 1 and "first_token_s" not in span.attributes:
+                    span.set(first_token_s=time.perf_counter() - start)
+                yield {"type": "token", "content": text}
+        span.set(retries=result.get("retries", 0), validated=bool(result.get("validated")))
+
+        if answer_cache is not None and is_cacheable(result):
+            answer_cache.put(question, query_vector, result["final_answer"], scope, version=version)
+        yield {"type": "answer", "answer": result.get("final_answer") or "No answer generated", "cached": False}
+
+async def _chat_loop(resources: ResourceRegistry, filter: dict = None):
+    while True:
+        question = (await asyncio.to_thread(input, "You: ")).strip()
+        if question.lower() in ['quit', 'exit', 'q']:
+            if resources.answer_cache() is not None:
+                print(f"Answer cache: {resources.answer_cache().stats()}")
+            if resources.query_cache() is not None:
+                print(f"Query cache: {resources.query_cache().stats()}")
+            report = resources.report()
+            print(f"Resources: cold start {report['cold_start_s']:.2f}s, "
+                  f"warm lookup {report['warm_lookup_ms']:.3f}ms per resource")
+            _report_tracing()
+            break
+        if not question: continue
+        
+        print("\nAssistant: ", end="", flush=True)
+        streamed = False
+        # Built once; rebuilt only if the configuration or corpus changed
+        graph, answer_cache = resources.async_graph(), resources.answer_cache()
+        async for event in astream_answer(question, graph, answer_cache, filter):
+            if event["type"] == "token":
+                print(event["content"], end="", flush=True)
+                streamed = True
+            elif event["type"] == "retry":
+                print(f"\n\n[Answer not grounded in the documents, retrying (attempt {event['attempt']})]\n", flush=True)
+            elif not streamed:
+                print(event["answer"], end="")
+        print("\n")
+
+def _report_tracing():
+    """Print per-stage latencies and export spans/metrics when TRACE_EXPORT_DIR is set"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return
+    print("\nLatency by stage:\n" + tracer.format_summary())
+    exported = tracer.export()
+    if exported:
+        print(f"Traces and metrics written to {exported}")
+
+def _parse_filter(items) -> dict:
+    """{key: value} from KEY=VALUE arguments; a repeated key accepts any of its values"""
+    filter = {}
+    for item in items or []:
+        key, separator, value = item.partition("=")
+        if not separator:
+            raise ValueError(f"Expected KEY=VALUE, got {item!r}")
+        value = normalize_source(value) if key == "source" else int(value) if value.isdigit() else value
+        filter.setdefault(key, []).append(value)
+    return normalize_filter(filter)
 
 def main():
     """Main entry point updated for multi-file testing"""
+    import argparse
     import sys
+
+    parser = argparse.ArgumentParser(description="Agentic RAG chat over the test documents")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="wipe the vector store (every tenant) and ingest from scratch")
+    parser.add_argument("--no-ingest", action="store_true",
+                        help="skip ingesting the test documents and query the existing store")
+    parser.add_argument("--tenant", help="corpus to ingest into and query (RAG_TENANT, default: 'default')")
+    parser.add_argument("--delete-tenant", nargs="+", metavar="TENANT",
+                        help="delete these tenants' corpora and uploads (e.g. abandoned session-* workspaces) and exit")
+    parser.add_argument("--filter", action="append", metavar="KEY=VALUE",
+                        help="only retrieve chunks with this metadata, e.g. source=data/standard_test.pdf or "
+                             "page=2; repeat a key to accept several values")
+    parser.add_argument("--batch", metavar="QUESTIONS_JSONL",
+                        help="answer every {\"question\"} line of a JSONL file instead of chatting")
+    parser.add_argument("--output", default="batch_results.jsonl",
+                        help="batch results JSONL; an existing file is resumed (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, help="concurrent questions in batch mode (BATCH_CONCURRENCY)")
+    parser.add_argument("--rps", type=float, help="max LLM requests per second (LLM_REQUESTS_PER_SECOND)")
+    parser.add_argument("--trace", metavar="DIR",
+                        help="write spans.jsonl and Prometheus metrics.prom to DIR (TRACE_EXPORT_DIR)")
+    parser.add_argument("--profile", metavar="SPANS",
+                        help="cProfile these comma-separated spans, e.g. node.validate,ingest.chunk (PROFILE_SPANS)")
+    args = parser.parse_args()
+    if args.rps:
+        os.environ["LLM_REQUESTS_PER_SECOND"] = str(args.rps)
+    if args.trace:
+        os.environ["TRACE_EXPORT_DIR"] = args.trace
+    if args.profile:
+        os.environ["PROFILE_SPANS"] = args.profile
+    if args.tenant:
+        os.environ["RAG_TENANT"] = args.tenant
+    if args.delete_tenant:
+        for tenant in args.delete_tenant:
+            try:
+                delete_workspace(tenant)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"🗑️ Deleted tenant {tenant}")
+        return
+    if args.rebuild and args.no_ingest:
+        parser.error("--rebuild empties the store; it cannot be combined with --no-ingest")
+    try:
+        filter = _parse_filter(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
     
     test_files = ["data/standard_test.pdf", "data/scanned_test.pdf"]
 
-    if os.path.exists("./vector_db"):
+    # Ingestion is incremental; pass --rebuild to start from an empty store
+    if args.rebuild and os.path.exists(get_persist_directory()):
         print("Cleaning old vector database for fresh test...")
-        shutil.rmtree("./vector_db")
+        shutil.rmtree(get_persist_directory())
 
-    print("Ingesting test documents...")
-    try:
-        db = ingest_multiple_documents(test_files)
-    except Exception as e:
-        print(f"Ingestion failed: {e}")
-        sys.exit(1)
+    if not args.no_ingest:
+        print("Ingesting test documents...")
+        try:
+            ingest_multiple_documents(test_files)
+        except Exception as e:
+            print(f"Ingestion failed: {e}")
+            sys.exit(1)
+
+    if args.batch:
+        run_batch(args.batch, args.output, args.concurrency, filter=filter)
+        _report_tracing()
+        return
     
-    retriever = db.as_retriever(search_kwargs={"k": get_retriever_k()})
-    llm = get_llm()
-    graph = build_graph(retriever, llm)
+    # Build the LLM client, retriever and graph up front so the first question is warm
+    resources = get_registry()
+    resources.async_graph()
     
     print("\n" + "="*50)
     print("RAG System Ready! Testing Dual Ingestion.")
     print("Try asking about 'ALPHA-999-BETA' (Standard) or 'OMEGA-123-GAMMA' (Scanned)")
     print("="*50 + "\n")
     
-    while True:
-        question = input("You: ").strip()
-        if question.lower() in ['quit', 'exit', 'q']:
-            break
-        if not question: continue
-        
-        print("\nProcessing...")
-        answer = chat_with_document(question, retriever, graph)
-        print(f"\nAssistant: {answer}\n")
+    # A single event loop for the whole session, so the async LLM client is reused
+    asyncio.run(_chat_loop(resources, filter))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file